@@ -0,0 +1,10 @@
+"""
+Benchmarks for plumbery
+
+These scripts are not part of the package. They run plumbery against a
+simulated region, so that changes to the engine can be measured end-to-end
+without any cloud account. Run them from the top of the repository, e.g.::
+
+    $ python -m benchmarks.deploy --nodes 10 100
+
+"""
@@ -0,0 +1,161 @@
+"""
+End-to-end benchmark of plumbery against a simulated region
+
+Each run generates a plan with the given number of nodes, then builds it,
+starts nodes, polishes them, and finally disposes of everything. For each
+phase, the benchmark records wall time, time spent in the simulated cloud,
+and the number of calls to the API.
+
+Example::
+
+    $ python -m benchmarks.deploy --nodes 10 100 1000 --output deploy.json
+
+"""
+
+from __future__ import absolute_import
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from plumbery.engine import PlumberyEngine
+from plumbery.plogging import plogging
+from plumbery.profiler import profiler
+
+from benchmarks.plans import generate_plan
+from benchmarks.region import FIXTURES, MockRegion
+
+PHASES = ('build', 'start', 'configure', 'dispose')
+
+
+def run(nodes, region, phases=PHASES, **kwargs):
+    """
+    Deploys and disposes of one generated plan
+
+    :param nodes: the number of nodes in the plan
+    :type nodes: ``int``
+
+    :param region: the simulated region
+    :type region: :class:`benchmarks.region.MockRegion`
+
+    :param phases: the sequence of actions to be measured
+    :type phases: ``list`` of ``str``
+
+    :return: measurements, phase by phase
+    :rtype: ``dict``
+
+    """
+
+    region.reset()
+    profiler.reset()
+
+    engine = PlumberyEngine(generate_plan(nodes=nodes, **kwargs))
+    engine.set_user_name('benchmark')
+    engine.set_user_password('benchmark')
+
+    result = {'nodes': nodes, 'phases': []}
+    for phase in phases:
+        before = region.get_counts()
+        busy = region.busy
+        t0 = time.time()
+        v0 = region.clock.time()
+
+        engine.do(phase)
+
+        after = region.get_counts()
+        calls = dict((key, after[key] - before.get(key, 0))
+                     for key in after if after[key] > before.get(key, 0))
+
+        result['phases'].append({
+            'phase': phase,
+            'wall': round(time.time() - t0, 3),
+            'cloud': round(region.clock.time() - v0, 1),
+            'calls': sum(calls.values()),
+            'busy': region.busy - busy,
+            'operations': calls})
+
+    result['servers'] = len(region.servers)
+    result['profile'] = profiler.get_operations()
+    return result
+
+
+def main(args=None):
+    """
+    Runs benchmarks from the command line
+    """
+
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.deploy',
+        description='Benchmark plumbery against a simulated region.')
+
+    parser.add_argument(
+        '--nodes', nargs='+', type=int, default=[10, 100],
+        help='Sizes of generated plans, e.g., 10 100 1000')
+
+    parser.add_argument(
+        '--facilities', type=int, default=1,
+        help='Number of facilities in each plan')
+
+    parser.add_argument(
+        '--latency', type=float, default=0.0,
+        help='Seconds spent on each API call')
+
+    parser.add_argument(
+        '--busy-rate', type=float, default=0.0,
+        help='Probability of RESOURCE_BUSY on each change')
+
+    parser.add_argument(
+        '--scale', type=float, default=0.0001,
+        help='Real seconds per simulated second')
+
+    parser.add_argument(
+        '--seed', type=int, default=0,
+        help='Seed for random numbers')
+
+    parser.add_argument(
+        '--output', default=None,
+        help='Save results as JSON in this file')
+
+    args = parser.parse_args(args)
+
+    plogging.setLevel(logging.WARNING)
+
+    # nodes are expecting a password and some public key
+    os.environ.setdefault('SHARED_SECRET', 'benchmark')
+    os.environ.setdefault('SHARED_KEY',
+                          os.path.join(FIXTURES, 'dummy_rsa.pub'))
+
+    region = MockRegion(latency=args.latency,
+                        busy_rate=args.busy_rate,
+                        scale=args.scale,
+                        seed=args.seed)
+    region.install()
+
+    results = []
+    try:
+        for nodes in args.nodes:
+            result = run(nodes, region, facilities=args.facilities)
+            results.append(result)
+
+            for phase in result['phases']:
+                print("{:>6} nodes  {:<10} {:>9.3f}s wall {:>9.1f}s cloud "
+                      "{:>7} calls {:>5} busy".format(
+                          nodes, phase['phase'], phase['wall'],
+                          phase['cloud'], phase['calls'], phase['busy']))
+
+    finally:
+        region.uninstall()
+
+    if args.output:
+        with open(args.output, 'w') as stream:
+            json.dump({'latency': args.latency,
+                       'busy_rate': args.busy_rate,
+                       'scale': args.scale,
+                       'results': results},
+                      stream, indent=2, sort_keys=True)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""
+Benchmark of the processing of fittings plans
+
+Plans are generated with many facilities, blueprints, ranges of nodes and
+templated cloud-config. Then the benchmark measures time and memory spent
+to:
+
+* load the plan with ``PlumberyEngine.set_fittings()``
+* finalize blueprints with ``PlumberyFacility.finalize_blueprints()``
+* expand blueprints and ranges of nodes, with
+  ``PlumberyFacility.expand_blueprint()`` and
+  ``PlumberyFacility.list_nodes()``
+* expand cloud-config of each node with ``PlumberyText.expand_string()``
+
+No cloud API is involved. Results are appended to a history file, and each
+run is compared with the previous one made with the same parameters, so that
+regressions in the scaling of plan processing are caught early.
+
+Example::
+
+    $ python -m benchmarks.fittings --nodes 100 1000 10000 --templating 20
+
+"""
+
+from __future__ import absolute_import
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+from plumbery.engine import PlumberyEngine
+from plumbery.nodes import PlumberyNodes
+from plumbery.plogging import plogging
+from plumbery.text import PlumberyContext
+from plumbery.text import PlumberyNodeContext
+from plumbery.text import PlumberyText
+
+from benchmarks.plans import generate_plan
+from benchmarks.region import FIXTURES
+
+HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       'history.jsonl')
+
+STEPS = ('set_fittings', 'finalize_blueprints', 'expand_blueprint',
+         'expand_string')
+
+
+class Node(object):
+    """
+    Describes a node that would have been deployed
+
+    Only attributes used by :class:`plumbery.text.PlumberyNodeContext` are
+    provided.
+    """
+
+    def __init__(self, name, index):
+        self.id = '{:08x}-0000-0000-0000-000000000000'.format(index)
+        self.name = name
+        self.private_ips = ['10.{}.{}.{}'.format(
+            index // 65536 % 256, index // 256 % 256, index % 256)]
+        self.public_ips = []
+        self.extra = {'ipv6': '2607:f480:1111:1153::{:x}'.format(index)}
+
+
+def measure(function):
+    """
+    Measures time and memory spent by some function
+
+    :param function: the code to be measured
+    :type function: ``callable``
+
+    :return: the result of the function, seconds, and peak of memory in KiB
+    :rtype: ``tuple``
+
+    """
+
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+
+    t0 = time.time()
+    result = function()
+    elapsed = time.time() - t0
+
+    peak = None
+    if tracemalloc is not None:
+        peak = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+
+    return result, elapsed, peak
+
+
+def run(plan):
+    """
+    Processes one fittings plan
+
+    :param plan: the fittings plan
+    :type plan: ``str``
+
+    :return: measurements, step by step
+    :rtype: ``dict``
+
+    """
+
+    steps = {}
+
+    def load():
+        engine = PlumberyEngine()
+        engine.set_fittings(plan)
+        return engine
+
+    engine, elapsed, peak = measure(load)
+    steps['set_fittings'] = (elapsed, peak)
+
+    def finalize():
+        for facility in engine.facilities:
+            facility.finalize_blueprints()
+
+    _, elapsed, peak = measure(finalize)
+    steps['finalize_blueprints'] = (elapsed, peak)
+
+    def expand():
+        labels = []
+        for facility in engine.facilities:
+            names = facility.expand_blueprint('*')
+            facility.expand_blueprint('basement')
+            for name in names:
+                facility.expand_blueprint(name)
+            labels += [(facility, name) for name in facility.list_nodes()]
+        return labels
+
+    labels, elapsed, peak = measure(expand)
+    steps['expand_blueprint'] = (elapsed, peak)
+
+    def render():
+        count = 0
+        context = PlumberyContext(context=engine)
+        for facility in engine.facilities:
+            for name in facility.expand_blueprint('*'):
+                blueprint = facility.get_blueprint(name)
+                for item in blueprint.get('nodes', []):
+                    label = list(item)[0]
+                    settings = item[label]
+                    if 'cloud-config' not in settings:
+                        continue
+
+                    for name in PlumberyNodes.expand_labels(label):
+                        node = Node(name, count)
+                        environment = PlumberyNodeContext(node=node,
+                                                          context=context)
+                        PlumberyText.expand_string(settings['cloud-config'],
+                                                   environment)
+                        count += 1
+        return count
+
+    count, elapsed, peak = measure(render)
+    steps['expand_string'] = (elapsed, peak)
+
+    return {
+        'facilities': len(engine.facilities),
+        'nodes': len(labels),
+        'rendered': count,
+        'steps': dict((key, {'seconds': round(value[0], 4),
+                             'peak_kib': value[1]})
+                      for key, value in steps.items())}
+
+
+def get_revision():
+    """
+    Tells which version of the code is measured
+    """
+
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.STDOUT).decode('utf-8').strip()
+    except Exception:
+        return None
+
+
+def load_history(path):
+    """
+    Loads previous runs from a history file
+
+    :param path: the file that contains one JSON document per line
+    :type path: ``str``
+
+    :return: previous runs, oldest first
+    :rtype: ``list`` of ``dict``
+
+    """
+
+    history = []
+    if path is None or not os.path.isfile(path):
+        return history
+
+    with open(path, 'r') as stream:
+        for line in stream:
+            line = line.strip()
+            if line:
+                history.append(json.loads(line))
+
+    return history
+
+
+def compare(current, previous, threshold):
+    """
+    Spots regressions between two runs
+
+    :param current: the latest run
+    :type current: ``dict``
+
+    :param previous: the reference run
+    :type previous: ``dict``
+
+    :param threshold: the tolerated increase, e.g., 0.2 for 20%
+    :type threshold: ``float``
+
+    :return: human-readable descriptions of regressions
+    :rtype: ``list`` of ``str``
+
+    """
+
+    regressions = []
+    reference = dict((item['plan']['nodes'], item)
+                     for item in previous['results'])
+
+    for item in current['results']:
+        before = reference.get(item['plan']['nodes'])
+        if before is None:
+            continue
+
+        for step in STEPS:
+            old = before['steps'][step]['seconds']
+            new = item['steps'][step]['seconds']
+
+            # ignore noise on very fast steps
+            if old < 0.01 and new < 0.01:
+                continue
+
+            if new > old * (1.0 + threshold):
+                regressions.append(
+                    "{} nodes: {} took {:.3f}s instead of {:.3f}s".format(
+                        item['plan']['nodes'], step, new, old))
+
+    return regressions
+
+
+def main(args=None):
+    """
+    Runs benchmarks from the command line
+    """
+
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.fittings',
+        description='Benchmark the processing of fittings plans.')
+
+    parser.add_argument(
+        '--nodes', nargs='+', type=int, default=[100, 1000],
+        help='Sizes of generated plans, e.g., 100 1000 10000')
+
+    parser.add_argument(
+        '--facilities', type=int, default=5,
+        help='Number of facilities in each plan')
+
+    parser.add_argument(
+        '--blueprints', type=int, default=10,
+        help='Number of blueprints per facility')
+
+    parser.add_argument(
+        '--ranges', type=int, default=2,
+        help='Number of node ranges per blueprint')
+
+    parser.add_argument(
+        '--templating', type=int, default=20,
+        help='Number of templated cloud-config lines per range of nodes')
+
+    parser.add_argument(
+        '--history', default=HISTORY,
+        help='File where results are accumulated over time')
+
+    parser.add_argument(
+        '--threshold', type=float, default=0.2,
+        help='Tolerated slowdown before a regression is reported')
+
+    parser.add_argument(
+        '--fail-on-regression', action='store_true',
+        help='Exit with an error if some regression has been found')
+
+    args = parser.parse_args(args)
+
+    plogging.setLevel(logging.WARNING)
+
+    # nodes are expecting some public key
+    os.environ.setdefault('SHARED_KEY',
+                          os.path.join(FIXTURES, 'dummy_rsa.pub'))
+
+    settings = {'facilities': args.facilities,
+                'blueprints': args.blueprints,
+                'ranges': args.ranges,
+                'templating': args.templating}
+
+    locations = ['XY{}'.format(index+1) for index in range(args.facilities)]
+
+    # secrets generated while expanding templates are saved in the
+    # current directory
+    here = os.getcwd()
+    working = tempfile.mkdtemp()
+    os.chdir(working)
+
+    results = []
+    try:
+        for nodes in args.nodes:
+            plan = generate_plan(nodes=nodes,
+                                 locations=locations,
+                                 aliases=True,
+                                 parameters=True,
+                                 **settings)
+
+            result = run(plan)
+            result['plan'] = dict(settings, nodes=nodes, size=len(plan))
+            results.append(result)
+
+            for step in STEPS:
+                figures = result['steps'][step]
+                print("{:>7} nodes  {:<20} {:>9.4f}s {:>10} KiB".format(
+                    nodes, step, figures['seconds'],
+                    figures['peak_kib'] if figures['peak_kib'] else '-'))
+
+    finally:
+        os.chdir(here)
+        shutil.rmtree(working)
+
+    current = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'revision': get_revision(),
+               'python': platform.python_version(),
+               'settings': settings,
+               'results': results}
+
+    regressions = []
+    history = [item for item in load_history(args.history)
+               if item.get('settings') == settings
+               and item.get('python') == current['python']]
+    if len(history) > 0:
+        regressions = compare(current, history[-1], args.threshold)
+        if len(regressions) > 0:
+            print("Regressions since {}:".format(
+                history[-1].get('revision') or history[-1]['time']))
+            for line in regressions:
+                print("- {}".format(line))
+        else:
+            print("No regression since {}".format(
+                history[-1].get('revision') or history[-1]['time']))
+
+    if args.history:
+        with open(args.history, 'a') as stream:
+            stream.write(json.dumps(current, sort_keys=True)+'\n')
+
+    if args.fail_on_regression and len(regressions) > 0:
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Generator of fittings plans, for benchmarks
+
+Plans are built with a given number of nodes, spread over blueprints and
+over facilities. Nodes are declared with ranges, e.g., ``web[1..50]``, the
+same way a human being would write a large plan.
+
+Example::
+
+    from benchmarks.plans import generate_plan
+
+    plan = generate_plan(nodes=100, facilities=2)
+    engine = PlumberyEngine(plan)
+
+"""
+
+from __future__ import absolute_import
+
+import yaml
+
+__all__ = ['generate_plan', 'generate_documents']
+
+# locations that are known from fixtures of the test suite
+LOCATIONS = ('NA9', 'NA12', 'NA1', 'NA3', 'NA5')
+
+# image that is known from fixtures of the test suite
+APPLIANCE = 'RedHat 6 64-bit 4 CPU'
+
+# nodes that can fit in one Ethernet network, with some spare addresses
+NODES_PER_BLUEPRINT = 200
+
+
+def generate_documents(nodes=10, blueprints=1, facilities=1,
+                       locations=LOCATIONS, ranges=1, templating=0,
+                       aliases=False, parameters=False):
+    """
+    Builds the documents of a fittings plan
+
+    :param nodes: the total number of nodes in the plan
+    :type nodes: ``int``
+
+    :param blueprints: the number of blueprints per facility
+    :type blueprints: ``int``
+
+    :param facilities: the number of facilities
+    :type facilities: ``int``
+
+    :param locations: identifiers of data centres to be used
+    :type locations: ``list`` of ``str``
+
+    :param ranges: the number of node ranges per blueprint,
+        e.g., 2 for ``web-a[1..10]`` and ``web-b[1..10]``
+    :type ranges: ``int``
+
+    :param templating: the number of templated lines in the cloud-config
+        of each range of nodes, or 0 for no cloud-config at all
+    :type templating: ``int``
+
+    :param aliases: add a blueprint that designates all others, and
+        a basement, at each facility
+    :type aliases: ``bool``
+
+    :param parameters: declare parameters and use them in the plan
+    :type parameters: ``bool``
+
+    :return: the documents of the fittings plan
+    :rtype: ``list`` of ``dict``
+
+    Blueprints are added if needed, so that each of them fits in a single
+    Ethernet network.
+
+    """
+
+    if facilities > len(locations):
+        raise ValueError("Only {} locations are available".format(
+            len(locations)))
+
+    per_facility = -(-nodes // facilities)
+    blueprints = max(blueprints, -(-per_facility // NODES_PER_BLUEPRINT))
+
+    documents = [{
+        'safeMode': False,
+        'information': ["Generated plan with {} nodes".format(nodes)],
+        'defaults': {
+            'domain': {'ipv4': 'auto'},
+            'cloud-config': {
+                'disable_root': False,
+                'ssh_pwauth': True}}}]
+
+    domain = 'Domain{}'
+    if parameters:
+        documents[0]['parameters'] = {
+            'domainName': {
+                'information': ["the prefix of network domains"],
+                'type': 'str',
+                'default': 'Domain'},
+            'appliance': {
+                'information': ["the image used by all nodes"],
+                'type': 'str',
+                'default': APPLIANCE}}
+        domain = '{{{{ parameter.domainName }}}}{}'
+
+    remaining = nodes
+    for facility in range(facilities):
+        items = []
+
+        here = min(remaining, per_facility)
+        remaining -= here
+
+        for blueprint in range(blueprints):
+            count = min(here, -(-per_facility // blueprints))
+            here -= count
+
+            name = 'blueprint{}'.format(blueprint+1)
+
+            settings = {
+                'domain': {
+                    'name': domain.format(facility+1),
+                    'description': "Benchmark at {}".format(
+                        locations[facility])},
+                'ethernet': {
+                    'name': 'Network{}'.format(blueprint+1),
+                    'subnet': '10.{}.{}.0'.format(facility % 256,
+                                                  blueprint % 256)}}
+
+            if count > 0:
+                settings['nodes'] = []
+
+                for index in range(ranges):
+                    size = min(count, -(-count // (ranges-index)))
+                    count -= size
+                    if size < 1:
+                        continue
+
+                    label = '{}-{}[1..{}]'.format(
+                        name, _letters(index), size)
+                    settings['nodes'].append({label: _generate_node(
+                        name, templating, parameters)})
+
+            items.append({name: settings})
+
+        document = {
+            'locationId': locations[facility],
+            'regionId': 'dd-na',
+            'blueprints': items}
+
+        if aliases:
+            names = [list(item)[0] for item in items]
+            items.append({'all': ' '.join(names)})
+            document['basement'] = names[0]
+
+        documents.append(document)
+
+    return documents
+
+
+def _letters(index):
+    """
+    Names a range of nodes, e.g., 'a', 'b', ..., 'z', 'aa', 'ab'
+    """
+
+    letters = ''
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index-1, 26)
+        letters = chr(ord('a')+remainder) + letters
+    return letters
+
+
+def _generate_node(blueprint, templating, parameters):
+    """
+    Describes a range of nodes, with some cloud-config
+    """
+
+    settings = {
+        'appliance': APPLIANCE,
+        'description': 'benchmark'}
+
+    if parameters:
+        settings['appliance'] = '{{ parameter.appliance }}'
+
+    if templating < 1:
+        return settings
+
+    tokens = ('node.name', 'node.private', 'node.ipv6', 'node.id',
+              'node.private_host', 'plumbery.version',
+              '{}-a1.private'.format(blueprint))
+
+    lines = []
+    for index in range(templating):
+        lines.append("echo '{{{{ {} }}}} line {}' >> /root/benchmark".format(
+            tokens[index % len(tokens)], index))
+
+    settings['cloud-config'] = {
+        'hostname': '{{ node.name }}',
+        'write_files': [{
+            'path': '/etc/benchmark',
+            'content': '\n'.join(lines)}],
+        'runcmd': lines}
+
+    return settings
+
+
+def generate_plan(**kwargs):
+    """
+    Builds a fittings plan, as YAML text
+
+    Arguments are the same as for :func:`generate_documents`.
+
+    :return: the fittings plan
+    :rtype: ``str``
+
+    """
+
+    return yaml.safe_dump_all(generate_documents(**kwargs),
+                              explicit_start=True,
+                              default_flow_style=False)
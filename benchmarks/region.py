@@ -0,0 +1,935 @@
+"""
+A simulated CloudControl region, for end-to-end benchmarks
+
+The region keeps track of network domains, Ethernet networks, servers,
+address translation rules, firewall rules and public IPv4 blocks, so that
+plumbery can build, start, polish, stop and destroy a fittings plan as if it
+was talking to a real data centre.
+
+The region is plugged into Apache Libcloud as a connection class, the same
+way ``tests/mock_api.py`` is used by unit tests. Static resources, e.g., the
+list of data centres or the library of images, come from the fixtures of the
+test suite. Everything else is generated from the state of the region.
+
+Behaviour of the region can be tuned:
+
+* ``latency`` -- seconds spent on each request, to mimic network round trips
+* ``busy_rate`` -- probability that a change is rejected with RESOURCE_BUSY
+* ``delays`` -- virtual seconds spent by asynchronous changes, e.g., when
+  a server is deployed or stopped
+
+Asynchronous changes are accounted for on a :class:`VirtualClock`, so that
+benchmarks do not wait for minutes when plumbery polls the API. When the
+clock is installed, calls to ``time.sleep()`` are shortened by the same
+scale factor.
+
+Example::
+
+    from benchmarks.region import MockRegion
+
+    region = MockRegion(latency=0.01, busy_rate=0.05)
+    region.install()
+    try:
+        engine.do('deploy')
+    finally:
+        region.uninstall()
+
+    print(region.get_counts())
+
+"""
+
+from __future__ import absolute_import
+
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+from xml.etree import ElementTree as ET
+
+from libcloud.common.dimensiondata import DimensionDataConnection
+from libcloud.test import MockHttp
+from libcloud.utils.py3 import httplib
+from libcloud.utils.py3 import u
+
+__all__ = ['MockRegion', 'VirtualClock']
+
+NAMESPACE = 'urn:didata.com:api:cloud:types'
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        '..', 'tests', 'fixtures')
+
+ORGANISATION = '8a8f6abc-2745-4d8a-9cbc-8dabe5a7d0e4'
+
+DEFAULT_DELAYS = {
+    'deployNetworkDomain': 120,
+    'deleteNetworkDomain': 60,
+    'deployVlan': 60,
+    'deleteVlan': 30,
+    'deployServer': 300,
+    'startServer': 30,
+    'shutdownServer': 60,
+    'powerOffServer': 10,
+    'rebootServer': 60,
+    'resetServer': 20,
+    'deleteServer': 60,
+    'reconfigureServer': 30,
+    'addNic': 20,
+    'removeNic': 20,
+}
+
+
+class VirtualClock(object):
+    """
+    Makes time run faster
+
+    :param scale: the ratio of real seconds to virtual seconds, e.g.,
+        0.01 to run a hundred times faster than wall clock
+    :type scale: ``float``
+
+    """
+
+    def __init__(self, scale=1.0):
+        self.scale = scale
+        self._sleep = time.sleep
+        self._time = time.time
+        self._origin = self._time()
+        self._patched = []
+
+    def time(self):
+        """
+        Provides virtual time, in seconds since the clock was created
+        """
+
+        return (self._time() - self._origin) / self.scale
+
+    def sleep(self, seconds):
+        """
+        Sleeps for some virtual seconds
+        """
+
+        self._sleep(seconds * self.scale)
+
+    def install(self):
+        """
+        Shortens every call to ``time.sleep()``
+        """
+
+        import libcloud.common.dimensiondata
+
+        for module in (time, libcloud.common.dimensiondata):
+            if module.sleep is not self.sleep:
+                self._patched.append((module, module.sleep))
+                module.sleep = self.sleep
+
+    def uninstall(self):
+        """
+        Restores the genuine ``time.sleep()``
+        """
+
+        while len(self._patched) > 0:
+            module, sleep = self._patched.pop()
+            module.sleep = sleep
+
+
+class MockRegion(object):
+    """
+    Simulates a region of the Managed Cloud Platform
+
+    :param latency: real seconds spent on each request
+    :type latency: ``float``
+
+    :param busy_rate: probability of RESOURCE_BUSY on each change
+    :type busy_rate: ``float``
+
+    :param delays: virtual seconds spent by asynchronous changes
+    :type delays: ``dict``
+
+    :param scale: ratio of real seconds to virtual seconds
+    :type scale: ``float``
+
+    :param seed: seed of random numbers, for reproducible runs
+    :type seed: ``int``
+
+    """
+
+    def __init__(self, latency=0.0, busy_rate=0.0, delays=None,
+                 scale=0.001, seed=None):
+
+        self.latency = latency
+        self.busy_rate = busy_rate
+        self.delays = dict(DEFAULT_DELAYS)
+        if delays:
+            self.delays.update(delays)
+        self.clock = VirtualClock(scale)
+        self.random = random.Random(seed)
+
+        self._lock = threading.RLock()
+        self._connections = None
+        self.reset()
+
+    def reset(self):
+        """
+        Removes every resource and forgets counters
+        """
+
+        with self._lock:
+            self.domains = {}
+            self.vlans = {}
+            self.servers = {}
+            self.nat_rules = {}
+            self.firewall_rules = {}
+            self.ip_blocks = {}
+            self.reserved = {}
+            self.counts = {}
+            self.busy = 0
+
+    def install(self):
+        """
+        Routes every request of Apache Libcloud to this region
+        """
+
+        region = self
+
+        class RegionHttp(MockHttp):
+
+            def request(self, method, url, body=None, headers=None,
+                        raw=False):
+
+                status, body = region.handle(method, url, body)
+                self.response = self.responseCls(
+                    status, body, {}, httplib.responses[status])
+
+        self._connections = DimensionDataConnection.conn_classes
+        DimensionDataConnection.conn_classes = (None, RegionHttp)
+        self.clock.install()
+
+    def uninstall(self):
+        """
+        Restores connections to the real world
+        """
+
+        if self._connections is not None:
+            DimensionDataConnection.conn_classes = self._connections
+            self._connections = None
+        self.clock.uninstall()
+
+    def get_counts(self):
+        """
+        Counts requests received so far, by operation
+
+        :return: a dictionary of operations, e.g., ``{'GET server': 12}``
+        :rtype: ``dict``
+
+        """
+
+        with self._lock:
+            return dict(self.counts)
+
+    def handle(self, method, url, body):
+        """
+        Processes one request
+
+        :param method: 'GET', 'POST', etc.
+        :type method: ``str``
+
+        :param url: the full path of the request
+        :type url: ``str``
+
+        :param body: the payload of the request, if any
+        :type body: ``str`` or ``None``
+
+        :return: HTTP status and body of the response
+        :rtype: ``tuple``
+
+        """
+
+        if self.latency > 0:
+            self.clock._sleep(self.latency)
+
+        path, _, query = url.partition('?')
+        params = {}
+        for item in query.split('&'):
+            if '=' in item:
+                key, value = item.split('=', 1)
+                params[key] = value
+
+        tokens = [token for token in path.split('/') if token]
+        if tokens[:2] == ['oec', '0.9'] and tokens[2:] == ['myaccount']:
+            tokens = ['myaccount']
+        elif tokens[:2] == ['caas', '2.2'] or tokens[:2] == ['oec', '0.9']:
+            tokens = tokens[3:]
+
+        resource = '/'.join(token for token in tokens
+                            if re.match(r'^[0-9a-f-]{36}$', token) is None)
+
+        with self._lock:
+            name = '{} {}'.format(method, resource)
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+            self._settle()
+
+            if method == 'POST' and self.busy_rate > 0:
+                if self.random.random() < self.busy_rate:
+                    self.busy += 1
+                    return self._busy(tokens[-1])
+
+            if body is not None and not isinstance(body, str):
+                body = body.decode('utf-8')
+
+            try:
+                return self._route(method, tokens, params, body)
+
+            except KeyError as feedback:
+                return self._error('RESOURCE_NOT_FOUND',
+                                   "Unknown resource {}".format(feedback))
+
+    def _route(self, method, tokens, params, body):
+
+        if tokens == ['myaccount']:
+            return self._fixture('oec_0_9_myaccount.xml')
+
+        if tokens == ['infrastructure', 'datacenter']:
+            return self._fixture(
+                'caas_2_2_{}_infrastructure_datacenter.xml'.format(
+                    ORGANISATION.replace('-', '_')))
+
+        if tokens == ['image', 'osImage']:
+            return self._fixture(
+                'caas_2_2_{}_image_osImage.xml'.format(
+                    ORGANISATION.replace('-', '_')))
+
+        if tokens == ['image', 'customerImage']:
+            return self._fixture(
+                'caas_2_2_{}_image_customerImage.xml'.format(
+                    ORGANISATION.replace('-', '_')))
+
+        handler = getattr(self, '_{}_{}'.format(
+            method.lower(), '_'.join(token for token in tokens
+                                     if re.match(r'^[0-9a-f-]{36}$', token)
+                                     is None)), None)
+        if handler is None:
+            return self._error('UNEXPECTED_ERROR',
+                               "Not simulated: {} {}".format(
+                                   method, '/'.join(tokens)))
+
+        identifier = None
+        if re.match(r'^[0-9a-f-]{36}$', tokens[-1]):
+            identifier = tokens[-1]
+
+        request = None
+        if body:
+            request = ET.fromstring(body)
+
+        return handler(identifier=identifier, params=params, request=request)
+
+    # asynchronous changes
+
+    def _change(self, item, operation, state='PENDING_CHANGE', then=None,
+                action=None):
+        """
+        Starts an asynchronous change on some resource
+        """
+
+        item['state'] = state
+        item['action'] = action
+        item['ready'] = self.clock.time() + self.delays.get(operation, 0)
+        item['then'] = then
+
+    def _settle(self):
+        """
+        Completes asynchronous changes that are over
+        """
+
+        now = self.clock.time()
+        for collection in (self.domains, self.vlans, self.servers):
+            for key in list(collection):
+                item = collection[key]
+                if item.get('ready') is None or item['ready'] > now:
+                    continue
+
+                then = item['then']
+                item['ready'] = None
+                item['action'] = None
+                item['state'] = 'NORMAL'
+                if then is not None:
+                    then(item)
+
+    def _is_busy(self, item):
+        return item.get('ready') is not None
+
+    # responses
+
+    def _fixture(self, name):
+        with open(os.path.join(FIXTURES, name)) as stream:
+            return httplib.OK, u(stream.read())
+
+    def _response(self, operation, message, info={}):
+        lines = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>',
+                 '<response xmlns="{}" requestId="{}">'.format(
+                     NAMESPACE, uuid.uuid4()),
+                 '<operation>{}</operation>'.format(operation),
+                 '<responseCode>IN_PROGRESS</responseCode>',
+                 '<message>{}</message>'.format(message)]
+        for key in sorted(info):
+            lines.append('<info name="{}" value="{}"/>'.format(
+                key, info[key]))
+        lines.append('</response>')
+        return httplib.OK, '\n'.join(lines)
+
+    def _error(self, code, message):
+        return httplib.BAD_REQUEST, '\n'.join([
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>',
+            '<response xmlns="{}" requestId="{}">'.format(
+                NAMESPACE, uuid.uuid4()),
+            '<operation>ERROR</operation>',
+            '<responseCode>{}</responseCode>'.format(code),
+            '<message>{}</message>'.format(message),
+            '</response>'])
+
+    def _busy(self, operation):
+        return self._error('RESOURCE_BUSY',
+                           "Cannot {} now, please retry later".format(
+                               operation))
+
+    def _page(self, tag, items, params):
+        """
+        Lists items in pages, as the API does
+
+        The driver raises StopIteration from within its generator of pages
+        when a page is empty, which recent versions of Python turn into a
+        RuntimeError. Therefore empty pages carry a dummy element that is
+        ignored by parsers.
+        """
+
+        size = int(params.get('pageSize', 250))
+        number = int(params.get('pageNumber', 1))
+        page = items[(number-1)*size:number*size]
+
+        lines = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>',
+                 '<{} xmlns="{}" pageNumber="{}" pageCount="{}" '
+                 'totalCount="{}" pageSize="{}">'.format(
+                     tag, NAMESPACE, number, len(page), len(items), size)]
+        lines += page
+        if len(page) < 1:
+            lines.append('<empty/>')
+        lines.append('</{}>'.format(tag))
+        return httplib.OK, '\n'.join(lines)
+
+    @staticmethod
+    def _find(element, name):
+        if element is None:
+            return None
+        for item in element.iter():
+            if item.tag.split('}')[-1] == name:
+                return item
+        return None
+
+    @classmethod
+    def _text(cls, element, name, default=None):
+        item = cls._find(element, name)
+        if item is None or item.text is None:
+            return default
+        return item.text.strip()
+
+    # network domains
+
+    def _to_domain(self, domain):
+        return '\n'.join([
+            '<networkDomain xmlns="{}" id="{}" datacenterId="{}">'.format(
+                NAMESPACE, domain['id'], domain['location']),
+            '<name>{}</name>'.format(domain['name']),
+            '<description>{}</description>'.format(domain['description']),
+            '<type>{}</type>'.format(domain['type']),
+            '<snatIpv4Address>{}</snatIpv4Address>'.format(domain['snat']),
+            '<createTime>2016-01-01T00:00:00.000Z</createTime>',
+            '<state>{}</state>'.format(domain['state']),
+            '</networkDomain>'])
+
+    def _get_network_networkDomain(self, identifier, params, request):
+        if identifier is not None:
+            return httplib.OK, self._to_domain(self.domains[identifier])
+
+        items = [self._to_domain(domain)
+                 for domain in self.domains.values()
+                 if params.get('datacenterId') in (None, domain['location'])]
+        return self._page('networkDomains', items, params)
+
+    def _post_network_deployNetworkDomain(self, identifier, params, request):
+        domain = {
+            'id': str(uuid.uuid4()),
+            'location': self._text(request, 'datacenterId'),
+            'name': self._text(request, 'name'),
+            'description': self._text(request, 'description', ''),
+            'type': self._text(request, 'type', 'ESSENTIALS'),
+            'snat': '168.128.{}.{}'.format(
+                self.random.randint(1, 254), self.random.randint(1, 254))}
+        self._change(domain, 'deployNetworkDomain', 'PENDING_ADD')
+        self.domains[domain['id']] = domain
+
+        return self._response('DEPLOY_NETWORK_DOMAIN',
+                              'Request to deploy Network Domain',
+                              {'networkDomainId': domain['id']})
+
+    def _post_network_deleteNetworkDomain(self, identifier, params, request):
+        domain = self.domains[self._find(request, 'deleteNetworkDomain')
+                              .get('id')]
+        if self._is_busy(domain):
+            return self._busy('deleteNetworkDomain')
+
+        for vlan in self.vlans.values():
+            if vlan['domain'] == domain['id']:
+                return self._error('HAS_DEPENDENCY',
+                                   'Network domain still has VLANs')
+
+        for server in self.servers.values():
+            if server['domain'] == domain['id']:
+                return self._error('HAS_DEPENDENCY',
+                                   'Network domain still has servers')
+
+        def forget(item):
+            self.domains.pop(item['id'], None)
+
+        self._change(domain, 'deleteNetworkDomain', 'PENDING_DELETE', forget)
+        return self._response('DELETE_NETWORK_DOMAIN',
+                              'Request to delete Network Domain')
+
+    # Ethernet networks
+
+    def _to_vlan(self, vlan):
+        domain = self.domains[vlan['domain']]
+        base = vlan['address'].rsplit('.', 1)[0]
+        return '\n'.join([
+            '<vlan xmlns="{}" id="{}" datacenterId="{}">'.format(
+                NAMESPACE, vlan['id'], domain['location']),
+            '<networkDomain id="{}" name="{}"/>'.format(
+                domain['id'], domain['name']),
+            '<name>{}</name>'.format(vlan['name']),
+            '<description>{}</description>'.format(vlan['description']),
+            '<privateIpv4Range address="{}" prefixSize="{}"/>'.format(
+                vlan['address'], vlan['prefix']),
+            '<ipv4GatewayAddress>{}.1</ipv4GatewayAddress>'.format(base),
+            '<ipv6Range address="2607:f480:1111:1153:0:0:0:0" '
+            'prefixSize="64"/>',
+            '<ipv6GatewayAddress>2607:f480:1111:1153:0:0:0:1'
+            '</ipv6GatewayAddress>',
+            '<createTime>2016-01-01T00:00:00.000Z</createTime>',
+            '<state>{}</state>'.format(vlan['state']),
+            '</vlan>'])
+
+    def _get_network_vlan(self, identifier, params, request):
+        if identifier is not None:
+            return httplib.OK, self._to_vlan(self.vlans[identifier])
+
+        items = []
+        for vlan in self.vlans.values():
+            domain = self.domains[vlan['domain']]
+            if params.get('networkDomainId') not in (None, domain['id']):
+                continue
+            if params.get('datacenterId') not in (None, domain['location']):
+                continue
+            if params.get('name') not in (None, vlan['name']):
+                continue
+            items.append(self._to_vlan(vlan))
+
+        return self._page('vlans', items, params)
+
+    def _post_network_deployVlan(self, identifier, params, request):
+        domain = self.domains[self._text(request, 'networkDomainId')]
+        if self._is_busy(domain):
+            return self._busy('deployVlan')
+
+        address = self._text(request, 'privateIpv4BaseAddress')
+        for vlan in self.vlans.values():
+            if vlan['domain'] == domain['id'] and vlan['address'] == address:
+                return self._error('IP_ADDRESS_NOT_UNIQUE',
+                                   'Subnet is already in use')
+
+        vlan = {
+            'id': str(uuid.uuid4()),
+            'domain': domain['id'],
+            'name': self._text(request, 'name'),
+            'description': self._text(request, 'description', ''),
+            'address': address,
+            'prefix': self._text(request, 'privateIpv4PrefixSize', '24'),
+            'next': 10}
+        self._change(vlan, 'deployVlan', 'PENDING_ADD')
+        self.vlans[vlan['id']] = vlan
+
+        return self._response('DEPLOY_VLAN',
+                              'Request to deploy VLAN',
+                              {'vlanId': vlan['id']})
+
+    def _post_network_deleteVlan(self, identifier, params, request):
+        vlan = self.vlans[self._find(request, 'deleteVlan').get('id')]
+        if self._is_busy(vlan) or self._is_busy(self.domains[vlan['domain']]):
+            return self._busy('deleteVlan')
+
+        for server in self.servers.values():
+            if vlan['id'] in server['vlans']:
+                return self._error('HAS_DEPENDENCY',
+                                   'VLAN is still used by servers')
+
+        def forget(item):
+            self.vlans.pop(item['id'], None)
+
+        self._change(vlan, 'deleteVlan', 'PENDING_DELETE', forget)
+        return self._response('DELETE_VLAN', 'Request to delete VLAN')
+
+    def _get_network_reservedPrivateIpv4Address(self, identifier, params,
+                                                request):
+        items = []
+        for (vlan, address) in sorted(self.reserved):
+            if params.get('vlanId') not in (None, vlan):
+                continue
+            items.append('<ipv4 vlanId="{}">{}</ipv4>'.format(vlan, address))
+        return self._page('reservedPrivateIpv4Addresses', items, params)
+
+    def _post_network_reservePrivateIpv4Address(self, identifier, params,
+                                                request):
+        key = (self._text(request, 'vlanId'),
+               self._text(request, 'ipAddress'))
+        self.reserved[key] = True
+        return self._response('RESERVE_PRIVATE_IPV4_ADDRESS',
+                              'Address has been reserved')
+
+    # servers
+
+    def _allocate(self, vlan):
+        base = vlan['address'].rsplit('.', 1)[0]
+        used = set(address for (identifier, address) in self.reserved
+                   if identifier == vlan['id'])
+        while True:
+            vlan['next'] += 1
+            address = '{}.{}'.format(base, vlan['next'])
+            if address not in used:
+                return address
+
+    def _to_server(self, server):
+        domain = self.domains[server['domain']]
+        progress = ''
+        if server['action'] is not None:
+            progress = ('<progress><action>{}</action>'
+                        '<requestTime>2016-01-01T00:00:00.000Z</requestTime>'
+                        '<userName>plumbery</userName></progress>').format(
+                            server['action'])
+
+        nics = ['<additionalNic id="{}" privateIpv4="{}" vlanId="{}" '
+                'vlanName="{}" state="NORMAL"/>'.format(
+                    nic['id'], nic['address'], nic['vlan'],
+                    self.vlans[nic['vlan']]['name'])
+                for nic in server['nics'][1:]]
+
+        disks = ['<disk id="{}" scsiId="{}" sizeGb="{}" speed="{}" '
+                 'state="NORMAL"/>'.format(
+                     disk['id'], disk['scsi'], disk['size'], disk['speed'])
+                 for disk in server['disks']]
+
+        primary = server['nics'][0]
+        return '\n'.join([
+            '<server xmlns="{}" id="{}" datacenterId="{}">'.format(
+                NAMESPACE, server['id'], domain['location']),
+            '<name>{}</name>'.format(server['name']),
+            '<description>{}</description>'.format(server['description']),
+            '<operatingSystem id="REDHAT664" displayName="REDHAT6/64" '
+            'family="UNIX"/>',
+            '<cpu count="{}" speed="STANDARD" coresPerSocket="1"/>'.format(
+                server['cpu']),
+            '<memoryGb>{}</memoryGb>'.format(server['memory']),
+            '\n'.join(disks),
+            '<networkInfo networkDomainId="{}">'.format(domain['id']),
+            '<primaryNic id="{}" privateIpv4="{}" ipv6="{}" vlanId="{}" '
+            'vlanName="{}" state="NORMAL"/>'.format(
+                primary['id'], primary['address'],
+                '2607:f480:1111:1153:0:0:0:{:x}'.format(
+                    int(primary['address'].rsplit('.', 1)[1])),
+                primary['vlan'], self.vlans[primary['vlan']]['name']),
+            '\n'.join(nics),
+            '</networkInfo>',
+            '<sourceImageId>{}</sourceImageId>'.format(server['image']),
+            '<createTime>2016-01-01T00:00:00.000Z</createTime>',
+            '<deployed>{}</deployed>'.format(
+                'false' if server['state'] == 'PENDING_ADD' else 'true'),
+            '<started>{}</started>'.format(
+                'true' if server['started'] else 'false'),
+            '<state>{}</state>'.format(server['state']),
+            progress,
+            '<vmwareTools versionStatus="CURRENT" runningStatus="{}" '
+            'apiVersion="9354"/>'.format(
+                'RUNNING' if server['started'] else 'NOT_RUNNING'),
+            '<virtualHardware version="vmx-08" upToDate="false"/>',
+            '</server>'])
+
+    def _get_server_server(self, identifier, params, request):
+        if identifier is not None:
+            return httplib.OK, self._to_server(self.servers[identifier])
+
+        items = []
+        for server in self.servers.values():
+            domain = self.domains[server['domain']]
+            if params.get('networkDomainId') not in (None, domain['id']):
+                continue
+            if params.get('datacenterId') not in (None, domain['location']):
+                continue
+            if params.get('name') not in (None, server['name']):
+                continue
+            items.append(self._to_server(server))
+
+        return self._page('servers', items, params)
+
+    def _post_server_deployServer(self, identifier, params, request):
+        networkInfo = self._find(request, 'networkInfo')
+        domain = self.domains[networkInfo.get('networkDomainId')]
+        if self._is_busy(domain):
+            return self._busy('deployServer')
+
+        primary = self._find(networkInfo, 'primaryNic')
+        vlan = self.vlans[self._text(primary, 'vlanId')]
+        if self._is_busy(vlan):
+            return self._busy('deployServer')
+
+        address = self._text(primary, 'privateIpv4')
+        if address is None:
+            address = self._allocate(vlan)
+
+        start = self._text(request, 'start', 'true') == 'true'
+
+        server = {
+            'id': str(uuid.uuid4()),
+            'domain': domain['id'],
+            'name': self._text(request, 'name'),
+            'description': self._text(request, 'description', ''),
+            'image': self._text(request, 'imageId'),
+            'cpu': int(self._text(request, 'count', 2)),
+            'memory': int(self._text(request, 'memoryGb', 4)),
+            'disks': [{'id': str(uuid.uuid4()), 'scsi': 0,
+                       'size': 10, 'speed': 'STANDARD'}],
+            'nics': [{'id': str(uuid.uuid4()),
+                      'vlan': vlan['id'],
+                      'address': address}],
+            'vlans': [vlan['id']],
+            'started': False}
+
+        def deployed(item):
+            item['started'] = start
+
+        self._change(server, 'deployServer', 'PENDING_ADD', deployed,
+                     'DEPLOY_SERVER')
+        self.servers[server['id']] = server
+
+        return self._response('DEPLOY_SERVER',
+                              'Request to deploy Server',
+                              {'serverId': server['id']})
+
+    def _server_action(self, request, tag, operation, then):
+        server = self.servers[self._find(request, tag).get('id')]
+        if self._is_busy(server):
+            return self._busy(tag)
+
+        self._change(server, tag, then=then, action=operation)
+        return self._response(operation, 'Request to {}'.format(tag))
+
+    def _post_server_startServer(self, identifier, params, request):
+        def started(item):
+            item['started'] = True
+        return self._server_action(request, 'startServer',
+                                   'START_SERVER', started)
+
+    def _post_server_shutdownServer(self, identifier, params, request):
+        def stopped(item):
+            item['started'] = False
+        return self._server_action(request, 'shutdownServer',
+                                   'SHUTDOWN_SERVER', stopped)
+
+    def _post_server_powerOffServer(self, identifier, params, request):
+        def stopped(item):
+            item['started'] = False
+        return self._server_action(request, 'powerOffServer',
+                                   'POWER_OFF_SERVER', stopped)
+
+    def _post_server_rebootServer(self, identifier, params, request):
+        return self._server_action(request, 'rebootServer',
+                                   'REBOOT_SERVER', None)
+
+    def _post_server_resetServer(self, identifier, params, request):
+        return self._server_action(request, 'resetServer',
+                                   'RESET_SERVER', None)
+
+    def _post_server_deleteServer(self, identifier, params, request):
+        server = self.servers[self._find(request, 'deleteServer').get('id')]
+        if self._is_busy(server):
+            return self._busy('deleteServer')
+
+        if server['started']:
+            return self._error('SERVER_STARTED', 'Server is still running')
+
+        def forget(item):
+            self.servers.pop(item['id'], None)
+
+        self._change(server, 'deleteServer', 'PENDING_DELETE', forget,
+                     'DELETE_SERVER')
+        return self._response('DELETE_SERVER', 'Request to delete Server')
+
+    def _post_server_reconfigureServer(self, identifier, params, request):
+        server = self.servers[self._find(request, 'reconfigureServer')
+                              .get('id')]
+        if self._is_busy(server):
+            return self._busy('reconfigureServer')
+
+        cpu = self._text(request, 'cpuCount')
+        memory = self._text(request, 'memoryGb')
+
+        def reconfigured(item):
+            if cpu is not None:
+                item['cpu'] = int(cpu)
+            if memory is not None:
+                item['memory'] = int(memory)
+
+        self._change(server, 'reconfigureServer', then=reconfigured,
+                     action='RECONFIGURE_SERVER')
+        return self._response('RECONFIGURE_SERVER',
+                              'Request to reconfigure Server')
+
+    def _post_server_addNic(self, identifier, params, request):
+        server = self.servers[self._text(request, 'serverId')]
+        if self._is_busy(server):
+            return self._busy('addNic')
+
+        vlan = self.vlans[self._text(request, 'vlanId')]
+        nic = {'id': str(uuid.uuid4()),
+               'vlan': vlan['id'],
+               'address': self._allocate(vlan)}
+        server['nics'].append(nic)
+        server['vlans'].append(vlan['id'])
+
+        self._change(server, 'addNic', action='ADD_NIC')
+        return self._response('ADD_NIC', 'Request to add NIC',
+                              {'nicId': nic['id']})
+
+    def _post_server_removeNic(self, identifier, params, request):
+        nic = self._find(request, 'removeNic').get('id')
+        for server in self.servers.values():
+            for item in server['nics'][1:]:
+                if item['id'] != nic:
+                    continue
+
+                if self._is_busy(server):
+                    return self._busy('removeNic')
+
+                server['nics'].remove(item)
+                server['vlans'].remove(item['vlan'])
+                self._change(server, 'removeNic', action='REMOVE_NIC')
+                return self._response('REMOVE_NIC', 'Request to remove NIC')
+
+        raise KeyError(nic)
+
+    # address translation and firewall
+
+    def _get_network_natRule(self, identifier, params, request):
+        items = []
+        for rule in self.nat_rules.values():
+            if params.get('networkDomainId') not in (None, rule['domain']):
+                continue
+            items.append('\n'.join([
+                '<natRule id="{}" datacenterId="{}">'.format(
+                    rule['id'],
+                    self.domains[rule['domain']]['location']),
+                '<networkDomainId>{}</networkDomainId>'.format(
+                    rule['domain']),
+                '<internalIp>{}</internalIp>'.format(rule['internal']),
+                '<externalIp>{}</externalIp>'.format(rule['external']),
+                '<state>NORMAL</state>',
+                '</natRule>']))
+        return self._page('natRules', items, params)
+
+    def _post_network_createNatRule(self, identifier, params, request):
+        rule = {'id': str(uuid.uuid4()),
+                'domain': self._text(request, 'networkDomainId'),
+                'internal': self._text(request, 'internalIp'),
+                'external': self._text(request, 'externalIp')}
+        self.nat_rules[rule['id']] = rule
+        return self._response('CREATE_NAT_RULE', 'NAT rule has been created',
+                              {'natRuleId': rule['id']})
+
+    def _post_network_deleteNatRule(self, identifier, params, request):
+        self.nat_rules.pop(self._find(request, 'deleteNatRule').get('id'))
+        return self._response('DELETE_NAT_RULE', 'NAT rule has been deleted')
+
+    def _get_network_firewallRule(self, identifier, params, request):
+        items = []
+        for rule in self.firewall_rules.values():
+            if params.get('networkDomainId') not in (None, rule['domain']):
+                continue
+            items.append(rule['xml'])
+        return self._page('firewallRules', items, params)
+
+    def _post_network_createFirewallRule(self, identifier, params, request):
+        domain = self.domains[self._text(request, 'networkDomainId')]
+
+        identifier = str(uuid.uuid4())
+        xml = ET.tostring(request).decode('utf-8')
+        xml = re.sub(r'<(\w+:)?createFirewallRule[^>]*>',
+                     '<firewallRule id="{}" datacenterId="{}">'.format(
+                         identifier, domain['location']), xml)
+        xml = re.sub(r'</(\w+:)?createFirewallRule>',
+                     '<state>NORMAL</state></firewallRule>', xml)
+        xml = re.sub(r'<placement[^>]*/>', '', xml)
+        xml = re.sub(r'(\w+):(\w+)', r'\2', xml)
+        xml = re.sub(r' xmlns(:\w+)?="[^"]*"', '', xml)
+
+        self.firewall_rules[identifier] = {'id': identifier,
+                                           'domain': domain['id'],
+                                           'xml': xml}
+        return self._response('CREATE_FIREWALL_RULE',
+                              'Firewall rule has been created',
+                              {'firewallRuleId': identifier})
+
+    def _post_network_deleteFirewallRule(self, identifier, params, request):
+        self.firewall_rules.pop(
+            self._find(request, 'deleteFirewallRule').get('id'))
+        return self._response('DELETE_FIREWALL_RULE',
+                              'Firewall rule has been deleted')
+
+    def _get_network_publicIpBlock(self, identifier, params, request):
+        items = []
+        for block in self.ip_blocks.values():
+            if params.get('networkDomainId') not in (None, block['domain']):
+                continue
+            items.append('\n'.join([
+                '<publicIpBlock id="{}" datacenterId="{}">'.format(
+                    block['id'], self.domains[block['domain']]['location']),
+                '<networkDomainId>{}</networkDomainId>'.format(
+                    block['domain']),
+                '<baseIp>{}</baseIp>'.format(block['base']),
+                '<size>2</size>',
+                '<createTime>2016-01-01T00:00:00.000Z</createTime>',
+                '<state>NORMAL</state>',
+                '</publicIpBlock>']))
+        return self._page('publicIpBlocks', items, params)
+
+    def _post_network_addPublicIpBlock(self, identifier, params, request):
+        index = len(self.ip_blocks) * 2 + 10
+        block = {'id': str(uuid.uuid4()),
+                 'domain': self._text(request, 'networkDomainId'),
+                 'base': '168.128.{}.{}'.format(index // 250, index % 250)}
+        self.ip_blocks[block['id']] = block
+        return self._response('ADD_PUBLIC_IP_BLOCK',
+                              'Public IPv4 block has been added',
+                              {'ipBlockId': block['id']})
+
+    def _post_network_removePublicIpBlock(self, identifier, params, request):
+        self.ip_blocks.pop(
+            self._find(request, 'removePublicIpBlock').get('id'))
+        return self._response('REMOVE_PUBLIC_IP_BLOCK',
+                              'Public IPv4 block has been removed')
+
+    def _get_network_reservedPublicIpv4Address(self, identifier, params,
+                                               request):
+        items = []
+        for rule in self.nat_rules.values():
+            if params.get('networkDomainId') not in (None, rule['domain']):
+                continue
+            items.append('<ip>{}</ip>'.format(rule['external']))
+        return self._page('reservedPublicIpv4Addresses', items, params)
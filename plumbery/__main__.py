@@ -19,9 +19,11 @@ import logging
 import argparse
 import sys
 
+from plumbery.cache import cache
 from plumbery.engine import PlumberyEngine
 from plumbery import __version__
 from plumbery.plogging import plogging
+from plumbery.profiler import profiler
 
 
 def parse_args(args=[]):
@@ -73,6 +75,22 @@ def parse_args(args=[]):
         help='Safe mode, no actual change is made to the infrastructure',
         action='store_true')
 
+    parser.add_argument(
+        '--profile', metavar='FILE',
+        help='Report calls made to the cloud API, and save them as JSON',
+        default=None)
+
+    parser.add_argument(
+        '--cache', metavar='DIR',
+        help='Keep copies of remote plans, parameters and secrets '
+             'in this directory',
+        default=None)
+
+    parser.add_argument(
+        '--offline',
+        help='Use cached copies of remote documents, with no network',
+        action='store_true')
+
     group = parser.add_mutually_exclusive_group()
 
     group.add_argument(
@@ -224,6 +242,10 @@ def main(args=None, engine=None):
 
     # part 2 - get a valid and configured engine
 
+    if args.cache or args.offline:
+        cache.configure(directory=args.cache or cache.directory,
+                        offline=args.offline or cache.offline)
+
     if engine is None:
         try:
             engine = PlumberyEngine(args.fittings, args.parameters)
@@ -252,6 +274,15 @@ def main(args=None, engine=None):
 
         plogging.info(engine.document_elapsed())
 
+        if args.profile:
+            for line in profiler.report():
+                plogging.info(line)
+            profiler.dump(args.profile)
+
+        else:
+            for line in profiler.report():
+                plogging.debug(line)
+
     except Exception as feedback:
         if plogging.getEffectiveLevel() == logging.DEBUG:
             plogging.error("Unable to do '{}'".format(args.action))
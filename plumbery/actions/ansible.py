@@ -14,8 +14,10 @@
 # limitations under the License.
 
 import sys
+import tempfile
 
 from plumbery.actions.inventory import InventoryAction
+from plumbery.inventory import PlumberyInventory
 from plumbery.plogging import plogging
 
 
@@ -47,6 +49,14 @@ class AnsibleAction(InventoryAction):
 
     """
 
+    def open_inventory(self):
+        """
+        Keeps inventory records in a temporary file
+        """
+
+        return PlumberyInventory(stream=tempfile.TemporaryFile('w+'),
+                                 format='jsonl')
+
     def end(self):
         """
         Saves information gathered through the polishing sequence
@@ -127,7 +137,7 @@ class AnsibleAction(InventoryAction):
         hosts = []
         groups = {}
 
-        for item in self.inventory:
+        for item in self.inventory.read():
             host = item['name']
 
             if len(item['public_ips']) > 0:
@@ -173,3 +183,5 @@ class AnsibleAction(InventoryAction):
                 stream.write('{}\n'.format(host))
             stream.write('\n')
         stream.write('\n')
+
+        self.inventory.stream.close()
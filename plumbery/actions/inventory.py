@@ -13,10 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import sys
-import yaml
-
 from plumbery.action import PlumberyAction
+from plumbery.inventory import PlumberyInventory
 from plumbery.plogging import plogging
 
 
@@ -54,7 +52,26 @@ class InventoryAction(PlumberyAction):
 
         super(InventoryAction, self).begin(engine)
 
-        self.inventory = []
+        self.inventory = self.open_inventory()
+
+    def open_inventory(self):
+        """
+        Prepares the stream of inventory records
+
+        :return: a writer of records
+        :rtype: :class:`plumbery.inventory.PlumberyInventory`
+
+        """
+
+        fileName = self.get_parameter('output', None)
+        if fileName:
+            plogging.info("Writing inventory in '{}'".format(fileName))
+        else:
+            fileName = None
+            plogging.info("Showing the inventory")
+
+        return PlumberyInventory(fileName,
+                                 format=self.get_parameter('format', 'yaml'))
 
     def process(self, blueprint):
         plogging.info("- process blueprint")
@@ -69,15 +86,4 @@ class InventoryAction(PlumberyAction):
 
         """
 
-        if len(self.inventory) < 1:
-            return
-
-        fileName = self.get_parameter('output', None)
-        if fileName:
-            plogging.info("Writing inventory in '{}'".format(fileName))
-            stream = open(fileName, 'w')
-        else:
-            plogging.info("Showing the inventory")
-            stream = sys.stdout
-
-        stream.write(yaml.dump(self.inventory, default_flow_style=False))
+        self.inventory.close()
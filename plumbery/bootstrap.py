@@ -13,24 +13,57 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+"""
+Downloads fittings plans and related files
+
+Files are either given directly, or listed in a manifest file named
+``manifest.mf``, one file per line. A line can also provide the checksum
+of the file, e.g.::
+
+    fittings.yaml sha256:4a5c...
+    roles/web.yaml
+
+Files listed in a manifest are downloaded concurrently over a pool of
+connections. Partial downloads are resumed with HTTP ranges, and files
+are moved to their final name only once complete and verified.
+
+"""
+
 from __future__ import absolute_import
 
 import argparse
+import hashlib
+from multiprocessing.pool import ThreadPool
 import os
 import requests
 import six
 import sys
+import threading
 
 if six.PY2:
     from urlparse import urljoin as up
 else:
     from urllib.parse import urljoin as up
 
+# can be changed from the command line
+settings = {
+    'chunk_size': 1024 * 1024,
+    'workers': 4,
+}
+
+_local = threading.local()
+
 
 def parse_args(args):
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument('-d', '--debug', action='store_true')
     parser.add_argument('-o', '--output', help='output directory')
+    parser.add_argument('-c', '--chunk-size', type=int,
+                        default=settings['chunk_size'],
+                        help='bytes written at once, e.g., 1048576')
+    parser.add_argument('-w', '--workers', type=int,
+                        default=settings['workers'],
+                        help='files downloaded concurrently')
     parser.add_argument('files', nargs='+', help='The URL for remote files')
     return parser.parse_args(args)
 
@@ -38,6 +71,8 @@ def parse_args(args):
 def main(args):
     if args.output is None:
         args.output = os.getcwd()
+    settings['chunk_size'] = args.chunk_size
+    settings['workers'] = args.workers
     for url in args.files:
         filename = url.split('/')[-1]
         if filename == 'manifest.mf':
@@ -46,23 +81,203 @@ def main(args):
             download_file(url, args.output)
 
 
+def get_session():
+    """
+    Provides a session to the web server
+
+    Each thread has its own session, so that connections are kept alive
+    across files downloaded by the thread.
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        _local.session = session
+    return session
+
+
+def parse_manifest(lines):
+    """
+    Lists files and checksums from the content of a manifest
+
+    :param lines: lines of the manifest
+    :type lines: ``list`` of ``str``
+
+    :return: file names and checksums, e.g., ``('web.yaml', 'sha256:4a5c')``
+    :rtype: ``list`` of ``tuple``
+
+    """
+    entries = []
+    for line in lines:
+        tokens = line.split()
+        if len(tokens) < 1 or tokens[0].startswith('#'):
+            continue
+        checksum = tokens[1] if len(tokens) > 1 else None
+        entries.append((tokens[0], checksum))
+    return entries
+
+
 def download_manifest(url, output_dir):
     download_file(url, output_dir)
     with open(os.path.join(output_dir, 'manifest.mf'), 'r') as manifest_file:
-        lines = manifest_file.readlines()
-        for i in lines:
-            download_file(up(url, i), output_dir)
+        entries = parse_manifest(manifest_file.readlines())
+
+    def download(entry):
+        return download_file(up(url, entry[0]), output_dir,
+                             checksum=entry[1])
+
+    if settings['workers'] < 2 or len(entries) < 2:
+        return [download(entry) for entry in entries]
+
+    pool = ThreadPool(min(settings['workers'], len(entries)))
+    try:
+        return pool.map(download, entries)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def download_file(url, output_dir, checksum=None):
+    """
+    Downloads one file
+
+    :param url: the remote file
+    :type url: ``str``
 
+    :param output_dir: the directory where the file is written
+    :type output_dir: ``str``
 
-def download_file(url, output_dir):
+    :param checksum: the expected checksum, e.g., ``sha256:4a5c...``
+    :type checksum: ``str``
+
+    :return: the name of the local file
+    :rtype: ``str``
+
+    Data is written to a temporary file with the suffix ``.part``. The
+    ETag, or the Last-Modified date, of the remote file is kept beside it,
+    in a file with the suffix ``.part.version``.
+
+    If a partial file exists already, only the missing bytes are requested,
+    provided that the remote file can be checked. This is the case if a
+    checksum is given, or if a version has been recorded. In the latter
+    case the version is sent with ``If-Range``, and the server returns the
+    whole file if it has changed since the first attempt. Else the file is
+    downloaded again from the start.
+
+    """
     local_filename = url.split('/')[-1]
-    r = requests.get(url, stream=True)
-    with open(os.path.join(output_dir, local_filename), 'wb') as f:
-        for chunk in r.iter_content(chunk_size=1024): 
-            if chunk: # filter out keep-alive new chunks
-                f.write(chunk)
+    path = os.path.join(output_dir, local_filename)
+    partial = path + '.part'
+    version = partial + '.version'
+
+    validator = None
+    if os.path.isfile(version):
+        with open(version) as f:
+            validator = f.read().strip() or None
+
+    headers = {}
+    offset = 0
+    if os.path.isfile(partial) and (checksum is not None or validator):
+        offset = os.path.getsize(partial)
+        if offset > 0:
+            headers['Range'] = 'bytes={}-'.format(offset)
+            if validator:
+                headers['If-Range'] = validator
+
+    r = get_session().get(url, stream=True, headers=headers)
+    if offset > 0 and r.status_code == 416:  # nothing more to fetch
+        r.close()
+
+        # the partial file may come from another version of the file
+        if checksum is None:
+            os.remove(partial)
+            os.remove(version)
+            return download_file(url, output_dir)
+
+    else:
+        r.raise_for_status()
+        if offset > 0 and r.status_code == 206:
+            mode = 'ab'
+
+        else:
+            mode = 'wb'
+            validator = get_validator(r)
+            if validator:
+                with open(version, 'w') as f:
+                    f.write(validator)
+
+            elif os.path.exists(version):
+                os.remove(version)
+
+        with open(partial, mode) as f:
+            for chunk in r.iter_content(chunk_size=settings['chunk_size']):
+                if chunk:  # filter out keep-alive new chunks
+                    f.write(chunk)
+
+    if checksum is not None:
+        verify_file(partial, checksum)
+
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(partial, path)
+    if os.path.exists(version):
+        os.remove(version)
     return local_filename
 
+
+def get_validator(response):
+    """
+    Identifies the version of a remote file
+
+    :param response: the response to a download request
+    :type response: :class:`requests.Response`
+
+    :return: a value suitable for ``If-Range``, or ``None``
+    :rtype: ``str``
+
+    Weak entity tags cannot be used with ``If-Range``, therefore the date
+    of last modification is used instead.
+
+    """
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+
+    return response.headers.get('Last-Modified')
+
+
+def verify_file(path, checksum):
+    """
+    Checks the content of a file
+
+    :param path: the file to check
+    :type path: ``str``
+
+    :param checksum: the expected checksum, e.g., ``sha256:4a5c...``,
+        or a bare SHA-256 digest
+    :type checksum: ``str``
+
+    :raises: ``ValueError`` if the file does not match
+
+    A corrupted file is removed, so that it is downloaded again from the
+    start next time.
+
+    """
+    if ':' in checksum:
+        algorithm, expected = checksum.split(':', 1)
+    else:
+        algorithm, expected = 'sha256', checksum
+
+    digest = hashlib.new(algorithm.lower())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(settings['chunk_size']), b''):
+            digest.update(chunk)
+
+    if digest.hexdigest().lower() != expected.lower():
+        os.remove(path)
+        raise ValueError("Checksum mismatch for '{}'".format(
+            os.path.basename(path)))
+
+
 if __name__ == "__main__":
     args = parse_args(sys.argv[1:])
-    main(args)
\ No newline at end of file
+    main(args)
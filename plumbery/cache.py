@@ -0,0 +1,265 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import requests
+
+from plumbery.exception import PlumberyException
+from plumbery.plogging import plogging
+
+__all__ = ['PlumberyCache', 'cache']
+
+
+class PlumberyCache(object):
+    """
+    Keeps copies of remote documents on disk
+
+    :param directory: where documents are stored, or ``None`` to disable
+        the cache
+    :type directory: ``str``
+
+    :param offline: serve documents from the cache without network
+    :type offline: ``bool``
+
+    :param timeout: maximum number of seconds to wait for a web server
+    :type timeout: ``float``
+
+    Fittings plans, parameters and secrets can be fetched over the web.
+    When the cache is enabled, each document is stored once under the
+    SHA-256 digest of its content, and each URL points to the latest
+    document received for it. Next requests to the same URL are
+    conditional, with ``If-None-Match`` and ``If-Modified-Since``, so that
+    unchanged documents are not transferred again.
+
+    If the web server cannot be reached, does not answer in time, or
+    reports a server error, the cached copy is used. In offline mode, no
+    request is made at all.
+
+    Only documents that come with ``ETag`` or ``Last-Modified`` are cached,
+    so that resources that change on every request, e.g., a discovery token,
+    are always fetched from the web.
+
+    By default the cache is configured from environment variables
+    ``PLUMBERY_CACHE`` and ``PLUMBERY_OFFLINE``.
+
+    Example::
+
+        from plumbery.cache import cache
+
+        cache.configure(directory='.plumbery-cache')
+        text = cache.get('https://example.com/fittings.yaml')
+
+    """
+
+    def __init__(self, directory=None, offline=False, timeout=30):
+        self.configure(directory, offline, timeout)
+
+    def configure(self, directory=None, offline=False, timeout=30):
+        """
+        Changes the behaviour of the cache
+
+        :param directory: where documents are stored, or ``None`` to disable
+            the cache
+        :type directory: ``str``
+
+        :param offline: serve documents from the cache without network
+        :type offline: ``bool``
+
+        :param timeout: maximum number of seconds to wait for a web server
+        :type timeout: ``float``
+
+        """
+
+        self.directory = directory
+        self.offline = offline
+        self.timeout = timeout
+
+    def configure_from_environment(self):
+        """
+        Configures the cache from environment variables
+        """
+
+        offline = os.getenv('PLUMBERY_OFFLINE', '').lower()
+        self.configure(directory=os.getenv('PLUMBERY_CACHE') or None,
+                       offline=offline in ('1', 'true', 'yes'))
+
+    def get(self, url, timeout=None):
+        """
+        Fetches some remote document
+
+        :param url: the web address of the document
+        :type url: ``str``
+
+        :param timeout: maximum number of seconds to wait for the web server,
+            or ``None`` for the default value of the cache
+        :type timeout: ``float``
+
+        :return: the content of the document
+        :rtype: ``str``
+
+        """
+
+        if timeout is None:
+            timeout = self.timeout
+
+        if self.directory is None:
+            if self.offline:
+                raise PlumberyException(
+                    "Cannot fetch '{}' in offline mode".format(url))
+            return requests.get(url, timeout=timeout).text
+
+        entry = self._load_entry(url)
+
+        if self.offline:
+            if entry is None:
+                raise PlumberyException(
+                    "'{}' is not in cache".format(url))
+            plogging.debug("- using cached copy of '{}'".format(url))
+            return self._load_content(entry)
+
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = requests.get(url, headers=headers, timeout=timeout)
+
+        except requests.exceptions.RequestException as feedback:
+            if entry is None:
+                raise
+
+            plogging.warning("Unable to fetch '{}', using cached copy"
+                             .format(url))
+            plogging.debug(str(feedback))
+            return self._load_content(entry)
+
+        if response.status_code == 304 and entry is not None:
+            plogging.debug("- '{}' has not changed".format(url))
+            return self._load_content(entry)
+
+        if response.status_code >= 500 and entry is not None:
+            plogging.warning("Unable to fetch '{}', using cached copy"
+                             .format(url))
+            plogging.debug("- status code {}".format(response.status_code))
+            return self._load_content(entry)
+
+        if response.status_code == 200:
+            self._save(url, response)
+
+        return response.text
+
+    def _get_path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def _load_entry(self, url):
+        """
+        Retrieves what is known about some URL
+        """
+
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        try:
+            with open(self._get_path('urls', key+'.json'), 'r') as stream:
+                entry = json.load(stream)
+
+        except (IOError, OSError, ValueError):
+            return None
+
+        if not os.path.isfile(self._get_path('objects', entry['digest'])):
+            return None
+
+        return entry
+
+    def _load_content(self, entry):
+        """
+        Reads some document from the cache
+        """
+
+        with open(self._get_path('objects', entry['digest']), 'rb') as stream:
+            return stream.read().decode(entry.get('encoding') or 'utf-8')
+
+    def _save(self, url, response):
+        """
+        Stores some document in the cache
+        """
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        if 'no-store' in response.headers.get('Cache-Control', ''):
+            return
+
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        if not os.path.isfile(self._get_path('objects', digest)):
+            self._write(self._get_path('objects', digest), content)
+
+        entry = {'url': url,
+                 'digest': digest,
+                 'encoding': response.encoding,
+                 'etag': etag,
+                 'last_modified': last_modified,
+                 'fetched': time.strftime('%Y-%m-%dT%H:%M:%SZ',
+                                          time.gmtime())}
+
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        self._write(self._get_path('urls', key+'.json'),
+                    json.dumps(entry, sort_keys=True).encode('utf-8'))
+
+    def _write(self, path, content):
+        """
+        Writes a file atomically, so that concurrent runs share the cache
+        """
+
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+
+        handle, temporary = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(handle, 'wb') as stream:
+                stream.write(content)
+
+            if hasattr(os, 'replace'):  # Python 3
+                os.replace(temporary, path)
+            else:
+                if os.path.exists(path):
+                    os.remove(path)
+                os.rename(temporary, path)
+
+        except Exception:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+
+# the cache used by default
+cache = PlumberyCache()
+cache.configure_from_environment()
@@ -18,9 +18,9 @@ from __future__ import absolute_import
 import hashlib
 import os
 import random
-import requests
 import string
 import sys
+import threading
 import time
 import uuid
 import yaml
@@ -39,12 +39,19 @@ from libcloud.backup.types import Provider as BackupProvider
 
 from plumbery import __version__
 from plumbery.action import PlumberyActionLoader
+from plumbery.cache import cache
 from plumbery.exception import PlumberyException
 from plumbery.facility import PlumberyFacility
 from plumbery.plogging import plogging
 from plumbery.polisher import PlumberyPolisher
+from plumbery.profiler import profiler
 from plumbery.text import PlumberyText, PlumberyContext
+from plumbery.util import synchronize
 
+try:
+    process_time = time.process_time
+except AttributeError:  # Python 2
+    process_time = time.clock
 
 __all__ = ['PlumberyEngine']
 
@@ -123,7 +130,7 @@ class PlumberyEngine(object):
         :type plan: ``str`` or ``file`` or ``dict``
 
         """
-        self.c0 = time.clock()
+        self.c0 = process_time()
         self.t0 = time.time()
 
         self.defaults = {}
@@ -142,6 +149,10 @@ class PlumberyEngine(object):
 
         self.buildPolisher = 'configure'
 
+        self.jobs = []
+        self._jobs_lock = threading.Lock()
+        self._deferJobs = False
+
         self._sharedUser = None
         self._sharedSecret = None
         self._sharedKeyFiles = []
@@ -178,8 +189,7 @@ class PlumberyEngine(object):
         if isinstance(parameters, string_types):
 
             if parameters.startswith(("https://", "http://")):
-                response = requests.get(parameters)
-                parameters = response.text
+                parameters = cache.get(parameters)
             else:
                 parameters = open(parameters, 'r')
             parameters = yaml.load(parameters)
@@ -287,8 +297,7 @@ class PlumberyEngine(object):
             self.secretsId = hashlib.md5(plan.encode('utf-8')).hexdigest()
 
             if plan.startswith(("https://", "http://")):
-                response = requests.get(plan)
-                plan = response.text
+                plan = cache.get(plan)
 
             elif plan == '-':
                 plan = sys.stdin.read()
@@ -733,7 +742,7 @@ class PlumberyEngine(object):
 
         elif id.startswith('http://') or id.startswith('https://'):
             plogging.debug('- fetching {}'.format(id))
-            secret = requests.get(id).text
+            secret = cache.get(id)
 
         else:
             secret = ''.join(random.choice(
@@ -1021,7 +1030,7 @@ class PlumberyEngine(object):
         """
 
         if elapsed is None:
-            elapsed = int(time.clock() - self.c0 + 1)
+            elapsed = int(process_time() - self.c0 + 1)
 
         if www is None:
             www = int(time.time() - self.t0 + 1)
@@ -1075,6 +1084,19 @@ class PlumberyEngine(object):
 
         """
 
+        profiler.focus(action=action)
+
+        # background jobs overlap with the whole action
+        self._deferJobs = True
+        try:
+            self._do(action, blueprints, facilities)
+
+        finally:
+            self._deferJobs = False
+            self.join_jobs()
+
+    def _do(self, action, blueprints=None, facilities=None):
+
         if action == 'build':
             if blueprints is None:
                 self.build_all_blueprints(facilities)
@@ -1125,9 +1147,7 @@ class PlumberyEngine(object):
         elif action == 'refresh':
             if blueprints is None:
                 self.stop_all_blueprints(facilities)
-                self.wipe_all_blueprints(facilities)
-                time.sleep(30)
-                self.build_all_blueprints(facilities)
+                self.refresh_all_blueprints(facilities)
                 self.start_all_blueprints(facilities)
                 self.polish_all_blueprints(filter='prepare',
                                            facilities=facilities)
@@ -1135,9 +1155,7 @@ class PlumberyEngine(object):
                                            facilities=facilities)
             else:
                 self.stop_blueprint(blueprints, facilities)
-                self.wipe_blueprint(blueprints, facilities)
-                time.sleep(30)
-                self.build_blueprint(blueprints, facilities)
+                self.refresh_blueprint(blueprints, facilities)
                 self.start_blueprint(blueprints, facilities)
                 self.polish_blueprint(blueprints,
                                       filter='prepare',
@@ -1179,6 +1197,70 @@ class PlumberyEngine(object):
                                       filter=action,
                                       facilities=facilities)
 
+    def add_job(self, job):
+        """
+        Starts a job in the background
+
+        :param job: the job to be started, e.g., a terraform build
+        :type job: :class:`plumbery.terraform.TerraformJob`
+
+        Jobs that share the same terraform directory are run one after
+        the other. All jobs are joined at the end of the current action,
+        or at the end of the build if it has been triggered directly.
+
+        Blueprints can be built in separate threads, therefore jobs are
+        chained and recorded under a lock.
+
+        """
+
+        with self._jobs_lock:
+            for previous in self.jobs:
+                if previous.get_key() == job.get_key():
+                    job.after = previous
+
+            job.start()
+            self.jobs.append(job)
+
+    def join_jobs(self):
+        """
+        Waits for the completion of background jobs
+
+        :return: the labels of jobs that have failed
+        :rtype: ``list`` of ``str``
+
+        Failures are logged as errors, so that the exit status of plumbery
+        reflects them.
+
+        """
+
+        failed = []
+        while True:
+            with self._jobs_lock:
+                if len(self.jobs) < 1:
+                    break
+                job = self.jobs.pop(0)
+
+            if job.is_running():
+                plogging.info("Waiting for multicloud deployment '{}'".format(
+                    job.label))
+
+            if job.join():
+                plogging.info("Multicloud deployment '{}' has been completed"
+                              " in {:.0f} seconds".format(
+                                  job.label, job.elapsed or 0))
+
+            else:
+                plogging.error("Multicloud deployment '{}' has failed".format(
+                    job.label))
+                if job.error is not None:
+                    plogging.error(str(job.error))
+                else:
+                    plogging.error("- terraform exit status {}".format(
+                        job.status))
+                failed.append(job.label)
+
+        return failed
+
     def process_all_blueprints(self, action, facilities=None):
         """
         Handles elements described in the fittings plan
@@ -1291,6 +1373,9 @@ class PlumberyEngine(object):
         self.polish_all_blueprints(filter=self.buildPolisher,
                                    facilities=facilities)
 
+        if not self._deferJobs:
+            self.join_jobs()
+
     def build_blueprint(self, names, facilities=None):
         """
         Builds named blueprint from fittings plan
@@ -1333,6 +1418,9 @@ class PlumberyEngine(object):
                               filter=self.buildPolisher,
                               facilities=facilities)
 
+        if not self._deferJobs:
+            self.join_jobs()
+
     def start_all_blueprints(self, facilities=None):
         """
         Starts all nodes described in the fittings plan
@@ -1426,17 +1514,23 @@ class PlumberyEngine(object):
 
         plogging.info("Processing all blueprints")
 
-        for polisher in polishers:
-            polisher.go(self)
+        try:
+            for polisher in polishers:
+                polisher.go(self)
 
-        if facilities is not None:
-            facilities = self.list_facility(facilities)
-        else:
-            facilities = self.facilities
+            if facilities is not None:
+                facilities = self.list_facility(facilities)
+            else:
+                facilities = self.facilities
 
-        for facility in facilities:
-            facility.focus()
-            facility.polish_all_blueprints(polishers)
+            for facility in facilities:
+                facility.focus()
+                facility.polish_all_blueprints(polishers)
+
+        except (Exception, KeyboardInterrupt):
+            for polisher in polishers:
+                polisher.abort()
+            raise
 
         for polisher in polishers:
             polisher.reap()
@@ -1481,19 +1575,25 @@ class PlumberyEngine(object):
 
         plogging.info("Processing blueprint '{}'".format(label))
 
-        for polisher in polishers:
-            polisher.go(self)
+        try:
+            for polisher in polishers:
+                polisher.go(self)
 
-        if facilities is not None:
-            facilities = self.list_facility(facilities)
-        else:
-            facilities = self.facilities
+            if facilities is not None:
+                facilities = self.list_facility(facilities)
+            else:
+                facilities = self.facilities
 
-        for facility in facilities:
-            facility.focus()
+            for facility in facilities:
+                facility.focus()
+                for polisher in polishers:
+                    polisher.move_to(facility)
+                facility.polish_blueprint(names, polishers)
+
+        except (Exception, KeyboardInterrupt):
             for polisher in polishers:
-                polisher.move_to(facility)
-            facility.polish_blueprint(names, polishers)
+                polisher.abort()
+            raise
 
         for polisher in polishers:
             polisher.reap()
@@ -1628,6 +1728,81 @@ class PlumberyEngine(object):
             facility.focus()
             facility.wipe_blueprint(names)
 
+    def refresh_all_blueprints(self, facilities=None):
+        """
+        Destroys and rebuilds all nodes from fittings plan
+
+        :param facilities: explicit list of target facilities
+        :type facilities: ``str`` or ``list`` of ``str``
+
+        Each blueprint is rebuilt as soon as its own nodes have been
+        destroyed, while other blueprints are still being wiped.
+
+        Note:
+            Running nodes are always preserved from destruction.
+            Therefore the need to stop nodes before they can be refreshed.
+
+        """
+
+        plogging.info("Refreshing all blueprints")
+
+        if facilities is not None:
+            facilities = self.list_facility(facilities)
+        else:
+            facilities = self.facilities
+
+        for facility in facilities:
+            facility.focus()
+            facility.refresh_all_blueprints()
+
+        self.polish_all_blueprints(filter=self.buildPolisher,
+                                   facilities=facilities)
+
+        if not self._deferJobs:
+            self.join_jobs()
+
+    def refresh_blueprint(self, names, facilities=None):
+        """
+        Destroys and rebuilds nodes of one or several blueprint(s)
+
+        :param names: the name(s) of the blueprint(s) to refresh
+        :type names: ``str`` or ``list`` of ``str``
+
+        :param facilities: explicit list of target facilities
+        :type facilities: ``str`` or ``list`` of ``str``
+
+        Each blueprint is rebuilt as soon as its own nodes have been
+        destroyed, while other blueprints are still being wiped.
+
+        Note:
+            Running nodes are always preserved from destruction.
+            Therefore the need to stop nodes before they can be refreshed.
+
+        """
+
+        if isinstance(names, list):
+            label = ' '.join(names)
+        else:
+            label = names
+
+        plogging.info("Refreshing blueprint '{}'".format(label))
+
+        if facilities is not None:
+            facilities = self.list_facility(facilities)
+        else:
+            facilities = self.facilities
+
+        for facility in facilities:
+            facility.focus()
+            facility.refresh_blueprint(names)
+
+        self.polish_blueprint(names=names,
+                              filter=self.buildPolisher,
+                              facilities=facilities)
+
+        if not self._deferJobs:
+            self.join_jobs()
+
     def destroy_all_blueprints(self, facilities=None):
         """
         Destroys all blueprints from fittings plan
@@ -1710,7 +1885,8 @@ class PlumberyEngine(object):
             region=region,
             host=host)
 
-        return instance
+        synchronize(instance.connection)
+        return profiler.wrap(instance, 'compute')
 
     def get_balancer_driver(self, region=None, host=None):
         """
@@ -1725,7 +1901,8 @@ class PlumberyEngine(object):
             secret=self.get_user_password(),
             region=region,
             host=host)
-        return instance
+        synchronize(instance.connection)
+        return profiler.wrap(instance, 'balancer')
 
     def get_backup_driver(self, region=None, host=None):
         """
@@ -1740,7 +1917,8 @@ class PlumberyEngine(object):
             secret=self.get_user_password(),
             region=region,
             host=host)
-        return instance
+        synchronize(instance.connection)
+        return profiler.wrap(instance, 'backup')
 
     def lookup(self, token):
         """
@@ -14,9 +14,11 @@
 # limitations under the License.
 
 from __future__ import absolute_import
+from collections import OrderedDict
 import copy
 import socket
 import os
+import threading
 
 from plumbery.action import PlumberyActionLoader
 from plumbery.exception import PlumberyException
@@ -24,6 +26,8 @@ from plumbery.infrastructure import PlumberyInfrastructure
 from plumbery.plogging import plogging
 from plumbery.nodes import PlumberyNodes
 from plumbery.polisher import PlumberyPolisher
+from plumbery.profiler import profiler
+from plumbery.util import parallel
 
 __all__ = ['PlumberyFacility']
 
@@ -68,6 +72,7 @@ class PlumberyFacility(object):
         self.settings = {}
 
         self.blueprints = []
+        self._index = None
 
         for key in fittings.keys():
 
@@ -88,6 +93,11 @@ class PlumberyFacility(object):
         self._cache_images = []
         self._cache_network_domains = []
         self._cache_vlans = []
+        self._cache_nat_tables = {}
+        self._cache_ipv4_pools = {}
+
+        # blueprints are processed in threads that share the caches above
+        self._cache_lock = threading.RLock()
 
     def __repr__(self):
 
@@ -264,6 +274,9 @@ class PlumberyFacility(object):
                     if settings is None:
                         settings = {}
 
+                    # ranges of names are computed once and for all
+                    PlumberyNodes.expand_labels(label)
+
                     shell = {}
                     if 'default' in settings:
                         shell = copy.deepcopy(self.plumbery.get_default(
@@ -285,9 +298,59 @@ class PlumberyFacility(object):
 
                     blueprint['nodes'][index][label] = settings
 
-            for index in range(0, len(self.blueprints)):
-                if list(self.blueprints[index])[0] == blueprintName:
-                    self.blueprints[index][blueprintName] = blueprint
+            self._get_index()['blueprints'][blueprintName][blueprintName] = \
+                blueprint
+
+    def _get_index(self):
+        """
+        Indexes blueprints by name
+
+        :return: blueprints, names of actionable blueprints, and aliases
+        :rtype: ``dict``
+
+        The index is built once, and again only if the list of blueprints
+        is changed afterwards.
+
+        """
+
+        index = self._index
+        if (index is not None
+                and index['source'] is self.blueprints
+                and index['count'] == len(self.blueprints)):
+            return index
+
+        blueprints = OrderedDict()
+        names = []
+        duplicated = None
+        for blueprint in self.blueprints:
+            name = list(blueprint)[0]
+
+            if isinstance(blueprint[name], dict):
+                if name in names and duplicated is None:
+                    duplicated = name
+                names.append(name)
+
+            if name not in blueprints:
+                blueprints[name] = blueprint
+
+        aliases = {}
+        for name, blueprint in blueprints.items():
+            if isinstance(blueprint[name], dict):
+                continue
+
+            aliases[name] = [token
+                             for token in str(blueprint[name]).split(' ')
+                             if token in blueprints]
+
+        self._index = {
+            'source': self.blueprints,
+            'count': len(self.blueprints),
+            'blueprints': blueprints,
+            'names': names,
+            'duplicated': duplicated,
+            'aliases': aliases}
+
+        return self._index
 
     def update_settings(self, settings, additions):
         """
@@ -357,18 +420,12 @@ class PlumberyFacility(object):
           listed by this function.
         """
 
-        names = []
-        for blueprint in self.blueprints:
-            name = list(blueprint)[0]
-            if not isinstance(blueprint[name], dict):
-                continue
-
-            if name in names:
-                raise ValueError("Duplicated blueprint name '{}'".format(name))
+        index = self._get_index()
+        if index['duplicated'] is not None:
+            raise ValueError("Duplicated blueprint name '{}'".format(
+                index['duplicated']))
 
-            names.append(name)
-
-        return names
+        return list(index['names'])
 
     def expand_blueprint(self, labels):
         """
@@ -449,26 +506,23 @@ class PlumberyFacility(object):
             if isinstance(labels, str):
                 labels = labels.split(' ')
 
+        index = self._get_index()
+        seen = set()
         for label in labels:
 
-            for blueprint in self.blueprints:
-
-                name = list(blueprint)[0]
-                if name != label:
-                    continue
+            blueprint = index['blueprints'].get(label)
+            if blueprint is None:
+                continue
 
-                if isinstance(blueprint[name], dict):
-                    if label not in names:
-                        names.append(label)
-                else:
-                    for token in str(blueprint[name]).split(' '):
-                        if token in names:
-                            continue
+            if isinstance(blueprint[label], dict):
+                tokens = [label]
+            else:
+                tokens = index['aliases'][label]
 
-                        for scanning in self.blueprints:
-                            if token == list(scanning)[0]:
-                                names.append(token)
-                                break
+            for token in tokens:
+                if token not in seen:
+                    seen.add(token)
+                    names.append(token)
 
         if names != labels:
             if len(names) > 1:
@@ -494,17 +548,13 @@ class PlumberyFacility(object):
 
         """
 
-        for blueprint in self.blueprints:
-            if name == list(blueprint)[0]:
-
-                if not isinstance(blueprint[name], dict):
-                    return None
-
-                blueprint = blueprint[name]
-                blueprint['target'] = name
-                return blueprint
+        blueprint = self._get_index()['blueprints'].get(name)
+        if blueprint is None or not isinstance(blueprint[name], dict):
+            return None
 
-        return None
+        blueprint = blueprint[name]
+        blueprint['target'] = name
+        return blueprint
 
     def list_domains(self):
         """
@@ -563,6 +613,7 @@ class PlumberyFacility(object):
         """
 
         labels = []
+        seen = set()
 
         for blueprint in self.blueprints:
             name = list(blueprint)[0]
@@ -575,10 +626,11 @@ class PlumberyFacility(object):
                         label = item
 
                     for label in PlumberyNodes.expand_labels(label):
-                        if label in labels:
+                        if label in seen:
                             plogging.warning("Duplicate node name '{}'"
                                              .format(label))
                         else:
+                            seen.add(label)
                             labels.append(label)
 
         return labels
@@ -629,6 +681,12 @@ class PlumberyFacility(object):
 
         """
 
+        profiler.focus(facility=self.get_setting('locationId'))
+
+        # addresses and translation rules are listed again for each action
+        self._cache_nat_tables = {}
+        self._cache_ipv4_pools = {}
+
         self.power_on()
         plogging.info("Plumbing at '{}' {} ({})".format(
             self.location.id,
@@ -851,15 +909,15 @@ class PlumberyFacility(object):
         """
         Starts all nodes at this facility
 
+        Nodes of the basement are started first.
+
         """
 
         basement = self.list_basement()
-        for name in basement:
-            self.start_blueprint(name)
+        self.start_blueprint(basement)
 
-        for name in self.expand_blueprint('*'):
-            if name not in basement:
-                self.start_blueprint(name)
+        self.start_blueprint([name for name in self.expand_blueprint('*')
+                              if name not in basement])
 
     def start_blueprint(self, names):
         """
@@ -868,18 +926,25 @@ class PlumberyFacility(object):
         :param names: the name(s) of the target blueprint(s)
         :type names: ``str`` or ``list`` of ``str``
 
+        Nodes of all blueprints are started concurrently. If the setting
+        ``waitForNodes`` is set, then plumbery waits until all of them
+        are up and running.
+
         """
 
         nodes = PlumberyNodes(self)
 
+        labels = []
+        blueprints = {}
         for name in self.expand_blueprint(names):
-
             blueprint = self.get_blueprint(name)
+            for label, settings in nodes.list_node_settings(blueprint):
+                labels.append(label)
+                blueprints[label] = blueprint.get('target')
 
-            if 'nodes' not in blueprint:
-                continue
-
-            nodes.start_blueprint(blueprint)
+        nodes.start_nodes(labels,
+                          wait=self.get_setting('waitForNodes', False),
+                          blueprints=blueprints)
 
     def polish_all_blueprints(self, polishers):
         """
@@ -890,17 +955,37 @@ class PlumberyFacility(object):
 
         """
 
+        if isinstance(polishers, str):
+            polishers = PlumberyPolisher.filter(self.plumbery.polishers,
+                                                polishers)
+
+        index = self._index_nodes(polishers)
+
         basement = self.list_basement()
         for name in basement:
             plogging.debug("Processing blueprint '{}'".format(name))
-            self.polish_blueprint(name, polishers)
+            self.polish_blueprint(name, polishers, index)
 
         for name in self.expand_blueprint('*'):
             if name not in basement:
                 plogging.debug("Processing blueprint '{}'".format(name))
-                self.polish_blueprint(name, polishers)
+                self.polish_blueprint(name, polishers, index)
 
-    def polish_blueprint(self, names, polishers):
+    def _index_nodes(self, polishers):
+        """
+        Lists nodes in bulk if all polishers can work from such a list
+        """
+
+        if len(polishers) < 1:
+            return None
+
+        if not all(getattr(polisher, 'incremental', False)
+                   for polisher in polishers):
+            return None
+
+        return PlumberyNodes(self).index_nodes()
+
+    def polish_blueprint(self, names, polishers, index=None):
         """
         Walks a named blueprint for this facility and polish related resources
 
@@ -910,6 +995,9 @@ class PlumberyFacility(object):
         :param polishers: polishers to be applied
         :type polishers: list of :class:`plumbery.PlumberyPolisher`
 
+        :param index: nodes of this facility, listed in bulk
+        :type index: ``dict``
+
         """
 
         if isinstance(polishers, str):
@@ -920,6 +1008,9 @@ class PlumberyFacility(object):
         infrastructure = PlumberyInfrastructure(self)
         nodes = PlumberyNodes(self)
 
+        if index is None:
+            index = self._index_nodes(polishers)
+
         for polisher in polishers:
             polisher.move_to(self)
 
@@ -932,22 +1023,22 @@ class PlumberyFacility(object):
             for polisher in polishers:
                 polisher.shine_container(container)
 
-            nodes.polish_blueprint(blueprint, polishers, container)
+            nodes.polish_blueprint(blueprint, polishers, container, index)
 
     def stop_all_blueprints(self):
         """
         Stops all nodes at this facility
 
+        Nodes of the basement are stopped last.
+
         """
 
         basement = self.list_basement()
 
-        for name in self.expand_blueprint('*'):
-            if name not in basement:
-                self.stop_blueprint(name)
+        self.stop_blueprint([name for name in self.expand_blueprint('*')
+                             if name not in basement])
 
-        for name in basement:
-            self.stop_blueprint(name)
+        self.stop_blueprint(basement)
 
     def stop_blueprint(self, names):
         """
@@ -966,18 +1057,25 @@ class PlumberyFacility(object):
                 - slaveSQL:
                     running: always
 
+        Nodes of all blueprints are stopped concurrently. If the setting
+        ``waitForNodes`` is set, then plumbery waits until all of them
+        are stopped.
+
         """
 
         nodes = PlumberyNodes(self)
 
+        items = []
+        blueprints = {}
         for name in self.expand_blueprint(names):
-
             blueprint = self.get_blueprint(name)
+            for label, settings in nodes.list_node_settings(blueprint):
+                items.append((label, settings))
+                blueprints[label] = blueprint.get('target')
 
-            if 'nodes' not in blueprint:
-                continue
-
-            nodes.stop_blueprint(blueprint)
+        nodes.stop_nodes(items,
+                         wait=self.get_setting('waitForNodes', False),
+                         blueprints=blueprints)
 
     def wipe_all_blueprints(self):
         """
@@ -1019,6 +1117,90 @@ class PlumberyFacility(object):
             blueprint = self.get_blueprint(name)
             nodes.destroy_blueprint(blueprint)
 
+    def refresh_all_blueprints(self):
+        """
+        Destroys and rebuilds all nodes at this facility
+
+        """
+
+        self.refresh_blueprint('*')
+
+    def refresh_blueprint(self, names, workers=10):
+        """
+        Destroys and rebuilds nodes of given blueprints at this facility
+
+        :param names: the name(s) of the blueprint(s) to refresh
+        :type names: ``str`` or ``list`` of ``str``
+
+        :param workers: the maximum number of blueprints refreshed
+            concurrently
+        :type workers: ``int``
+
+        Each blueprint is processed in a separate thread: its nodes are
+        destroyed, then plumbery waits for these nodes to actually
+        disappear, and the blueprint is built again. Therefore the build of
+        one blueprint can overlap with the teardown of another one.
+
+        Network domains and Ethernet networks are kept as they are.
+
+        If the keyword ``basement`` mentions one or several blueprints,
+        then these are refreshed before the other blueprints.
+
+        :return: ``False`` if some blueprint has not been built again,
+            else ``True``
+        :rtype: ``bool``
+
+        """
+
+        self.power_on()
+
+        basement = self.list_basement()
+        names = self.expand_blueprint(names)
+
+        results = parallel(self._refresh_blueprint,
+                           [name for name in names if name in basement],
+                           workers)
+
+        results += parallel(self._refresh_blueprint,
+                            [name for name in names if name not in basement],
+                            workers)
+
+        return False not in results
+
+    def _refresh_blueprint(self, name):
+        """
+        Destroys and rebuilds nodes of one blueprint
+
+        :param name: the name of the blueprint to refresh
+        :type name: ``str``
+
+        :return: ``False`` if destroyed nodes are still there, else ``True``
+        :rtype: ``bool``
+
+        Plumbery waits only for nodes whose deletion has been accepted by
+        the API. If some of them do not disappear in time, then the
+        blueprint is not built again.
+
+        """
+
+        plogging.debug("Refreshing blueprint '{}'".format(name))
+
+        infrastructure = PlumberyInfrastructure(self)
+        nodes = PlumberyNodes(self)
+
+        blueprint = self.get_blueprint(name)
+
+        accepted = []
+        nodes.destroy_blueprint(blueprint, accepted=accepted)
+        if len(accepted) > 0 and not nodes.wait_for_deletion(accepted):
+            plogging.error("Unable to refresh blueprint '{}'".format(name))
+            return False
+
+        infrastructure.build(blueprint)
+        container = infrastructure.get_container(blueprint)
+        nodes.build_blueprint(blueprint, container)
+        return True
+
     def destroy_all_blueprints(self):
         """
         Destroys all blueprints at this facility
@@ -1031,19 +1213,25 @@ class PlumberyFacility(object):
 
         basement = self.list_basement()
 
+        blueprints = []
         for name in self.expand_blueprint('*'):
             if name in basement:
                 continue
             blueprint = self.get_blueprint(name)
             plogging.debug("Destroying blueprint '{}'".format(name))
             nodes.destroy_blueprint(blueprint)
-            infrastructure.destroy_blueprint(blueprint)
+            blueprints.append(blueprint)
 
+        infrastructure.destroy_blueprints(blueprints)
+
+        blueprints = []
         for name in basement:
             blueprint = self.get_blueprint(name)
             plogging.debug("Destroying blueprint '{}'".format(name))
             nodes.destroy_blueprint(blueprint)
-            infrastructure.destroy_blueprint(blueprint)
+            blueprints.append(blueprint)
+
+        infrastructure.destroy_blueprints(blueprints)
 
     def destroy_blueprint(self, names):
         """
@@ -1058,11 +1246,14 @@ class PlumberyFacility(object):
         nodes = PlumberyNodes(self)
         infrastructure = PlumberyInfrastructure(self)
 
+        blueprints = []
         for name in self.expand_blueprint(names):
 
             blueprint = self.get_blueprint(name)
             nodes.destroy_blueprint(blueprint)
-            infrastructure.destroy_blueprint(blueprint)
+            blueprints.append(blueprint)
+
+        infrastructure.destroy_blueprints(blueprints)
 
     def lookup(self, token):
         """
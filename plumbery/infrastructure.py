@@ -15,7 +15,11 @@
 
 from __future__ import absolute_import
 
+import socket
+import struct
+import threading
 import time
+from collections import deque
 from uuid import uuid4
 
 try:
@@ -30,10 +34,228 @@ from libcloud.common.dimensiondata import TYPES_URN
 from libcloud.utils.xml import findtext, findall
 
 from plumbery.terraform import Terraform
+from plumbery.terraform import TerraformJob
 from plumbery.exception import PlumberyException
 from plumbery.plogging import plogging
+from plumbery.profiler import profiler
+from plumbery.scheduler import scheduler
+from plumbery.util import parallel
 
-__all__ = ['PlumberyInfrastructure']
+__all__ = ['PlumberyInfrastructure', 'PlumberyIpv4Pool', 'PlumberyNatTable']
+
+
+class PlumberyNatTable(object):
+    """
+    Address translation rules of one network domain
+
+    :param rules: the rules listed for the network domain
+    :type rules: ``list`` of :class:`DimensionDataNatRule`
+
+    Rules are indexed both by internal and by external IPv4 address, so
+    that the rule attached to a node, or to a public address, is found
+    without scanning the full list. The table is loaded once per action,
+    and updated in place when plumbery adds or deletes a rule.
+
+    """
+
+    def __init__(self, rules=()):
+        self._lock = threading.Lock()
+        self._internal = {}
+        self._external = {}
+        for rule in rules:
+            self.add(rule)
+
+    def __len__(self):
+        return len(self._internal)
+
+    def add(self, rule):
+        """
+        Remembers some rule
+
+        :param rule: the rule that has been created
+        :type rule: :class:`DimensionDataNatRule`
+
+        """
+
+        with self._lock:
+            self._internal[rule.internal_ip] = rule
+            self._external[rule.external_ip] = rule
+
+    def remove(self, rule):
+        """
+        Forgets some rule
+
+        :param rule: the rule that has been deleted
+        :type rule: :class:`DimensionDataNatRule`
+
+        """
+
+        with self._lock:
+            self._internal.pop(rule.internal_ip, None)
+            self._external.pop(rule.external_ip, None)
+
+    def get_by_internal(self, address):
+        """
+        Finds the rule for some private address
+
+        :param address: the internal IPv4 address, e.g., of a node
+        :type address: ``str``
+
+        :return: the rule, or ``None``
+        :rtype: :class:`DimensionDataNatRule`
+
+        """
+
+        return self._internal.get(address)
+
+    def get_by_external(self, address):
+        """
+        Finds the rule for some public address
+
+        :param address: the external IPv4 address
+        :type address: ``str``
+
+        :return: the rule, or ``None``
+        :rtype: :class:`DimensionDataNatRule`
+
+        """
+
+        return self._external.get(address)
+
+    def list_external(self):
+        """
+        Lists public addresses that are translated
+
+        :return: external IPv4 addresses
+        :rtype: ``list`` of ``str``
+
+        """
+
+        with self._lock:
+            return list(self._external)
+
+
+class PlumberyIpv4Pool(object):
+    """
+    Public IPv4 addresses of one network domain
+
+    :param blocks: the blocks of public addresses added to the domain
+    :type blocks: ``list`` of :class:`DimensionDataPublicIpBlock`
+
+    :param reserved: the addresses that are already in use
+    :type reserved: ``list`` of ``str``
+
+    Blocks are expanded once, and free addresses are handed out in the
+    order of blocks. Allocation is protected by a lock, so that concurrent
+    threads never get the same address. Threads that add blocks to the
+    domain hold ``extension``, so that only one of them reserves addresses
+    when the pool is empty.
+
+    """
+
+    def __init__(self, blocks=(), reserved=()):
+        self._lock = threading.Lock()
+        self.extension = threading.Lock()
+        self._free = deque()
+        self._reserved = set(reserved)
+        self._allocated = {}
+        self.size = 0
+        for block in blocks:
+            self.add_block(block)
+
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def expand_block(block):
+        """
+        Lists addresses of a block
+
+        :param block: a block of public addresses
+        :type block: :class:`DimensionDataPublicIpBlock`
+
+        :return: the addresses of the block
+        :rtype: ``list`` of ``str``
+
+        """
+
+        base = struct.unpack('!I', socket.inet_aton(block.base_ip))[0]
+        return [socket.inet_ntoa(struct.pack('!I', base+index))
+                for index in range(int(block.size))]
+
+    def add_block(self, block):
+        """
+        Adds a block of addresses to the pool
+
+        :param block: a block of public addresses
+        :type block: :class:`DimensionDataPublicIpBlock`
+
+        """
+
+        with self._lock:
+            for address in self.expand_block(block):
+                self.size += 1
+                if address not in self._reserved:
+                    self._free.append(address)
+
+    def allocate(self, label=None):
+        """
+        Takes one free address
+
+        :param label: who is asking, e.g., the name of a blueprint
+        :type label: ``str``
+
+        :return: a free address, or ``None``
+        :rtype: ``str``
+
+        """
+
+        with self._lock:
+            if len(self._free) < 1:
+                return None
+
+            address = self._free.popleft()
+            self._reserved.add(address)
+            self._allocated[label] = self._allocated.get(label, 0) + 1
+            return address
+
+    def release(self, address, label=None):
+        """
+        Gives back some address that has not been used
+
+        :param address: an address returned by :meth:`allocate`
+        :type address: ``str``
+
+        :param label: who was asking
+        :type label: ``str``
+
+        """
+
+        with self._lock:
+            if address in self._reserved:
+                self._reserved.discard(address)
+                self._free.appendleft(address)
+                self._allocated[label] = self._allocated.get(label, 1) - 1
+
+    def count_free(self):
+        """
+        Counts addresses that can be allocated
+
+        :rtype: ``int``
+
+        """
+
+        return len(self._free)
+
+    def count_allocated(self, label=None):
+        """
+        Counts addresses given to some requester during this action
+
+        :rtype: ``int``
+
+        """
+
+        return self._allocated.get(label, 0)
 
 
 class PlumberyInfrastructure(object):
@@ -121,6 +343,9 @@ class PlumberyInfrastructure(object):
             ...
 
         """
+
+        profiler.focus(blueprint=blueprint.get('target'))
+
         target = PlumberyInfrastructure(self.facility)
 
         target.blueprint = blueprint
@@ -156,20 +381,84 @@ class PlumberyInfrastructure(object):
 
         """
 
-        if len(self.facility._cache_network_domains) < 1:
-            plogging.debug("Listing network domains")
-            self.facility._cache_network_domains = \
-                self.region.ex_list_network_domains(
-                    self.facility.get_location_id())
-            plogging.debug("- found {} network domains"
-                          .format(len(self.facility._cache_network_domains)))
+        with self.facility._cache_lock:
+            if len(self.facility._cache_network_domains) < 1:
+                plogging.debug("Listing network domains")
+                self.facility._cache_network_domains = \
+                    self.region.ex_list_network_domains(
+                        self.facility.get_location_id())
+                plogging.debug("- found {} network domains".format(
+                    len(self.facility._cache_network_domains)))
+
+            domains = list(self.facility._cache_network_domains)
 
-        for domain in self.facility._cache_network_domains:
+        for domain in domains:
             if domain.name == name:
                 return domain
 
         return None
 
+    def get_nat_table(self, domain, region=None):
+        """
+        Retrieves address translation rules of a network domain
+
+        :param domain: the network domain, or its unique identifier
+        :type domain: :class:`DimensionDataNetworkDomain` or ``str``
+
+        :param region: the driver to use, if not the one of this facility
+        :type region: :class:`DimensionDataNodeDriver`
+
+        :return: the rules of this domain
+        :rtype: :class:`PlumberyNatTable`
+
+        Rules are listed once for each network domain, then the same table
+        is shared by all blueprints and threads of the facility.
+
+        """
+
+        if region is None:
+            region = self.region
+
+        key = getattr(domain, 'id', domain)
+        with self.facility._cache_lock:
+
+            table = self.facility._cache_nat_tables.get(key)
+            if table is None:
+                if not hasattr(domain, 'id'):
+                    domain = region.ex_get_network_domain(domain)
+
+                table = PlumberyNatTable(region.ex_list_nat_rules(domain))
+                self.facility._cache_nat_tables[key] = table
+
+        return table
+
+    def get_ipv4_pool(self, domain):
+        """
+        Retrieves public IPv4 addresses of a network domain
+
+        :param domain: the network domain
+        :type domain: :class:`DimensionDataNetworkDomain`
+
+        :return: the addresses of this domain
+        :rtype: :class:`PlumberyIpv4Pool`
+
+        Blocks and reserved addresses are listed once for each network
+        domain, then the same pool is shared by all blueprints and threads
+        of the facility.
+
+        """
+
+        with self.facility._cache_lock:
+
+            pool = self.facility._cache_ipv4_pools.get(domain.id)
+            if pool is None:
+                pool = PlumberyIpv4Pool(
+                    self._list_ipv4_blocks(domain),
+                    self.ex_list_reserved_public_ip_addresses(domain))
+                self.facility._cache_ipv4_pools[domain.id] = pool
+
+        return pool
+
     def get_ethernet(self, path):
         """
         Retrieves an Ethernet network by name
@@ -208,14 +497,17 @@ class PlumberyInfrastructure(object):
 
         if len(path) == 1:  # local name
 
-            if len(self.facility._cache_vlans) < 1:
-                plogging.debug("Listing Ethernet networks")
-                self.facility._cache_vlans = self.region.ex_list_vlans(
-                    location=self.facility.get_location_id())
-                plogging.debug("- found {} Ethernet networks"
-                              .format(len(self.facility._cache_vlans)))
+            with self.facility._cache_lock:
+                if len(self.facility._cache_vlans) < 1:
+                    plogging.debug("Listing Ethernet networks")
+                    self.facility._cache_vlans = self.region.ex_list_vlans(
+                        location=self.facility.get_location_id())
+                    plogging.debug("- found {} Ethernet networks"
+                                  .format(len(self.facility._cache_vlans)))
 
-            for network in self.facility._cache_vlans:
+                networks = list(self.facility._cache_vlans)
+
+            for network in networks:
                 if network.name == path[0]:
                     return network
 
@@ -307,6 +599,8 @@ class PlumberyInfrastructure(object):
 
         """
 
+        profiler.focus(blueprint=blueprint.get('target'))
+
         self.blueprint = blueprint
 
         plogging.debug("Building infrastructure of blueprint '{}'".format(
@@ -374,7 +668,8 @@ class PlumberyInfrastructure(object):
                         poll_interval=5, timeout=1200,
                         network_domain_id=self.domain.id)
 
-                    self.facility._cache_network_domains.append(self.domain)
+                    with self.facility._cache_lock:
+                        self.facility._cache_network_domains.append(self.domain)
 
                 except Exception as feedback:
 
@@ -420,21 +715,25 @@ class PlumberyInfrastructure(object):
 
             while True:
                 try:
-                    self.network = self.region.ex_create_vlan(
-                        network_domain=self.domain,
-                        name=networkName,
-                        private_ipv4_base_address=blueprint['ethernet']['subnet'],
-                        description=description)
-                    plogging.info("- in progress")
+                    # keep the domain until the network is ready
+                    with scheduler.lock(domain=self.domain):
+                        self.network = self.region.ex_create_vlan(
+                            network_domain=self.domain,
+                            name=networkName,
+                            private_ipv4_base_address=(
+                                blueprint['ethernet']['subnet']),
+                            description=description)
+                        plogging.info("- in progress")
 
-                    # prevent locks in xops
-                    self.region.ex_wait_for_state(
-                        'NORMAL',
-                        self.region.ex_get_vlan,
-                        poll_interval=5, timeout=1200,
-                        vlan_id=self.network.id)
+                        # prevent locks in xops
+                        self.region.ex_wait_for_state(
+                            'NORMAL',
+                            self.region.ex_get_vlan,
+                            poll_interval=5, timeout=1200,
+                            vlan_id=self.network.id)
 
-                    self.facility._cache_vlans.append(self.network)
+                    with self.facility._cache_lock:
+                        self.facility._cache_vlans.append(self.network)
 
                 except Exception as feedback:
 
@@ -462,42 +761,106 @@ class PlumberyInfrastructure(object):
                 break
 
         if 'reserved' in blueprint['ethernet']:
+            if not self._reserve_private_ipv4(
+                    blueprint['ethernet']['reserved']):
+                return False
 
-            for reserved in blueprint['ethernet']['reserved']:
+        if 'multicloud' in blueprint                                      \
+           and isinstance(blueprint['multicloud'], dict):
+            plogging.info("Starting multicloud deployment")
+            self.plumbery.add_job(TerraformJob(self.terraform,
+                                               blueprint['multicloud'],
+                                               label=blueprint.get('target')))
+            plogging.info("- in progress")
 
-                plogging.info("Reserving address '{}'"
-                              .format(reserved))
+        return True
 
-                if self.plumbery.safeMode:
-                    plogging.info("- skipped - safe mode")
+    def _reserve_private_ipv4(self, addresses, workers=10):
+        """
+        Reserves private IPv4 addresses in the Ethernet network
+
+        :param addresses: the addresses that nodes should not get
+        :type addresses: ``list`` of ``str``
+
+        :param workers: the maximum number of concurrent requests
+        :type workers: ``int``
+
+        :return: ``False`` if some address could not be reserved
+        :rtype: ``bool``
+
+        Addresses that are reserved already are listed with one request,
+        then missing reservations are submitted concurrently.
+
+        Example in the fittings plan::
+
+          - web:
+              ethernet:
+                name: myNetwork
+                subnet: 10.1.10.0
+                reserved:
+                  - 10.1.10.11
+                  - 10.1.10.12
+
+        """
+
+        wanted = []
+        for address in addresses:
+            if str(address) not in wanted:
+                wanted.append(str(address))
+
+        plogging.info("Reserving {} private address(es) in '{}'"
+                     .format(len(wanted), self.blueprint['ethernet']['name']))
+
+        if self.plumbery.safeMode:
+            plogging.info("- skipped - safe mode")
+            return True
+
+        while True:
+            try:
+                existing = set(
+                    self.ex_list_reserved_private_ip_addresses(self.network))
+
+            except Exception as feedback:
+
+                if 'RESOURCE_BUSY' in str(feedback):
+                    time.sleep(10)
                     continue
 
-                while True:
-                    try:
-                        self.ex_reserve_private_ip_addresses(
-                            vlan=self.network,
-                            address=reserved)
-                        plogging.info("- in progress")
+                plogging.info("- unable to list reserved addresses")
+                plogging.error(str(feedback))
+                existing = set()
 
-                    except Exception as feedback:
+            break
 
-                        if 'RESOURCE_BUSY' in str(feedback):
-                            time.sleep(10)
-                            continue
+        missing = [address for address in wanted if address not in existing]
 
-                        else:
-                            plogging.info("- unable to create Ethernet network")
-                            plogging.error(str(feedback))
-                            return False
+        def reserve(address):
+            while True:
+                try:
+                    self.ex_reserve_private_ip_addresses(
+                        vlan=self.network,
+                        address=address)
+                    return True
 
-                    break
+                except Exception as feedback:
 
-        if 'multicloud' in blueprint                                      \
-           and isinstance(blueprint['multicloud'], dict):
-            plogging.info("Starting multicloud deployment")
-            self.terraform.build(blueprint['multicloud'])
+                    if 'RESOURCE_BUSY' in str(feedback):
+                        time.sleep(10)
+                        continue
 
-        return True
+                    plogging.info("- unable to reserve address '{}'"
+                                 .format(address))
+                    plogging.error(str(feedback))
+                    return False
+
+        results = parallel(reserve, missing, workers)
+
+        plogging.info("- {} reserved, {} already there, {} failed".format(
+            results.count(True),
+            len(wanted) - len(missing),
+            results.count(False)))
+
+        return False not in results
 
     def destroy_blueprint(self, blueprint):
         """
@@ -520,107 +883,134 @@ class PlumberyInfrastructure(object):
 
         """
 
-        self.blueprint = blueprint
+        self.destroy_blueprints([blueprint])
 
-        if ('domain' not in blueprint
-                or type(blueprint['domain']) is not dict):
+    def destroy_blueprints(self, blueprints, workers=10):
+        """
+        Destroys network and security elements of multiple blueprints
 
-            raise PlumberyException(
-                "Error: no network domain has been defined "
-                "for the blueprint '{}'!".format(blueprint['target']))
+        :param blueprints: the various attributes of the target fittings
+        :type blueprints: ``list`` of ``dict``
 
-        if ('ethernet' not in blueprint
-                or type(blueprint['ethernet']) is not dict):
+        :param workers: the maximum number of concurrent deletions
+        :type workers: ``int``
 
-            raise PlumberyException(
-                "Error: no ethernet network has been defined "
-                "for the blueprint '{}'!".format(blueprint['target']))
+        Firewall rules, load balancers and public addresses are released
+        blueprint after blueprint. Then blueprints are grouped by network
+        domain. All Ethernet networks of a domain are deleted concurrently.
+        Their disappearance is checked with one listing of the domain's
+        networks at each tick, and the domain is deleted as soon as the
+        last network is gone. Distinct network domains are processed
+        concurrently.
 
-        domainName = blueprint['domain']['name']
-        networkName = blueprint['ethernet']['name']
+        """
 
-        domain = self.get_network_domain(domainName)
-        if domain is None:
-            plogging.info("Destroying Ethernet network '{}'"
-                         .format(networkName))
-            plogging.info("- not found")
-            plogging.info("Destroying network domain '{}'".format(domainName))
-            plogging.info("- not found")
-            return
+        groups = []
+        for blueprint in blueprints:
 
-        self._destroy_firewall_rules()
+            profiler.focus(blueprint=blueprint.get('target'))
 
-        self._destroy_balancer()
+            self.blueprint = blueprint
 
-        self._release_ipv4()
+            if ('domain' not in blueprint
+                    or type(blueprint['domain']) is not dict):
 
-        plogging.info("Destroying Ethernet network '{}'".format(networkName))
+                raise PlumberyException(
+                    "Error: no network domain has been defined "
+                    "for the blueprint '{}'!".format(blueprint['target']))
 
-        network = self.get_ethernet(networkName)
-        if network is None:
-            plogging.info("- not found")
+            if ('ethernet' not in blueprint
+                    or type(blueprint['ethernet']) is not dict):
 
-        elif ('destroy' in blueprint['ethernet']
-                and blueprint['ethernet']['destroy'] == 'never'):
-            plogging.info("- this network can never be destroyed")
+                raise PlumberyException(
+                    "Error: no ethernet network has been defined "
+                    "for the blueprint '{}'!".format(blueprint['target']))
 
-        elif self.plumbery.safeMode:
-            plogging.info("- skipped - safe mode")
+            domainName = blueprint['domain']['name']
+            networkName = blueprint['ethernet']['name']
 
-        else:
+            domain = self.get_network_domain(domainName)
+            if domain is None:
+                plogging.info("Destroying Ethernet network '{}'"
+                             .format(networkName))
+                plogging.info("- not found")
+                plogging.info("Destroying network domain '{}'"
+                             .format(domainName))
+                plogging.info("- not found")
+                continue
 
-            retry = True
-            while True:
-                try:
-                    self.region.ex_delete_vlan(vlan=network)
-                    plogging.info("- in progress")
+            self._destroy_firewall_rules()
 
-                    while True:
-                        try:
-                            time.sleep(10)
-                            self.region.ex_get_vlan(vlan_id=network.id)
-                        except Exception as feedback:
-                            if 'RESOURCE_NOT_FOUND' in str(feedback):
-                                break
+            self._destroy_balancer()
 
-                except Exception as feedback:
+            self._release_ipv4()
 
-                    if 'RESOURCE_BUSY' in str(feedback):
-                        time.sleep(10)
-                        continue
+            group = None
+            for item in groups:
+                if item['domain'].id == domain.id:
+                    group = item
+                    break
 
-                    elif 'RESOURCE_NOT_FOUND' in str(feedback):
-                        plogging.info("- not found")
+            if group is None:
+                group = {'domain': domain,
+                         'blueprints': [],
+                         'networks': []}
+                groups.append(group)
 
-                    elif 'HAS_DEPENDENCY' in str(feedback):
+            group['blueprints'].append(blueprint)
 
-                        # give time to ensure nodes have been deleted
-                        if retry:
-                            retry = False
-                            time.sleep(30)
-                            continue
+            plogging.info("Destroying Ethernet network '{}'"
+                         .format(networkName))
 
-                        plogging.info("- not now - stuff on it")
-                        return
+            network = self.get_ethernet(networkName)
+            if network is None:
+                plogging.info("- not found")
 
-                    elif 'RESOURCE_LOCKED' in str(feedback):
-                        plogging.info("- not now - locked")
-                        plogging.info(feedback)
-                        return
+            elif ('destroy' in blueprint['ethernet']
+                    and blueprint['ethernet']['destroy'] == 'never'):
+                plogging.info("- this network can never be destroyed")
 
-                    else:
-                        plogging.info("- unable to destroy Ethernet network")
-                        plogging.error(str(feedback))
-                        return
+            elif self.plumbery.safeMode:
+                plogging.info("- skipped - safe mode")
 
-                break
+            elif network.id not in [item.id for item in group['networks']]:
+                group['networks'].append(network)
 
-        plogging.info("Destroying network domain '{}'".format(domainName))
+        parallel(lambda group: self._destroy_network_domain(group, workers),
+                 groups, workers)
 
-        if 'multicloud' in blueprint                                      \
-           and isinstance(blueprint['multicloud'], dict):
-            plogging.info("Destroying multicloud deployment")
-            self.terraform.destroy(blueprint['multicloud'], safe=self.plumbery.safeMode)
+    def _destroy_network_domain(self, group, workers=10):
+        """
+        Destroys Ethernet networks of a network domain, then the domain
+
+        :param group: the domain, with its blueprints and networks
+        :type group: ``dict``
+
+        :param workers: the maximum number of concurrent deletions
+        :type workers: ``int``
+
+        """
+
+        domain = group['domain']
+        networks = group['networks']
+
+        results = parallel(self._destroy_ethernet, networks, workers)
+        if False in results:
+            return
+
+        deleted = [network for network, result in zip(networks, results)
+                   if result is not None]
+        if not self._wait_for_ethernets(domain, deleted):
+            return
+
+        plogging.info("Destroying network domain '{}'".format(domain.name))
+
+        for blueprint in group['blueprints']:
+            if 'multicloud' in blueprint                                  \
+               and isinstance(blueprint['multicloud'], dict):
+                plogging.info("Destroying multicloud deployment")
+                self.terraform.destroy(blueprint['multicloud'],
+                                       safe=self.plumbery.safeMode)
 
         if self.plumbery.safeMode:
             plogging.info("- skipped - safe mode")
@@ -655,6 +1045,120 @@ class PlumberyInfrastructure(object):
 
             break
 
+    def _destroy_ethernet(self, network, timeout=300):
+        """
+        Requests the deletion of one Ethernet network
+
+        :param network: the network to delete
+        :type network: :class:`DimensionDataVlan`
+
+        :param timeout: the maximum number of seconds to wait for nodes
+            to leave the network
+        :type timeout: ``int``
+
+        :return: ``True`` if the deletion is in progress, ``None`` if the
+            network was not found, or ``False`` on failure
+        :rtype: ``bool``
+
+        If nodes are still attached to the network, for example because
+        their destruction is in progress, the deletion is attempted again
+        as soon as the network has no more nodes.
+
+        """
+
+        retry = True
+        while True:
+            try:
+                self.region.ex_delete_vlan(vlan=network)
+                plogging.info("- deleting Ethernet network '{}'"
+                             .format(network.name))
+                return True
+
+            except Exception as feedback:
+
+                if 'RESOURCE_BUSY' in str(feedback):
+                    time.sleep(10)
+                    continue
+
+                elif 'RESOURCE_NOT_FOUND' in str(feedback):
+                    plogging.info("- '{}' not found".format(network.name))
+                    return None
+
+                elif 'HAS_DEPENDENCY' in str(feedback):
+
+                    # wait for the destruction of nodes on this network
+                    if retry:
+                        retry = False
+                        if self._wait_for_no_nodes(network, timeout):
+                            continue
+
+                    plogging.info("- not now - stuff on '{}'"
+                                 .format(network.name))
+                    return False
+
+                elif 'RESOURCE_LOCKED' in str(feedback):
+                    plogging.info("- not now - '{}' is locked"
+                                 .format(network.name))
+                    plogging.info(feedback)
+                    return False
+
+                else:
+                    plogging.info("- unable to destroy Ethernet network '{}'"
+                                 .format(network.name))
+                    plogging.error(str(feedback))
+                    return False
+
+    def _wait_for_no_nodes(self, network, timeout=300, interval=10):
+        """
+        Waits until no node is attached to some Ethernet network
+
+        :return: ``True`` if the network has no more nodes, else ``False``
+        :rtype: ``bool``
+
+        """
+
+        t0 = time.time()
+        while len(self.region.list_nodes(ex_vlan=network)) > 0:
+            if time.time() - t0 > timeout:
+                return False
+            time.sleep(interval)
+
+        return True
+
+    def _wait_for_ethernets(self, domain, networks, timeout=600, interval=10):
+        """
+        Waits until Ethernet networks have disappeared from a domain
+
+        :param domain: the network domain that contains the networks
+        :type domain: :class:`DimensionDataNetworkDomain`
+
+        :param networks: the networks being deleted
+        :type networks: ``list`` of :class:`DimensionDataVlan`
+
+        :return: ``True`` if all networks are gone, else ``False``
+        :rtype: ``bool``
+
+        All networks are checked together, with one listing at each tick.
+
+        """
+
+        pending = set(network.id for network in networks)
+
+        t0 = time.time()
+        while len(pending) > 0:
+
+            time.sleep(interval)
+
+            listed = self.region.ex_list_vlans(network_domain=domain)
+            pending &= set(network.id for network in listed)
+
+            if len(pending) > 0 and time.time() - t0 > timeout:
+                plogging.info("- {} Ethernet network(s) still in domain '{}'"
+                             .format(len(pending), domain.name))
+                return False
+
+        return True
+
     def _build_balancer(self):
         """
         Adds load balancing for nodes in the blueprint
@@ -1152,32 +1656,38 @@ class PlumberyInfrastructure(object):
 
         internal_ip = node.private_ips[0]
         domain = self.get_network_domain(self.blueprint['domain']['name'])
-        for rule in self.region.ex_list_nat_rules(domain):
-            if rule.internal_ip == internal_ip:
+        table = self.get_nat_table(domain)
+        rule = table.get_by_internal(internal_ip)
+        if rule is not None:
 
-                plogging.info("Detaching node '{}' from the internet"
-                             .format(node.name))
+            plogging.info("Detaching node '{}' from the internet"
+                         .format(node.name))
 
-                while True:
-                    try:
+            while True:
+                try:
+                    with scheduler.lock(domain=domain):
                         self.region.ex_delete_nat_rule(rule)
-                        plogging.info("- in progress")
+                    plogging.info("- in progress")
+                    table.remove(rule)
 
-                    except Exception as feedback:
-                        if 'RESOURCE_BUSY' in str(feedback):
-                            time.sleep(10)
-                            continue
+                except Exception as feedback:
+                    if 'RESOURCE_BUSY' in str(feedback):
+                        time.sleep(10)
+                        continue
 
-                        elif 'RESOURCE_LOCKED' in str(feedback):
-                            plogging.info("- not now - locked")
-                            return
+                    elif 'RESOURCE_NOT_FOUND' in str(feedback):
+                        table.remove(rule)
 
-                        else:
-                            plogging.info("- unable to remove "
-                                         "address translation")
-                            plogging.error(str(feedback))
+                    elif 'RESOURCE_LOCKED' in str(feedback):
+                        plogging.info("- not now - locked")
+                        return
 
-                    break
+                    else:
+                        plogging.info("- unable to remove "
+                                     "address translation")
+                        plogging.error(str(feedback))
+
+                break
 
         for rule in self._list_firewall_rules():
 
@@ -1190,15 +1700,16 @@ class PlumberyInfrastructure(object):
                     plogging.info("- skipped - safe mode")
 
                 else:
-                    self.region.ex_delete_firewall_rule(rule)
+                    with scheduler.lock(domain=domain):
+                        self.region.ex_delete_firewall_rule(rule)
                     plogging.info("- in progress")
 
     def _get_ipv4(self):
         """
         Provides a free public IPv4 if possible
 
-        This function looks at current IPv4 addresses reserved for the
-        target network domain, and adds more if needed.
+        This function takes an address from the pool of the target network
+        domain, and adds more addresses if needed.
 
         Example to reserve 8 IPv4 addresses in the fittings plan::
 
@@ -1209,103 +1720,155 @@ class PlumberyInfrastructure(object):
 
         If the directive `auto` is used, then plumbery does not check the
         maximum number of addresses that can be provided.
+
+        When the pool is empty, plumbery reserves enough blocks at once for
+        the nodes of the blueprint that are glued to the internet and that
+        have not received an address yet.
         """
 
         domain = self.get_network_domain(self.blueprint['domain']['name'])
         if domain is None:
             return None
 
-        addresses = self._list_ipv4()
+        pool = self.get_ipv4_pool(domain)
+        label = self.blueprint.get('target')
 
-        if len(addresses) > 0:
+        address = pool.allocate(label)
+        if address is not None:
+            plogging.debug('Using address: {}'.format(address))
+            return address
 
-            plogging.debug('Pool of public IPv4 addresses:')
-            plogging.debug('- {} adresses have been reserved'.format(
-                len(addresses)))
+        # one thread at a time adds addresses to the pool of the domain
+        with pool.extension:
 
-            for reserved in self.ex_list_reserved_public_ip_addresses(domain):
-                addresses.remove(reserved)
+            address = pool.allocate(label)
+            if address is not None:
+                plogging.debug('Using address: {}'.format(address))
+                return address
 
-            plogging.debug('- {} available'.format(len(addresses)))
+            actual = len(pool)
 
-        if len(addresses) > 0:
-            plogging.debug('Using address: {}'.format(addresses[0]))
-            return addresses[0]
+            if 'ipv4' in self.blueprint['domain']:
+                count = self.blueprint['domain']['ipv4']
+            else:
+                count = self.get_default('ipv4', 2)
 
-        actual = len(self._list_ipv4())
+            if str(count).lower() == 'auto':
+                count = None
 
-        if 'ipv4' in self.blueprint['domain']:
-            count = self.blueprint['domain']['ipv4']
-        else:
-            count = self.get_default('ipv4', 2)
+            elif count < 2 or count > 128:
+                plogging.warning("Invalid count of requested IPv4 "
+                                 "public addresses")
+                return None
 
-        if str(count).lower() == 'auto':
-            count = actual + 2
+            elif actual >= count:
+                plogging.error("Error: need more IPv4 address than allocated")
+                return None
 
-        if count < 2 or count > 128:
-            plogging.warning("Invalid count of requested IPv4 public addresses")
-            return None
+            plogging.info('Reserving additional public IPv4 addresses')
 
-        if actual >= count:
-            plogging.error("Error: need more IPv4 address than allocated")
-            return None
+            if self.plumbery.safeMode:
+                plogging.info("- skipped - safe mode")
+                return None
 
-        plogging.info('Reserving additional public IPv4 addresses')
+            needed = max(1, self._count_ipv4_demand()
+                         - pool.count_allocated(label))
+            target = actual + needed
+            if count is not None:
+                target = min(target, count)
 
-        if self.plumbery.safeMode:
-            plogging.info("- skipped - safe mode")
-            return None
+            while actual < target:
+                try:
+                    with scheduler.lock(domain=domain):
+                        block = self.region.\
+                            ex_add_public_ip_block_to_network_domain(domain)
+                    actual += int(block.size)
+                    pool.add_block(block)
+                    plogging.info("- reserved {} addresses"
+                                 .format(int(block.size)))
 
-        count = actual + 2
-        while actual < count:
-            try:
-                block = self.region.ex_add_public_ip_block_to_network_domain(
-                    self.get_network_domain(self.blueprint['domain']['name']))
-                actual += int(block.size)
-                plogging.info("- reserved {} addresses"
-                             .format(int(block.size)))
-                return block.base_ip
+                except Exception as feedback:
 
-            except Exception as feedback:
+                    if 'RESOURCE_BUSY' in str(feedback):
+                        time.sleep(10)
+                        continue
 
-                if 'RESOURCE_BUSY' in str(feedback):
-                    time.sleep(10)
-                    continue
+                    elif 'RESOURCE_LOCKED' in str(feedback):
+                        plogging.info("- not now - locked")
+                        break
 
-                elif 'RESOURCE_LOCKED' in str(feedback):
-                    plogging.info("- not now - locked")
-                    return None
+                    # compensate for bug in Libcloud driver
+                    elif 'RESOURCE_NOT_FOUND' in str(feedback):
+                        actual += 2
+                        continue
 
-                # compensate for bug in Libcloud driver
-                elif 'RESOURCE_NOT_FOUND' in str(feedback):
-                    actual += 2
-                    continue
+                    else:
+                        plogging.info(
+                            "- unable to reserve IPv4 public addresses")
+                        plogging.error(str(feedback))
+                        break
 
-                else:
-                    plogging.info("- unable to reserve IPv4 public addresses")
-                    plogging.error(str(feedback))
-                    return None
+        return pool.allocate(label)
+
+    def _put_back_ipv4(self, address):
+        """
+        Returns to the pool some address that has not been used
+
+        :param address: an address provided by :meth:`_get_ipv4`
+        :type address: ``str``
 
-    def _list_ipv4(self):
         """
-        Lists public IPv4 addresses that have been assigned to a domain
 
-        :return: the full list of public IPv4 addresses assigned to the domain
-        :rtype: ``list`` of ``str`` or ``[]``
+        domain = self.get_network_domain(self.blueprint['domain']['name'])
+        self.get_ipv4_pool(domain).release(address,
+                                           self.blueprint.get('target'))
 
+    def _count_ipv4_demand(self):
         """
+        Counts nodes of the blueprint that are glued to the internet
 
-        addresses = []
+        :return: the number of public addresses used by the blueprint
+        :rtype: ``int``
+
+        """
+
+        from plumbery.nodes import PlumberyLabels
+
+        count = 0
+        for item in self.blueprint.get('nodes', []):
+
+            if not isinstance(item, dict):
+                continue
+
+            label = list(item)[0]
+            settings = item[label] or {}
+
+            glue = settings.get('glue', [])
+            if isinstance(glue, str):
+                glue = [glue]
+
+            for line in glue:
+                if str(line).strip(' ').split(' ')[0].lower() == 'internet':
+                    count += len(PlumberyLabels(label))
+                    break
+
+        return count
+
+    def _list_ipv4_blocks(self, domain):
+        """
+        Lists blocks of public IPv4 addresses added to a domain
+
+        :param domain: the network domain
+        :type domain: :class:`DimensionDataNetworkDomain`
+
+        :return: the blocks of the domain
+        :rtype: ``list`` of :class:`DimensionDataPublicIpBlock` or ``[]``
+
+        """
 
         while True:
             try:
-                blocks = self.region.ex_list_public_ip_blocks(
-                    self.get_network_domain(self.blueprint['domain']['name']))
-                for block in blocks:
-                    splitted = block.base_ip.split('.')
-                    for ticker in xrange(int(block.size)):
-                        addresses.append('.'.join(splitted))
-                        splitted[3] = str(int(splitted[3])+1)
+                return self.region.ex_list_public_ip_blocks(domain)
 
             except Exception as feedback:
 
@@ -1318,10 +1881,6 @@ class PlumberyInfrastructure(object):
                     plogging.error(str(feedback))
                     return []
 
-            break
-
-        return addresses
-
     def _release_ipv4(self):
         """
         Releases public IPv4 addresses assigned to the blueprint
@@ -1329,7 +1888,7 @@ class PlumberyInfrastructure(object):
         """
 
         domain = self.get_network_domain(self.blueprint['domain']['name'])
-        if len(self.region.ex_list_nat_rules(domain)) > 0:
+        if len(self.get_nat_table(domain)) > 0:
             return
 
         blocks = self.region.ex_list_public_ip_blocks(
@@ -1344,6 +1903,9 @@ class PlumberyInfrastructure(object):
             plogging.info("- skipped - safe mode")
             return
 
+        with self.facility._cache_lock:
+            self.facility._cache_ipv4_pools.pop(domain.id, None)
+
         for block in blocks:
             while True:
                 try:
@@ -1635,7 +2197,8 @@ class PlumberyInfrastructure(object):
 
                     else:
                         try:
-                            self.region.ex_delete_firewall_rule(rule)
+                            with scheduler.lock(domain=rule.network_domain):
+                                self.region.ex_delete_firewall_rule(rule)
                             plogging.info("- in progress")
 
                         except Exception as feedback:
@@ -1765,14 +2328,12 @@ class PlumberyInfrastructure(object):
 
         internal_ip = node.private_ips[0]
 
-        external_ip = None
-        for rule in self.region.ex_list_nat_rules(domain):
-            if rule.internal_ip == internal_ip:
-                external_ip = rule.external_ip
-
-        if external_ip is None:
+        rule = self.get_nat_table(domain).get_by_internal(internal_ip)
+        if rule is None:
             return {}
 
+        external_ip = rule.external_ip
+
         candidates = {}
 
         if len(ports) < 1:
@@ -1870,10 +2431,11 @@ class PlumberyInfrastructure(object):
         placement = ET.SubElement(create_node, "placement")
         placement.set('position', position)
 
-        response = self.region.connection.request_with_orgId_api_2(
-            'network/createFirewallRule',
-            method='POST',
-            data=ET.tostring(create_node)).object
+        with scheduler.lock(domain=network_domain):
+            response = self.region.connection.request_with_orgId_api_2(
+                'network/createFirewallRule',
+                method='POST',
+                data=ET.tostring(create_node)).object
 
         rule_id = None
         for info in findall(response, 'info', TYPES_URN):
@@ -0,0 +1,191 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+import filecmp
+import json
+import os
+import sys
+import tempfile
+
+import yaml
+
+from plumbery.plogging import plogging
+
+__all__ = ['PlumberyInventory']
+
+
+class PlumberyInventory(object):
+    """
+    Writes inventory records one at a time
+
+    :param path: the file to be written, or ``None`` for the console
+    :type path: ``str``
+
+    :param format: ``yaml`` or ``jsonl``
+    :type format: ``str``
+
+    :param stream: an open stream to be used instead of ``path``
+    :type stream: ``file``
+
+    Each record is written as soon as it is received, so that memory does
+    not grow with the number of nodes.
+
+    With the ``yaml`` format, each record is appended as one item of a YAML
+    list, and the resulting file is the same as if the whole list had been
+    dumped at once. With the ``jsonl`` format, there is one JSON document
+    per line.
+
+    Records for a file are written to a temporary file in the same
+    directory, then :meth:`close` moves it to its final place. If the file
+    already has the same content, it is left untouched. On error, call
+    :meth:`discard` instead, so that the temporary file is removed.
+
+    Example::
+
+        from plumbery.inventory import PlumberyInventory
+
+        inventory = PlumberyInventory('inventory.yaml')
+        try:
+            for node in nodes:
+                inventory.write({'name': node.name, 'id': node.id})
+        except Exception:
+            inventory.discard()
+            raise
+        inventory.close()
+
+    """
+
+    FORMATS = ('yaml', 'jsonl')
+
+    def __init__(self, path=None, format='yaml', stream=None):
+
+        if format not in self.FORMATS:
+            raise ValueError("Unknown inventory format '{}'".format(format))
+
+        self.path = path
+        self.format = format
+        self.count = 0
+
+        self._temporary = None
+        if stream is not None:
+            self.stream = stream
+
+        elif path is None:
+            self.stream = sys.stdout
+
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            handle, self._temporary = tempfile.mkstemp(
+                dir=directory,
+                prefix=os.path.basename(path)+'.',
+                suffix='.part')
+            self.stream = os.fdopen(handle, 'w')
+
+    def write(self, record):
+        """
+        Appends one record to the inventory
+
+        :param record: attributes of one node, as plain values
+        :type record: ``dict``
+
+        """
+
+        if self.format == 'jsonl':
+            self.stream.write(json.dumps(record, sort_keys=True)+'\n')
+        else:
+            self.stream.write(yaml.safe_dump([record],
+                                             default_flow_style=False))
+
+        self.stream.flush()
+        self.count += 1
+
+    def read(self):
+        """
+        Reads back records written to a stream
+
+        :return: records, in the order they have been written
+        :rtype: iterator of ``dict``
+
+        This is used for a stream that can be read, e.g., a temporary file,
+        so as to assemble some other output from records.
+
+        """
+
+        self.stream.flush()
+        self.stream.seek(0)
+
+        if self.format == 'jsonl':
+            for line in self.stream:
+                if line.strip():
+                    yield json.loads(line)
+
+        else:
+            for record in yaml.safe_load(self.stream) or []:
+                yield record
+
+    def close(self):
+        """
+        Completes the inventory
+
+        :return: ``True`` if some file has been written, else ``False``
+        :rtype: ``bool``
+
+        """
+
+        if self._temporary is None:
+            self.stream.flush()
+            return self.count > 0
+
+        self.stream.close()
+
+        if self.count < 1:
+            os.remove(self._temporary)
+            return False
+
+        if (os.path.isfile(self.path) and
+                filecmp.cmp(self._temporary, self.path, shallow=False)):
+            plogging.info("- '{}' is unchanged".format(self.path))
+            os.remove(self._temporary)
+            return False
+
+        if hasattr(os, 'replace'):  # Python 3
+            os.replace(self._temporary, self.path)
+        else:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(self._temporary, self.path)
+
+        return True
+
+    def discard(self):
+        """
+        Gives up the inventory
+
+        The temporary file, if any, is removed and the target file is left
+        untouched.
+
+        """
+
+        if self._temporary is None:
+            return
+
+        self.stream.close()
+
+        if os.path.exists(self._temporary):
+            os.remove(self._temporary)
+
+        self._temporary = None
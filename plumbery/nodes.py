@@ -29,10 +29,119 @@ from libcloud.common.dimensiondata import DimensionDataServerCpuSpecification
 from plumbery.exception import PlumberyException
 from plumbery.infrastructure import PlumberyInfrastructure
 from plumbery.plogging import plogging
+from plumbery.profiler import profiler
+from plumbery.scheduler import scheduler
+from plumbery.util import parallel
 from plumbery.util import retry
 from plumbery.polishers.monitoring import MonitoringConfiguration
 
-__all__ = ['PlumberyNodes']
+__all__ = ['PlumberyLabels', 'PlumberyNodes']
+
+
+class PlumberyLabels(object):
+    """
+    Names of nodes designated by a single label
+
+    :param label: the label to be expanded, e.g., ``server[1..2]_eu``
+    :type label: ``str``
+
+    This is a compact sequence of names that are computed on demand::
+
+        >>>labels = PlumberyLabels('mongodb[1..500]_eu')
+        >>>len(labels)
+        500
+        >>>'mongodb42_eu' in labels
+        True
+        >>>labels[1]
+        'mongodb2_eu'
+
+    """
+
+    HOSTNAME = re.compile(r'^[0-9a-zA-Z]([0-9a-zA-Z\-]{0,61}[0-9a-zA-Z])?$')
+
+    RANGE = re.compile(r'(.*)\[([0-9]+)..([0-9]+)\](.*)')
+
+    def __init__(self, label):
+        self.label = label
+
+        matches = self.RANGE.match(label)
+        if matches is None:
+            self.prefix = label
+            self.first = None
+            self.last = None
+            self.suffix = ''
+
+        else:
+            self.prefix = matches.group(1)
+            self.first = int(matches.group(2))
+            self.last = int(matches.group(3))
+            self.suffix = matches.group(4)
+
+        # names of a range differ only by their length
+        for name in (self[0], self[-1]) if len(self) > 0 else ():
+            if self.HOSTNAME.match(name) is None:
+                plogging.warning("Warning: '{}' is not a valid hostname"
+                                 .format(name))
+                break
+
+    def __repr__(self):
+        return "<PlumberyLabels {}>".format(self.label)
+
+    def __len__(self):
+        if self.first is None:
+            return 1
+
+        return max(0, self.last - self.first + 1)
+
+    def __iter__(self):
+        if self.first is None:
+            yield self.prefix
+            return
+
+        for index in range(self.first, self.last+1):
+            yield self.prefix+str(index)+self.suffix
+
+    def __getitem__(self, index):
+        count = len(self)
+        if index < 0:
+            index += count
+        if index < 0 or index >= count:
+            raise IndexError(index)
+
+        if self.first is None:
+            return self.prefix
+
+        return self.prefix+str(self.first+index)+self.suffix
+
+    def __contains__(self, name):
+        if self.first is None:
+            return name == self.prefix
+
+        if not name.startswith(self.prefix) or not name.endswith(self.suffix):
+            return False
+
+        digits = name[len(self.prefix):len(name)-len(self.suffix)]
+        if not digits.isdigit() or str(int(digits)) != digits:
+            return False
+
+        return self.first <= int(digits) <= self.last
+
+    def __eq__(self, other):
+        if isinstance(other, PlumberyLabels):
+            return list(self) == list(other)
+
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
 
 
 class PlumberyNodes(object):
@@ -74,6 +183,9 @@ class PlumberyNodes(object):
         self.backup = facility.backup
         self.plumbery = facility.plumbery
 
+        # used to look for public addresses, built on first use
+        self._infrastructure = None
+
     def __repr__(self):
 
         return "<PlumberyNodes facility: {}>".format(self.facility)
@@ -90,6 +202,8 @@ class PlumberyNodes(object):
 
         """
 
+        profiler.focus(blueprint=blueprint.get('target'))
+
         plogging.debug("Building nodes of blueprint '{}'".format(
             blueprint['target']))
 
@@ -228,31 +342,32 @@ class PlumberyNodes(object):
                 while True:
 
                     try:
-                        if primary_ipv4 is not None:
-                            self.region.create_node(
-                                name=label,
-                                image=image,
-                                auth=NodeAuthPassword(
-                                    self.plumbery.get_shared_secret()),
-                                ex_network_domain=container.domain,
-                                ex_primary_ipv4=primary_ipv4,
-                                ex_cpu_specification=cpu,
-                                ex_memory_gb=memory,
-                                ex_is_started=should_start,
-                                ex_description=description)
-
-                        else:
-                            self.region.create_node(
-                                name=label,
-                                image=image,
-                                auth=NodeAuthPassword(
-                                    self.plumbery.get_shared_secret()),
-                                ex_network_domain=container.domain,
-                                ex_vlan=container.network,
-                                ex_cpu_specification=cpu,
-                                ex_memory_gb=memory,
-                                ex_is_started=should_start,
-                                ex_description=description)
+                        with scheduler.lock(domain=container.domain):
+                            if primary_ipv4 is not None:
+                                self.region.create_node(
+                                    name=label,
+                                    image=image,
+                                    auth=NodeAuthPassword(
+                                        self.plumbery.get_shared_secret()),
+                                    ex_network_domain=container.domain,
+                                    ex_primary_ipv4=primary_ipv4,
+                                    ex_cpu_specification=cpu,
+                                    ex_memory_gb=memory,
+                                    ex_is_started=should_start,
+                                    ex_description=description)
+
+                            else:
+                                self.region.create_node(
+                                    name=label,
+                                    image=image,
+                                    auth=NodeAuthPassword(
+                                        self.plumbery.get_shared_secret()),
+                                    ex_network_domain=container.domain,
+                                    ex_vlan=container.network,
+                                    ex_cpu_specification=cpu,
+                                    ex_memory_gb=memory,
+                                    ex_is_started=should_start,
+                                    ex_description=description)
 
                         plogging.info("- in progress")
 
@@ -319,15 +434,39 @@ class PlumberyNodes(object):
 
                     break
 
-    def destroy_blueprint(self, blueprint):
+    def destroy_blueprint(self, blueprint, workers=10, accepted=None):
         """
         Destroys nodes of a given blueprint
 
         :param blueprint: the blueprint to build
         :type blueprint: ``dict``
 
+        :param workers: the maximum number of nodes destroyed concurrently
+        :type workers: ``int``
+
+        :param accepted: if provided, receives names of nodes whose deletion
+            has been accepted
+        :type accepted: ``list`` of ``str``
+
+        :return: ``False`` if some node could not be destroyed, else ``True``
+        :rtype: ``bool``
+
+        Nodes are listed once, and once more after pending shutdowns, then
+        each of them is deconfigured, detached from networks and destroyed
+        in a separate thread.
+
+        Nodes that are glued to the internet or to other networks own
+        address translations and firewall rules, which are selected by
+        prefix of node name. These nodes are torn down one after the other,
+        in reverse order of the blueprint, before other nodes.
+
+        If some node is marked with ``destroy: never``, then nothing is
+        destroyed at all.
+
         """
 
+        profiler.focus(blueprint=blueprint.get('target'))
+
         self.facility.power_on()
 
         infrastructure = PlumberyInfrastructure(self.facility)
@@ -335,86 +474,126 @@ class PlumberyNodes(object):
 
         if ('nodes' not in blueprint
                 or not isinstance(blueprint['nodes'], list)):
-            return
+            return True
 
         # destroy in reverse order
-        for item in reversed(blueprint['nodes']):
+        items = list(reversed(self.list_node_settings(blueprint)))
 
-            if type(item) is dict:
-                label = list(item)[0]
-                settings = item[label]
+        index = self.index_nodes()
+        for label, settings in items:
+            if label in index and settings.get('destroy') == 'never':
+                plogging.info("Destroying node '{}'".format(label))
+                plogging.info("- this node can never be destroyed")
+                return False
+
+        # wait for all pending shutdowns at once
+        pending = []
+        for label, settings in items:
+            if label not in index:
+                continue
+            if index[label].extra['status'].action == 'SHUTDOWN_SERVER':
+                pending.append(label)
+
+        if len(pending) > 0:
+            self.wait_for_nodes(pending, NodeState.STOPPED,
+                                timeout=300, interval=6)
+            index = self.index_nodes()
+
+        targets = []
+        for label, settings in items:
+            if label in index:
+                targets.append((index[label], settings))
             else:
-                label = str(item)
-                settings = {}
+                plogging.info("Destroying node '{}'".format(label))
+                plogging.info("- not found")
 
-            for label in self.expand_labels(label):
+        def destroy(item):
+            return self.destroy_node(item[0], item[1], container, accepted)
 
-                node = self.get_node(label)
-                if node is None:
-                    plogging.info("Destroying node '{}'".format(label))
-                    plogging.info("- not found")
-                    continue
+        glued = [item for item in targets if 'glue' in item[1]]
+        others = [item for item in targets if 'glue' not in item[1]]
 
-                if 'destroy' in settings and settings['destroy'] == 'never':
-                    plogging.info("Destroying node '{}'".format(label))
-                    plogging.info("- this node can never be destroyed")
-                    return False
+        results = [destroy(item) for item in glued]
+        results += parallel(destroy, others, workers)
 
-                timeout = 300
-                tick = 6
-                while node.extra['status'].action == 'SHUTDOWN_SERVER':
-                    time.sleep(tick)
-                    node = self.get_node(label)
-                    timeout -= tick
-                    if timeout < 0:
-                        break
+        return False not in results
 
-                if node.state == NodeState.RUNNING:
-                    plogging.info("Destroying node '{}'".format(label))
-                    plogging.info("- skipped - node is up and running")
-                    continue
+    def destroy_node(self, node, settings, container, accepted=None):
+        """
+        Destroys one node
 
-                if self.plumbery.safeMode:
-                    plogging.info("Destroying node '{}'".format(label))
-                    plogging.info("- skipped - safe mode")
-                    continue
+        :param node: the target node, as listed by :meth:`index_nodes`
+        :type node: :class:`Node`
 
-                configuration = MonitoringConfiguration(
-                    engine=container.facility.plumbery,
-                    facility=container.facility)
-                configuration.deconfigure(node, settings)
+        :param settings: additional attributes for this node
+        :type settings: ``dict``
 
-                self._detach_node(node, settings)
-                container._detach_node_from_internet(node)
+        :param container: the container of this node
+        :type container: :class:`plumbery.PlumberyInfrastructure`
 
-                plogging.info("Destroying node '{}'".format(label))
-                while True:
+        :param accepted: if provided, receives the name of the node when its
+            deletion has been accepted
+        :type accepted: ``list`` of ``str``
 
-                    try:
-                        self.region.destroy_node(node)
-                        plogging.info("- in progress")
+        :return: ``False`` if the node is locked, else ``True``
+        :rtype: ``bool``
 
-                    except Exception as feedback:
+        """
 
-                        if 'RESOURCE_BUSY' in str(feedback):
-                            time.sleep(10)
-                            continue
+        label = node.name
 
-                        elif 'RESOURCE_NOT_FOUND' in str(feedback):
-                            plogging.info("- not found")
+        if node.state == NodeState.RUNNING:
+            plogging.info("Destroying node '{}'".format(label))
+            plogging.info("- skipped - node is up and running")
+            return True
 
-                        elif 'SERVER_STARTED' in str(feedback):
-                            plogging.info("- skipped - node is up and running")
+        if self.plumbery.safeMode:
+            plogging.info("Destroying node '{}'".format(label))
+            plogging.info("- skipped - safe mode")
+            return True
 
-                        elif 'RESOURCE_LOCKED' in str(feedback):
-                            plogging.info("- not now - locked")
-                            return False
+        configuration = MonitoringConfiguration(
+            engine=container.facility.plumbery,
+            facility=container.facility)
+        configuration.deconfigure(node, settings)
 
-                        else:
-                            plogging.info("- unable to destroy node")
-                            plogging.error(str(feedback))
+        self._detach_node(node, settings)
+        container._detach_node_from_internet(node)
 
-                    break
+        plogging.info("Destroying node '{}'".format(label))
+        while True:
+
+            try:
+                with scheduler.lock(domain=node.extra.get('networkDomainId'),
+                                    node=node):
+                    self.region.destroy_node(node)
+                plogging.info("- in progress")
+                if accepted is not None:
+                    accepted.append(label)
+
+            except Exception as feedback:
+
+                if 'RESOURCE_BUSY' in str(feedback):
+                    time.sleep(10)
+                    continue
+
+                elif 'RESOURCE_NOT_FOUND' in str(feedback):
+                    plogging.info("- not found")
+
+                elif 'SERVER_STARTED' in str(feedback):
+                    plogging.info("- skipped - node is up and running")
+
+                elif 'RESOURCE_LOCKED' in str(feedback):
+                    plogging.info("- not now - locked")
+                    return False
+
+                else:
+                    plogging.info("- unable to destroy node")
+                    plogging.error(str(feedback))
+
+            break
+
+        return True
 
     def _detach_node(self, node, settings):
         """
@@ -444,8 +623,11 @@ class PlumberyNodes(object):
 
             while True:
                 try:
-                    self.region.ex_destroy_nic(interface['id'])
-                    plogging.info("- in progress")
+                    with scheduler.lock(
+                            node=node,
+                            until=scheduler.node_is_idle(self.region, node)):
+                        self.region.ex_destroy_nic(interface['id'])
+                        plogging.info("- in progress")
 
                 except Exception as feedback:
 
@@ -468,6 +650,9 @@ class PlumberyNodes(object):
 
         return True
 
+    # ranges of labels are computed only once
+    _labels = {}
+
     @classmethod
     def expand_labels(self, label):
         """
@@ -476,34 +661,27 @@ class PlumberyNodes(object):
         :param label: the label to be expanded, e.g., ``server[1..2]_eu``
         :type label: ``str``
 
-        :return: a list of names, e.g., ``['server1_eu', 'server2_eu']``
-        :rtype: ``list`` of ``str``
+        :return: a sequence of names, e.g., ``['server1_eu', 'server2_eu']``
+        :rtype: :class:`plumbery.nodes.PlumberyLabels`
 
         This function creates multiple names where applicable::
 
-            >>>nodes.expand_labels('mongodb')
+            >>>list(nodes.expand_labels('mongodb'))
             ['mongodb']
 
-            >>>nodes.expand_labels('mongodb[1..3]_eu')
+            >>>list(nodes.expand_labels('mongodb[1..3]_eu'))
             ['mongodb1_eu', 'mongodb2_eu', 'mongodb3_eu']
 
-        """
-        matches = re.match(r'(.*)\[([0-9]+)..([0-9]+)\](.*)', label)
-        if matches is None:
-            if re.match("^[0-9a-zA-Z]([0-9a-zA-Z\-]{0,61}[0-9a-zA-Z])?$", label) is None:
-                plogging.warning("Warning: '{}' is not a valid hostname"
-                                 .format(label))
-            return [label]
-
-        labels = []
-        for index in range(int(matches.group(2)), int(matches.group(3))+1):
+        Names are not materialized. The returned object can be iterated,
+        counted, and tested for membership, and it is shared across
+        all calls made with the same label.
 
-            label = matches.group(1)+str(index)+matches.group(4)
-            if re.match("^[0-9a-zA-Z]([0-9a-zA-Z\-]{0,61}[0-9a-zA-Z])?$", label) is None:
-                plogging.warning("Warning: '{}' is not a valid hostname"
-                                 .format(label))
+        """
 
-            labels.append(label)
+        labels = self._labels.get(label)
+        if labels is None:
+            labels = PlumberyLabels(label)
+            self._labels[label] = labels
 
         return labels
 
@@ -631,14 +809,17 @@ class PlumberyNodes(object):
         if region is None:
             region = self.region
 
-        # hack because the driver does not report public ipv4 accurately
-        if len(node.public_ips) < 1:
-            domain = region.ex_get_network_domain(
-                node.extra['networkDomainId'])
-            for rule in self.region.ex_list_nat_rules(domain):
-                if rule.internal_ip == node.private_ips[0]:
-                    node.public_ips.append(rule.external_ip)
-                    break
+        self._add_public_ips(node, region)
+
+        # disks are reported by the driver since Libcloud 1.2
+        if 'disks' in node.extra and all(hasattr(disk, 'scsi_id')
+                                         for disk in node.extra['disks']):
+            node.extra['disks'] = [{'scsiId': disk.scsi_id,
+                                    'speed': disk.speed,
+                                    'id': disk.id,
+                                    'size': disk.size_gb}
+                                   for disk in node.extra['disks']]
+            return
 
         # hack to retrieve disk information
         node.extra['disks'] = []
@@ -646,6 +827,10 @@ class PlumberyNodes(object):
             element = region.connection.request_with_orgId_api_2(
                 'server/server/%s' % node.id).object
 
+            # keep network interfaces as well, so as to not fetch them again
+            node.extra['interfaces'] = self._parse_secondary_interfaces(
+                element)
+
             for disk in findall(element, 'disk', TYPES_URN):
                 scsiId = int(disk.get('scsiId'))
                 speed = disk.get('speed')
@@ -667,6 +852,29 @@ class PlumberyNodes(object):
                 plogging.info("Error: unable to retrieve storage information")
                 plogging.error(str(feedback))
 
+    def _add_public_ips(self, node, region=None):
+        """
+        Adds public IPv4 of a node, if one exists
+
+        This is a hack because the driver does not report public ipv4
+        accurately. Address translation rules are listed once per network
+        domain.
+
+        """
+
+        if region is None:
+            region = self.region
+
+        if len(node.public_ips) < 1 and len(node.private_ips) > 0:
+            if self._infrastructure is None:
+                self._infrastructure = PlumberyInfrastructure(self.facility)
+
+            table = self._infrastructure.get_nat_table(
+                node.extra['networkDomainId'], region)
+            rule = table.get_by_internal(node.private_ips[0])
+            if rule is not None:
+                node.public_ips.append(rule.external_ip)
+
     @classmethod
     def list_nodes(self, blueprint):
         """
@@ -686,8 +894,7 @@ class PlumberyNodes(object):
                 else:
                     label = str(item)
 
-                for label in PlumberyNodes.expand_labels(label):
-                    labels.add(label)
+                labels.update(PlumberyNodes.expand_labels(label))
 
         return list(labels)
 
@@ -698,10 +905,32 @@ class PlumberyNodes(object):
         This is a hack. Code here should really go to the Libcloud driver in
         libcloud.compute.drivers.dimensiondata.py _to_node()
 
+        Interfaces found in server details retrieved while enriching the
+        node are used, if any.
+
         """
 
-        element = self.region.connection.request_with_orgId_api_2(
-            'server/server/%s' % node.id).object
+        if 'interfaces' not in node.extra:
+            element = self.region.connection.request_with_orgId_api_2(
+                'server/server/%s' % node.id).object
+
+            node.extra['interfaces'] = self._parse_secondary_interfaces(
+                element)
+
+        return node.extra['interfaces']
+
+    @staticmethod
+    def _parse_secondary_interfaces(element):
+        """
+        Extracts secondary interfaces from server details
+
+        :param element: the server, as returned by the API
+        :type element: :class:`xml.etree.ElementTree.Element`
+
+        :return: interfaces, with their ``id`` and ``network``
+        :rtype: ``list`` of ``dict``
+
+        """
 
         if element.find(fixxpath('networkInfo', TYPES_URN)) is None:
             return []
@@ -715,7 +944,29 @@ class PlumberyNodes(object):
 
         return interfaces
 
-    def polish_blueprint(self, blueprint, polishers, container):
+    def index_nodes(self):
+        """
+        Lists nodes of this facility with a single API call
+
+        :return: nodes of this facility, by name
+        :rtype: ``dict`` of :class:`libcloud.compute.base.Node`
+
+        Nodes are returned as listed by the driver, without the additional
+        attributes provided by :meth:`get_node`. Only nodes of this location
+        are requested from the API.
+
+        """
+
+        self.facility.power_on()
+
+        index = {}
+        for node in self.region.list_nodes(
+                ex_location=self.facility.get_location_id()):
+            index[node.name] = node
+
+        return index
+
+    def polish_blueprint(self, blueprint, polishers, container, index=None):
         """
         Walks a named blueprint for this facility and polish related resources
 
@@ -728,11 +979,22 @@ class PlumberyNodes(object):
         :param container: where these nodes are located
         :type container: list of :class:`plumbery.PlumberyInfrastructure`
 
+        :param index: nodes listed in bulk, from :meth:`index_nodes`
+        :type index: ``dict``
+
+        If an index is provided, nodes are taken from it instead of being
+        fetched one by one. Public addresses are added from the address
+        translation table of the network domain, which is listed once, then
+        nodes that have not changed for any polisher since previous run are
+        not enriched further.
+
         """
 
         if 'nodes' not in blueprint:
             return
 
+        profiler.focus(blueprint=blueprint.get('target'))
+
         for item in blueprint['nodes']:
 
             if type(item) is dict:
@@ -744,34 +1006,222 @@ class PlumberyNodes(object):
 
             for label in self.expand_labels(label):
 
-                node = self.get_node(label)
                 settings['name'] = label
 
+                if index is None:
+                    node = self.get_node(label)
+
+                else:
+                    node = index.get(label)
+                    if node is not None:
+                        self._add_public_ips(node)
+                        changes = [not polisher.is_unchanged(node,
+                                                             settings,
+                                                             container,
+                                                             index)
+                                   for polisher in polishers]
+                        if any(changes):
+                            self._enrich_node(node)
+
                 for polisher in polishers:
                     polisher.shine_node(node, settings, container)
 
-    def start_blueprint(self, blueprint):
+    def start_blueprint(self, blueprint, wait=False):
         """
         Starts nodes of a given blueprint at this facility
 
         :param blueprint: the blueprint to build
         :type blueprint: ``dict``
 
+        :param wait: wait for nodes to be up and running
+        :type wait: ``bool``
+
         """
 
         if 'nodes' not in blueprint:
             return
 
-        for item in blueprint['nodes']:
+        profiler.focus(blueprint=blueprint.get('target'))
+
+        self.start_nodes([label for label, settings
+                          in self.list_node_settings(blueprint)],
+                         wait=wait)
+
+    @classmethod
+    def list_node_settings(cls, blueprint):
+        """
+        Lists nodes of a blueprint, with their settings
+
+        :param blueprint: the blueprint to consider
+        :type blueprint: ``dict``
+
+        :return: node names and settings, in the order of the blueprint
+        :rtype: ``list`` of (``str``, ``dict``)
+
+        """
+
+        items = []
+        for item in blueprint.get('nodes', []):
 
             if type(item) is dict:
                 label = list(item)[0]
+                settings = item[label] or {}
 
             else:
-                label = item
+                label = str(item)
+                settings = {}
 
-            for label in self.expand_labels(label):
-                self.start_node(label)
+            for name in cls.expand_labels(label):
+                items.append((name, settings))
+
+        return items
+
+    def start_nodes(self, names, workers=10, wait=False, timeout=600,
+                    blueprints={}):
+        """
+        Starts multiple nodes concurrently
+
+        :param names: the names of target nodes
+        :type names: ``list`` of ``str``
+
+        :param workers: the maximum number of nodes started concurrently
+        :type workers: ``int``
+
+        :param wait: wait for nodes to be up and running
+        :type wait: ``bool``
+
+        :param timeout: the maximum number of seconds to wait
+        :type timeout: ``int``
+
+        :param blueprints: the blueprint of each node, for profiling
+        :type blueprints: ``dict``
+
+        :return: seconds taken by each node to start, if ``wait`` is set
+        :rtype: ``dict``
+
+        Nodes are listed once, then start requests are sent in parallel.
+
+        """
+
+        names = list(names)
+        if len(names) < 1:
+            return {}
+
+        def start(name):
+            if name in blueprints:
+                profiler.focus(blueprint=blueprints[name])
+            self.start_node(index.get(name, name))
+
+        index = self.index_nodes()
+        parallel(start, names, workers)
+
+        if not wait or self.plumbery.safeMode:
+            return {}
+
+        return self.wait_for_nodes(names, NodeState.RUNNING, timeout)
+
+    def wait_for_nodes(self, names, state, timeout=600, interval=10):
+        """
+        Waits until all nodes have reached some state
+
+        :param names: the names of target nodes
+        :type names: ``list`` of ``str``
+
+        :param state: the expected state, e.g., ``NodeState.RUNNING``
+        :type state: ``str``
+
+        :param timeout: the maximum number of seconds to wait
+        :type timeout: ``int``
+
+        :param interval: the number of seconds between two checks
+        :type interval: ``int``
+
+        :return: seconds taken by each node, or ``None`` on timeout
+        :rtype: ``dict``
+
+        All nodes are checked together, with one listing of nodes
+        at each tick. Nodes that cannot be found are ignored.
+
+        """
+
+        plogging.info("Waiting for nodes to be {}".format(state))
+
+        t0 = time.time()
+        latencies = {}
+        pending = None
+        while True:
+
+            index = self.index_nodes()
+            if pending is None:
+                pending = set(name for name in names if name in index)
+
+            for name in sorted(pending):
+                if index[name].state == state:
+                    latencies[name] = time.time() - t0
+                    plogging.info("- '{}' is {} after {:.0f} seconds".format(
+                        name, state, latencies[name]))
+                    pending.discard(name)
+
+            if len(pending) < 1:
+                break
+
+            if time.time() - t0 > timeout:
+                for name in sorted(pending):
+                    plogging.warning("- '{}' is not {} after {} seconds"
+                                     .format(name, state, timeout))
+                    latencies[name] = None
+                break
+
+            time.sleep(interval)
+
+        return latencies
+
+    def wait_for_deletion(self, names, timeout=600, interval=10):
+        """
+        Waits until nodes have disappeared
+
+        :param names: the names of target nodes
+        :type names: ``list`` of ``str``
+
+        :param timeout: the maximum number of seconds to wait
+        :type timeout: ``int``
+
+        :param interval: the number of seconds between two checks
+        :type interval: ``int``
+
+        :return: ``True`` if all nodes are gone or kept, ``False`` on timeout
+        :rtype: ``bool``
+
+        All nodes are checked together, with one listing of nodes at each
+        tick. Nodes that are up and running with no pending action are not
+        waited for, since they are not destroyed.
+
+        """
+
+        t0 = time.time()
+        pending = set(names)
+        while True:
+
+            index = self.index_nodes()
+            for name in sorted(pending):
+                node = index.get(name)
+                if node is None:
+                    pending.discard(name)
+
+                elif (node.state == NodeState.RUNNING
+                        and node.extra['status'].action is None):
+                    pending.discard(name)
+
+            if len(pending) < 1:
+                return True
+
+            if time.time() - t0 > timeout:
+                for name in sorted(pending):
+                    plogging.warning("- '{}' is still there after {} seconds"
+                                     .format(name, timeout))
+                return False
+
+            time.sleep(interval)
 
     def start_node(self, node):
         """
@@ -819,13 +1269,16 @@ class PlumberyNodes(object):
 
             break
 
-    def stop_blueprint(self, blueprint):
+    def stop_blueprint(self, blueprint, wait=False):
         """
         Stops nodes of the given blueprint at this facility
 
         :param blueprint: the blueprint to build
         :type blueprint: ``dict``
 
+        :param wait: wait for nodes to be stopped
+        :type wait: ``bool``
+
         You can use the following setting to prevent plumbery from stopping a
         node::
 
@@ -841,18 +1294,56 @@ class PlumberyNodes(object):
         if 'nodes' not in blueprint:
             return
 
-        for item in blueprint['nodes']:
+        profiler.focus(blueprint=blueprint.get('target'))
 
-            if type(item) is dict:
-                label = list(item.keys())[0]
-                settings = list(item.values())[0]
+        self.stop_nodes(self.list_node_settings(blueprint), wait=wait)
 
-            else:
-                label = item
-                settings = {}
+    def stop_nodes(self, items, workers=10, wait=False, timeout=600,
+                   blueprints={}):
+        """
+        Stops multiple nodes concurrently
 
-            for label in self.expand_labels(label):
-                self.stop_node(label, settings)
+        :param items: the names of target nodes, with their settings
+        :type items: ``list`` of (``str``, ``dict``)
+
+        :param workers: the maximum number of nodes stopped concurrently
+        :type workers: ``int``
+
+        :param wait: wait for nodes to be stopped
+        :type wait: ``bool``
+
+        :param timeout: the maximum number of seconds to wait
+        :type timeout: ``int``
+
+        :param blueprints: the blueprint of each node, for profiling
+        :type blueprints: ``dict``
+
+        :return: seconds taken by each node to stop, if ``wait`` is set
+        :rtype: ``dict``
+
+        Nodes are listed once, then stop requests are sent in parallel.
+        Nodes that have to stay always on are not waited for.
+
+        """
+
+        items = list(items)
+        if len(items) < 1:
+            return {}
+
+        def stop(item):
+            if item[0] in blueprints:
+                profiler.focus(blueprint=blueprints[item[0]])
+            self.stop_node(index.get(item[0], item[0]), item[1])
+
+        index = self.index_nodes()
+        parallel(stop, items, workers)
+
+        if not wait or self.plumbery.safeMode:
+            return {}
+
+        names = [name for name, settings in items
+                 if settings.get('running') != 'always']
+        return self.wait_for_nodes(names, NodeState.STOPPED, timeout)
 
     def stop_node(self, node, settings={}):
         """
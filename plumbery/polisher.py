@@ -13,6 +13,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import json
+import os
+import re
+
+from plumbery.inventory import PlumberyInventory
 from plumbery.plogging import plogging
 
 __all__ = ['PlumberyPolisher']
@@ -74,6 +80,12 @@ class PlumberyPolisher(object):
 
     """
 
+    # reporting polishers can work from a bulk listing of nodes
+    incremental = False
+
+    # tokens such as {{ secret.sql }} or {{ web01.public }} in settings
+    _TOKEN = re.compile(r'{{\s*([^{}\s]+)\s*}}')
+
     def __init__(self, settings):
         self.settings = settings
 
@@ -231,3 +243,293 @@ class PlumberyPolisher(object):
         """
 
         pass
+
+    def abort(self):
+        """
+        Gives up the polishing after some error
+
+        This function is called instead of :meth:`reap` if polishing has been
+        interrupted. Results of this run are not saved, and temporary files
+        are removed. You can override it if your polisher writes files.
+
+        """
+
+        self.discard_snapshot()
+
+    def get_snapshot_path(self):
+        """
+        Locates the file where previous results are kept
+
+        :return: the path of the snapshot file, or ``None``
+        :rtype: ``str``
+
+        The snapshot is put next to the output file of the polisher, unless
+        the setting ``snapshot`` provides another path.
+
+        """
+
+        if 'snapshot' in self.settings:
+            return self.settings['snapshot']
+
+        if 'output' in self.settings:
+            return self.settings['output']+'.snapshot'
+
+        return None
+
+    def load_snapshot(self):
+        """
+        Loads results of the previous run, if any
+
+        Incremental polishers call this function from ``go()``, then use
+        :meth:`recall` and :meth:`remember` for each node, and
+        :meth:`save_snapshot` from ``reap()``.
+
+        When all polishers are incremental, nodes are listed in bulk and
+        only nodes that have changed are enriched, see
+        :meth:`is_unchanged`.
+
+        The snapshot has one JSON document per node. Only the fingerprint
+        and the position of each document are kept in memory, and results
+        are read from the file when they are recalled. Results of this run
+        are written to a new snapshot as they come.
+
+        """
+
+        self._snapshot = {}
+        self._fingerprints = {}
+        self._previous = None
+        self._fresh = None
+        self._saved = set()
+
+        path = self.get_snapshot_path()
+        if path is None:
+            return
+
+        self._fresh = PlumberyInventory(path, format='jsonl')
+
+        if not os.path.isfile(path):
+            return
+
+        self._previous = open(path, 'rb')
+        while True:
+            offset = self._previous.tell()
+            line = self._previous.readline()
+            if not line:
+                break
+
+            try:
+                entry = json.loads(line.decode('utf-8'))
+                self._snapshot[entry['key']] = (entry['fingerprint'], offset)
+
+            except (ValueError, KeyError, TypeError):
+                plogging.debug("- ignoring corrupted snapshot '{}'"
+                               .format(path))
+                self._snapshot = {}
+                break
+
+    def save_snapshot(self):
+        """
+        Saves results of this run, for the next one
+        """
+
+        if getattr(self, '_previous', None) is not None:
+            self._previous.close()
+            self._previous = None
+
+        if getattr(self, '_fresh', None) is not None:
+            self._fresh.close()
+            self._fresh = None
+
+    def discard_snapshot(self):
+        """
+        Drops results of this run, and keeps the previous snapshot
+        """
+
+        if getattr(self, '_previous', None) is not None:
+            self._previous.close()
+            self._previous = None
+
+        if getattr(self, '_fresh', None) is not None:
+            self._fresh.discard()
+            self._fresh = None
+
+    def get_fingerprint(self, node, settings, container, index=None):
+        """
+        Summarises what is known of a node from a bulk listing
+
+        :param node: the node to be polished
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param settings: the fittings plan for this node
+        :type settings: ``dict``
+
+        :param container: the container of this node
+        :type container: :class:`plumbery.PlumberyInfrastructure`
+
+        :param index: nodes of the facility, listed in bulk
+        :type index: ``dict``
+
+        :return: a digest that changes when the node changes
+        :rtype: ``str``
+
+        Beyond the node itself, the digest covers values of parameters,
+        secrets mentioned in settings of the node, and addresses of other
+        nodes mentioned in settings.
+
+        """
+
+        text = json.dumps(settings, sort_keys=True, default=str)
+        tokens = sorted(set(self._TOKEN.findall(text)))
+
+        engine = getattr(self, 'engine', None)
+        parameters = {}
+        secrets = {}
+        if engine is not None:
+            parameters = engine.get_parameters()
+            for token in tokens:
+                if token in engine.secrets:
+                    secrets[token] = engine.secrets[token]
+
+        references = {}
+        for token in tokens:
+            name = token.split('.')[0]
+            other = (index or {}).get(name)
+            if other is not None and name != node.name:
+                references[name] = (other.id,
+                                    other.private_ips,
+                                    other.public_ips)
+
+        status = node.extra.get('status')
+        data = {
+            'id': node.id,
+            'state': node.state,
+            'action': getattr(status, 'action', None),
+            'private_ips': node.private_ips,
+            'public_ips': node.public_ips,
+            'extra': dict((key, value) for key, value in node.extra.items()
+                          if isinstance(value, (str, int, type(None)))),
+            'settings': settings,
+            'domain': container.blueprint.get('domain', {}).get('name'),
+            'ethernet': container.blueprint.get('ethernet', {}).get('name'),
+            'parameters': parameters,
+            'secrets': secrets,
+            'references': references,
+            }
+
+        text = json.dumps(data, sort_keys=True, default=str)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _get_snapshot_key(self, node):
+        return '{}::{}'.format(self.facility.get_location_id(), node.name)
+
+    def is_unchanged(self, node, settings, container, index=None):
+        """
+        Tells if a node has not changed since the previous run
+
+        :param node: the node to be polished, as listed in bulk
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param settings: the fittings plan for this node
+        :type settings: ``dict``
+
+        :param container: the container of this node
+        :type container: :class:`plumbery.PlumberyInfrastructure`
+
+        :param index: nodes of the facility, listed in bulk
+        :type index: ``dict``
+
+        :return: ``True`` if the previous result can be used as-is
+        :rtype: ``bool``
+
+        This function is called before the node is enriched with
+        additional attributes, so that this can be avoided for nodes that
+        have not changed.
+
+        """
+
+        if not self.incremental:
+            return False
+
+        key = self._get_snapshot_key(node)
+        fingerprint = self.get_fingerprint(node, settings, container, index)
+        self._fingerprints[key] = fingerprint
+
+        entry = self._snapshot.get(key)
+        return entry is not None and entry[0] == fingerprint
+
+    def recall(self, node, settings, container):
+        """
+        Retrieves the previous result for an unchanged node
+
+        :return: the result saved for this node, or ``None``
+
+        Parameters are the same as for :meth:`is_unchanged`.
+
+        """
+
+        key = self._get_snapshot_key(node)
+        fingerprint = self._fingerprints.get(key)
+        if fingerprint is None:
+            fingerprint = self.get_fingerprint(node, settings, container)
+            self._fingerprints[key] = fingerprint
+
+        entry = self._snapshot.get(key)
+        if entry is None or entry[0] != fingerprint:
+            return None
+
+        self._previous.seek(entry[1])
+        data = json.loads(self._previous.readline().decode('utf-8'))['data']
+
+        self._save(key, data)
+        return data
+
+    def remember(self, node, data):
+        """
+        Saves the result computed for a node
+
+        :param node: the node that has been polished
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param data: the result for this node
+        :type data: anything that can be serialized in JSON
+
+        """
+
+        self._save(self._get_snapshot_key(node), data)
+
+    def _save(self, key, data):
+        """
+        Appends the result of one node to the new snapshot
+        """
+
+        if self._fresh is None or key in self._saved:
+            return
+
+        self._saved.add(key)
+        self._fresh.write({'key': key,
+                           'fingerprint': self._fingerprints.get(key),
+                           'data': data})
+
+    def write_output(self, text):
+        """
+        Writes the output file, unless it already has this content
+
+        :param text: the full output of the polisher
+        :type text: ``str``
+
+        :return: ``True`` if the file has been written
+        :rtype: ``bool``
+
+        """
+
+        fileName = self.settings['output']
+        if os.path.isfile(fileName):
+            with open(fileName, 'r') as stream:
+                if stream.read() == text:
+                    plogging.info("- '{}' is unchanged".format(fileName))
+                    return False
+
+        with open(fileName, 'w') as stream:
+            stream.write(text)
+
+        return True
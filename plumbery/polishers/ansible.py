@@ -13,7 +13,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import sys
+import tempfile
 
+from plumbery.inventory import PlumberyInventory
 from plumbery.polishers.inventory import InventoryPolisher
 from plumbery.plogging import plogging
 
@@ -43,6 +45,18 @@ class AnsiblePolisher(InventoryPolisher):
 
     """
 
+    def open_inventory(self):
+        """
+        Keeps inventory records in a temporary file
+
+        Records are read back by :meth:`reap` to build the inventory for
+        ansible, so that they do not have to stay in memory.
+
+        """
+
+        return PlumberyInventory(stream=tempfile.TemporaryFile('w+'),
+                                 format='jsonl')
+
     def reap(self):
         """
         Saves information gathered through the polishing sequence
@@ -123,7 +137,7 @@ class AnsiblePolisher(InventoryPolisher):
         hosts = []
         groups = {}
 
-        for item in self.inventory:
+        for item in self.inventory.read():
             host = item['name']
 
             if len(item['public_ips']) > 0:
@@ -150,22 +164,26 @@ class AnsiblePolisher(InventoryPolisher):
                     groups[tag] = []
                 groups[tag].append(host)
 
+        lines = []
+        for line in sorted(hosts):
+            lines.append(line+'\n')
+        lines.append('\n')
+
+        for group in sorted(groups.keys()):
+            lines.append('[{}]\n'.format(group))
+            for host in sorted(groups[group]):
+                lines.append('{}\n'.format(host))
+            lines.append('\n')
+        lines.append('\n')
+
         if 'output' in self.settings:
             fileName = self.settings['output']
             plogging.info("Writing inventory for ansible in '{}'".format(
                 fileName))
-            stream = open(fileName, 'w')
+            self.write_output(''.join(lines))
         else:
             plogging.info("Showing the inventory for ansible")
-            stream = sys.stdout
+            sys.stdout.write(''.join(lines))
 
-        for line in sorted(hosts):
-            stream.write(line+'\n')
-        stream.write('\n')
-
-        for group in sorted(groups.keys()):
-            stream.write('[{}]\n'.format(group))
-            for host in sorted(groups[group]):
-                stream.write('{}\n'.format(host))
-            stream.write('\n')
-        stream.write('\n')
+        self.inventory.stream.close()
+        self.save_snapshot()
@@ -14,9 +14,12 @@
 # limitations under the License.
 import time
 from six import string_types
+from libcloud.common.dimensiondata import TYPES_URN
+from libcloud.utils.xml import fixxpath, findall
 from plumbery.polishers.base import NodeConfiguration
 from plumbery.exception import ConfigurationError
 from plumbery.plogging import plogging
+from plumbery.util import parallel
 
 
 class BackupConfiguration(NodeConfiguration):
@@ -46,53 +49,151 @@ class BackupConfiguration(NodeConfiguration):
             return True
         return False
 
+    def configure_nodes(self, items, workers=10, timeout=600):
+        """
+        Configures backup of multiple nodes
+
+        :param items: nodes to be polished, with their respective settings
+        :type items: ``list`` of (:class:`libcloud.compute.base.Node`,
+            ``dict``)
+
+        :param workers: the maximum number of nodes changed concurrently
+        :type workers: ``int``
+
+        :param timeout: the maximum number of seconds to wait for backup
+        :type timeout: ``int``
+
+        :return: names of nodes that have been processed
+        :rtype: ``list`` of ``str``
+
+        Account details are fetched once, backup is started for all nodes
+        concurrently, then a single poller waits for all backup targets.
+        Clients are added to targets as soon as they are ready.
+
+        """
+
+        plans = []
+        for node, settings in items:
+            if self._element_name_ not in settings:
+                continue
+
+            plans.append((node, self._get_backup_settings(
+                settings[self._element_name_])))
+
+        if len(plans) < 1:
+            return []
+
+        plogging.info("Starting backup of {} nodes".format(len(plans)))
+
+        outcomes = parallel(lambda plan: self._start_backup(*plan),
+                            plans, workers)
+
+        started = [plan for plan, outcome in zip(plans, outcomes)
+                   if outcome]
+
+        ready = self._wait_for_backup([node for node, backup in started],
+                                      timeout=timeout)
+
+        parallel(lambda plan: self._add_clients(*plan),
+                 [(node, backup) for node, backup in started
+                  if node.id in ready],
+                 workers)
+
+        return [node.name for node, backup in plans]
+
     def deconfigure(self, node, settings):
         return True
 
-    def _configure_backup(self, node, backup):
+    def get_default_email(self):
         """
-        Configure backup on a node
+        Retrieves the e-mail address of the cloud account
 
-        :param node: the target node
-        :type node: :class:`libcloud.compute.base.Node`
+        :return: the address used by default for backup alerts
+        :rtype: ``str``
+
+        The API is called only once.
+
+        """
+
+        if getattr(self, '_default_email', None) is None:
+            self._default_email = \
+                self.facility.backup.connection.get_account_details().email
+
+        return self._default_email
+
+    def _get_backup_settings(self, backup):
+        """
+        Expands backup settings
 
         :param backup: The backup settings
         :type  backup: ``dict`` or ``str``
 
+        :return: complete backup settings
+        :rtype: ``dict``
+
         """
-        default_email = self.facility.backup.connection.get_account_details().email
+
         if isinstance(backup, string_types):
             backup = {
                 'plan': backup,
-                'email': default_email,
                 'clients': [{
                     'type': 'filesystem'
                 }]
             }
 
+        backup = dict(backup)
+        if 'email' not in backup:
+            backup['email'] = self.get_default_email()
+
+        return backup
+
+    def _configure_backup(self, node, backup):
+        """
+        Configure backup on a node
+
+        :param node: the target node
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param backup: The backup settings
+        :type  backup: ``dict`` or ``str``
+
+        """
+
+        backup = self._get_backup_settings(backup)
+
+        if not self._start_backup(node, backup):
+            return False
+
+        if node.id not in self._wait_for_backup([node]):
+            return False
+
+        return self._add_clients(node, backup)
+
+    def _start_backup(self, node, backup):
+        """
+        Enables backup of a node
+
+        :param node: the target node
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param backup: complete backup settings
+        :type  backup: ``dict``
+
+        :return: ``True`` if backup has been started, or was already there
+        :rtype: ``bool``
+
+        """
+
         plan = backup['plan'].lower().capitalize()
         plogging.info("Starting {} backup of node '{}'".format(
             plan.lower(), node.name))
 
-        backup_details = None
-        try:
-            self.facility.backup.create_target_from_node(
-                node,
-                extra={'servicePlan': plan})
-        except Exception as feedback:
-            if feedback.msg == 'Cloud backup for this server is already enabled or being enabled (state: NORMAL).':
-                plogging.info("- already there")
-                backup_details = self.facility.backup.ex_get_backup_details_for_target(node.id)
-            else:
-                plogging.info("- unable to start backup")
-                plogging.error(str(feedback))
-                return False
-
-        while (backup_details is not None and
-               backup_details.status is not 'NORMAL'):
+        while True:
             try:
-                backup_details = self.facility.backup.ex_get_backup_details_for_target(node.id)
-                plogging.info("- in progress, found asset %s", backup_details.asset_id)
+                self.facility.backup.create_target_from_node(
+                    node,
+                    extra={'servicePlan': plan})
+                plogging.info("- in progress")
 
             except Exception as feedback:
                 if 'RESOURCE_BUSY' in str(feedback):
@@ -103,18 +204,140 @@ class BackupConfiguration(NodeConfiguration):
                     time.sleep(10)
                     continue
 
+                elif 'already enabled' in str(feedback):
+                    plogging.info("- already there")
+
                 elif 'NO_CHANGE' in str(feedback):
                     plogging.info("- already there")
 
                 elif 'RESOURCE_LOCKED' in str(feedback):
                     plogging.info("- unable to start backup "
                                  "- node has been locked")
+                    return False
 
                 else:
                     plogging.info("- unable to start backup")
                     plogging.error(str(feedback))
+                    return False
 
             break
+
+        return True
+
+    def _get_backup_states(self, domains=None):
+        """
+        Retrieves the state of backup for nodes at this facility
+
+        :param domains: ids of network domains to look at, or ``None`` for
+            all nodes at this facility
+        :type domains: ``list`` of ``str``
+
+        :return: state of backup by node id, e.g., 'NORMAL'
+        :rtype: ``dict``
+
+        Nodes are listed with one request per network domain and per page
+        of 250 servers.
+
+        """
+
+        filters = [{'datacenterId': self.facility.get_location_id()}]
+        if domains is not None:
+            filters = [{'networkDomainId': domain}
+                       for domain in sorted(domains)]
+
+        states = {}
+        for filter in filters:
+            page = 1
+            while True:
+                params = dict(filter, pageSize=250, pageNumber=page)
+                element = self.facility.backup.connection\
+                    .request_with_orgId_api_2('server/server',
+                                              params=params).object
+
+                for server in findall(element, 'server', TYPES_URN):
+                    backup = server.find(fixxpath('backup', TYPES_URN))
+                    if backup is not None:
+                        states[server.get('id')] = backup.get('state')
+
+                if page * 250 >= int(element.get('totalCount', 0)):
+                    break
+                page += 1
+
+        return states
+
+    def _wait_for_backup(self, nodes, timeout=600, interval=10):
+        """
+        Waits for the backup of multiple nodes
+
+        :param nodes: the nodes that are waited for
+        :type nodes: ``list`` of :class:`libcloud.compute.base.Node`
+
+        :param timeout: the maximum number of seconds to wait
+        :type timeout: ``int``
+
+        :param interval: the number of seconds between checks
+        :type interval: ``int``
+
+        :return: ids of nodes with backup ready
+        :rtype: ``set`` of ``str``
+
+        Only network domains of these nodes are listed at each check.
+
+        """
+
+        domains = set(getattr(node, 'extra', {}).get('networkDomainId')
+                      for node in nodes)
+        if None in domains:
+            domains = None
+
+        pending = dict((node.id, node) for node in nodes)
+        ready = set()
+        deadline = time.time() + timeout
+        while len(pending) > 0:
+            try:
+                states = self._get_backup_states(domains)
+
+            except Exception as feedback:
+                if ('RESOURCE_BUSY' not in str(feedback)
+                        and 'RETRYABLE_SYSTEM_ERROR' not in str(feedback)):
+                    plogging.info("- unable to check backup")
+                    plogging.error(str(feedback))
+                    break
+
+                states = {}
+
+            for id in list(pending):
+                if states.get(id) == 'NORMAL':
+                    plogging.debug("- backup of '{}' is ready".format(
+                        pending[id].name))
+                    ready.add(id)
+                    del pending[id]
+
+            if len(pending) < 1:
+                break
+
+            if time.time() > deadline:
+                for node in pending.values():
+                    plogging.info("- unable to start backup of '{}'"
+                                 " - timeout".format(node.name))
+                break
+
+            time.sleep(interval)
+
+        return ready
+
+    def _add_clients(self, node, backup):
+        """
+        Adds backup clients to a node
+
+        :param node: the target node
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param backup: complete backup settings
+        :type  backup: ``dict``
+
+        """
+
         target = self.facility.backup.ex_get_target_by_id(node.id)
         storage_policies = self.facility.backup.ex_list_available_storage_policies(
             target=target
@@ -127,7 +350,7 @@ class BackupConfiguration(NodeConfiguration):
         )
         clients = backup.get('clients', [{'type': 'filesystem'}])
         for client in clients:
-            plogging.info("- adding backup client")
+            plogging.info("- adding backup client to '{}'".format(node.name))
 
             client_type = client.get('type', 'filesystem').lower()
             storage_policy = client.get(
@@ -135,7 +358,7 @@ class BackupConfiguration(NodeConfiguration):
             schedule_policy = client.get(
                 'schedulePolicy', '12AM - 6AM').lower()
             trigger = client.get('trigger', 'ON_FAILURE')
-            email = client.get('email', default_email)
+            email = client.get('email', backup['email'])
 
             try:
                 storage_policy = [x for x in storage_policies
@@ -25,6 +25,8 @@ from plumbery.polishers.disks import DisksConfiguration
 from plumbery.polishers.backup import BackupConfiguration
 from plumbery.polishers.windows import WindowsConfiguration
 from plumbery.plogging import plogging
+from plumbery.scheduler import scheduler
+from plumbery.util import parallel
 
 
 class ConfigurePolisher(PlumberyPolisher):
@@ -45,6 +47,21 @@ class ConfigurePolisher(PlumberyPolisher):
                            DisksConfiguration, BackupConfiguration,
                            WindowsConfiguration)
 
+    # configured for all nodes of a blueprint at once
+    blueprint_props = (BackupConfiguration, WindowsConfiguration)
+
+    def __init__(self, settings):
+        super(ConfigurePolisher, self).__init__(settings)
+
+        # names of nodes configured at the blueprint level, by prop
+        self.configured = {}
+
+        # names of nodes glued to networks at the blueprint level
+        self.glued = set()
+
+        # names of nodes with compute and disks set at the blueprint level
+        self.reconfigured = set()
+
     def move_to(self, facility):
         """
         Moves to another API endpoint
@@ -76,9 +93,13 @@ class ConfigurePolisher(PlumberyPolisher):
             return
 
         self.container = container
+        self.configured = {}
+        self.glued = set()
+        self.reconfigured = set()
 
         plogging.info("- waiting for nodes to be deployed")
 
+        ready = {}
         names = self.nodes.list_nodes(container.blueprint)
         for name in sorted(names):
             while True:
@@ -89,6 +110,7 @@ class ConfigurePolisher(PlumberyPolisher):
 
                 if node.extra['status'].action is None:
                     plogging.debug("- {} is ready".format(node.name))
+                    ready[name] = node
                     break
 
                 if (node is not None
@@ -106,9 +128,191 @@ class ConfigurePolisher(PlumberyPolisher):
 
         container._build_balancer()
 
-    def set_node_compute(self, node, cpu, memory):
+        self.configure_blueprint(container, ready)
+
+    def configure_blueprint(self, container, ready):
         """
-        Sets compute capability
+        Configures all nodes of a blueprint at once
+
+        :param container: the container to be polished
+        :type container: :class:`plumbery.PlumberyInfrastructure`
+
+        :param ready: deployed nodes, by name
+        :type ready: ``dict``
+
+        Compute, disks, backup, Windows and network interfaces are configured
+        concurrently across nodes. Nodes processed here are skipped
+        afterwards in :meth:`shine_node`.
+
+        """
+
+        items = []
+        for item in container.blueprint.get('nodes', []):
+            if not isinstance(item, dict):
+                continue
+
+            label = list(item)[0]
+            settings = item[label] or {}
+            for name in self.nodes.expand_labels(label):
+                if name in ready:
+                    items.append((ready[name], dict(settings, name=name)))
+
+        self.reconfigured = set(self.reconfigure_nodes(items))
+        self.configured[DisksConfiguration] = self.reconfigured
+
+        for prop_cls in self.blueprint_props:
+
+            try:
+                prop = prop_cls(engine=container.facility.plumbery,
+                                facility=self.facility)
+                for node, settings in items:
+                    prop.validate(settings)
+
+                self.configured[prop_cls] = set(prop.configure_nodes(items))
+
+            except ConfigurationError as ce:
+                if self.engine.safeMode:
+                    plogging.warning(str(ce))
+                else:
+                    raise ce
+
+        self.glued = set(self.attach_nodes(items))
+
+    def reconfigure_nodes(self, items, workers=10):
+        """
+        Changes compute and storage of multiple nodes
+
+        :param items: nodes to be polished, with their respective settings
+        :type items: ``list`` of (:class:`libcloud.compute.base.Node`,
+            ``dict``)
+
+        :param workers: the maximum number of nodes changed concurrently
+        :type workers: ``int``
+
+        :return: names of nodes that have been processed
+        :rtype: ``list`` of ``str``
+
+        Changes to cpu, memory and disks are planned for all nodes first.
+        Then nodes are changed concurrently, while changes to one node are
+        made in sequence by :meth:`apply_node_changes`.
+
+        """
+
+        disks = DisksConfiguration(engine=self.engine,
+                                   facility=self.facility)
+
+        plans = []
+        names = []
+        for node, settings in items:
+            plogging.info("Reconfiguring node '{}'".format(
+                settings.get('name', node.name)))
+
+            try:
+                operations = self.plan_node_changes(node, settings, disks)
+
+            except ConfigurationError as ce:
+                if self.engine.safeMode:
+                    plogging.warning(str(ce))
+                    continue
+                else:
+                    raise ce
+
+            if len(operations) > 0:
+                plans.append((node, operations))
+            names.append(node.name)
+
+        parallel(lambda plan: self.apply_node_changes(plan[0], plan[1], disks),
+                 plans, workers)
+
+        return names
+
+    def plan_node_changes(self, node, settings, disks):
+        """
+        Compares actual and expected compute and storage of a node
+
+        :param node: the node to be polished
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param settings: the fittings plan for this node
+        :type settings: ``dict``
+
+        :param disks: the configuration of virtual disks
+        :type disks: :class:`plumbery.polishers.disks.DisksConfiguration`
+
+        :return: the changes to be made, in sequence
+        :rtype: ``list`` of ``dict``
+
+        Changes of cpu and memory are merged into one single operation,
+        that comes first. Then existing disks are changed, and new disks
+        are added at the end since this takes the longest time.
+
+        """
+
+        cpu_prop = CpuConfiguration()
+        cpu_prop.validate(settings)
+        cpu = cpu_prop.configure(node, settings)
+
+        ram_prop = MemoryConfiguration()
+        ram_prop.validate(settings)
+        memory = ram_prop.configure(node, settings)
+
+        operations = self.plan_node_compute(node,
+                                            cpu or None,
+                                            memory or None)
+
+        if disks._element_name_ in settings:
+            disks.validate(settings)
+            operations += disks.plan_node_disks(node, settings)
+
+        return operations
+
+    def apply_node_changes(self, node, operations, disks=None):
+        """
+        Changes compute and storage of a node
+
+        :param node: the node to be polished
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param operations: changes computed by :meth:`plan_node_changes`
+        :type operations: ``list`` of ``dict``
+
+        :param disks: the configuration of virtual disks
+        :type disks: :class:`plumbery.polishers.disks.DisksConfiguration`
+
+        Every change, to compute or to a disk, is sent with
+        :meth:`plumbery.scheduler.PlumberyScheduler.change_node`. So it is
+        made under the reservation of the server, and it starts only when
+        the previous one has completed.
+
+        """
+
+        for operation in operations:
+
+            if operation['action'] != 'compute':
+                disks.apply_node_disks(node, [operation])
+                continue
+
+            if self.engine.safeMode:
+                plogging.info("- skipped - safe mode")
+                continue
+
+            try:
+                scheduler.change_node(
+                    self.region, node,
+                    self.region.ex_reconfigure_node,
+                    node,
+                    memory_gb=operation['memory'],
+                    cpu_count=operation['cpu_count'],
+                    cores_per_socket=operation['cores_per_socket'],
+                    cpu_performance=operation['cpu_performance'])
+
+            except Exception as feedback:
+                plogging.info("- unable to reconfigure node")
+                plogging.error(str(feedback))
+
+    def plan_node_compute(self, node, cpu, memory):
+        """
+        Compares actual and expected compute capability of a node
 
         :param node: the node to be polished
         :type node: :class:`libcloud.compute.base.Node`
@@ -119,8 +323,21 @@ class ConfigurePolisher(PlumberyPolisher):
         :param memory: the memory size, expressed in Giga bytes
         :type memory: ``int``
 
+        :return: one operation with changed attributes, or nothing
+        :rtype: ``list`` of ``dict``
+
+        Memory is put in the operation only if it differs, and cpu
+        attributes only if one of them differs. Other values are left to
+        ``None`` so that they are not sent to the API.
+
         """
 
+        operation = {'action': 'compute',
+                     'memory': None,
+                     'cpu_count': None,
+                     'cores_per_socket': None,
+                     'cpu_performance': None}
+
         changed = False
 
         if cpu is not None and 'cpu' in node.extra:
@@ -142,45 +359,43 @@ class ConfigurePolisher(PlumberyPolisher):
                     cpu.performance.lower()))
                 changed = True
 
+            # cpu attributes are always set together
+            if changed:
+                operation['cpu_count'] = cpu.cpu_count
+                operation['cores_per_socket'] = cpu.cores_per_socket
+                operation['cpu_performance'] = cpu.performance
+
         if memory is not None and 'memoryMb' in node.extra:
 
             if memory != int(node.extra['memoryMb']/1024):
                 plogging.info("- changing to {} GB memory".format(
                     memory))
+                operation['memory'] = memory
                 changed = True
 
         if not changed:
             plogging.debug("- no change in compute")
-            return
+            return []
 
-        if self.engine.safeMode:
-            plogging.info("- skipped - safe mode")
-            return
+        return [operation]
 
-        while True:
-            try:
-                self.region.ex_reconfigure_node(
-                    node=node,
-                    memory_gb=memory,
-                    cpu_count=cpu.cpu_count,
-                    cores_per_socket=cpu.cores_per_socket,
-                    cpu_performance=cpu.performance)
+    def set_node_compute(self, node, cpu, memory):
+        """
+        Sets compute capability
 
-                plogging.info("- in progress")
+        :param node: the node to be polished
+        :type node: :class:`libcloud.compute.base.Node`
 
-            except Exception as feedback:
-                if 'RESOURCE_BUSY' in str(feedback):
-                    time.sleep(10)
-                    continue
+        :param cpu: the cpu specification
+        :type cpu: ``DimensionDataServerCpuSpecification``
 
-                if 'Please try again later' in str(feedback):
-                    time.sleep(10)
-                    continue
+        :param memory: the memory size, expressed in Giga bytes
+        :type memory: ``int``
 
-                plogging.info("- unable to reconfigure node")
-                plogging.error(str(feedback))
+        """
 
-            break
+        self.apply_node_changes(node,
+                                self.plan_node_compute(node, cpu, memory))
 
     def attach_node(self, node, networks):
         """
@@ -222,10 +437,64 @@ class ConfigurePolisher(PlumberyPolisher):
 
         """
 
-        hasChanged = False
+        return self.execute_attachments(
+            node, self.plan_attachments(node, networks))
+
+    def attach_nodes(self, items, workers=10):
+        """
+        Glues all nodes of a blueprint to their networks at once
+
+        :param items: nodes of the blueprint, with their settings
+        :type items: ``list`` of (:class:`Node`, ``dict``)
+
+        :param workers: the maximum number of nodes changed concurrently
+        :type workers: ``int``
+
+        :return: the names of nodes that have been processed
+        :rtype: ``list`` of ``str``
+
+        Attachments are planned for all nodes first, without any call to
+        the API apart from the listing of networks. Then they are executed
+        concurrently across nodes. Each worker lists network interfaces of
+        its node, and makes changes one at a time, under the reservation of
+        this server.
+
+        """
+
+        plans = []
+        for node, settings in items:
+            if node is not None and 'glue' in settings:
+                plans.append((node,
+                              self.plan_attachments(node, settings['glue'])))
+
+        parallel(lambda item: self.execute_attachments(item[0], item[1]),
+                 plans, workers)
+
+        return [node.name for node, plan in plans]
+
+    def plan_attachments(self, node, networks):
+        """
+        Lists changes needed to glue a node to multiple networks
+
+        :param node: the target node
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param networks: a list of networks to connect, and ``internet``
+        :type networks: list of ``str``
+
+        :return: the changes to make, for :meth:`execute_attachments`
+        :rtype: ``list`` of ``tuple``
+
+        Networks are looked up and addresses are computed. Networks to
+        which the node is attached already are skipped later on, by
+        :meth:`execute_attachments`.
+
+        """
+
+        plan = []
 
         if node is None:
-            return hasChanged
+            return plan
 
         for line in networks:
 
@@ -233,7 +502,7 @@ class ConfigurePolisher(PlumberyPolisher):
             token = tokens.pop(0)
 
             if token.lower() == 'internet':
-                self.attach_node_to_internet(node, tokens)
+                plan.append(('internet', tokens))
                 continue
 
             if token == self.container.blueprint['ethernet']['name']:
@@ -242,10 +511,10 @@ class ConfigurePolisher(PlumberyPolisher):
             if token.lower() == 'primary':
                 continue
 
-            plogging.info("Glueing node '{}' to network '{}'"
-                         .format(node.name, token))
             vlan = self.container.get_ethernet(token.split('::'))
             if vlan is None:
+                plogging.info("Glueing node '{}' to network '{}'"
+                             .format(node.name, token))
                 plogging.info("- network '{}' is unknown".format(token))
                 continue
 
@@ -262,16 +531,70 @@ class ConfigurePolisher(PlumberyPolisher):
                 kwargs['private_ipv4'] = private_ipv4
 
             if self.engine.safeMode:
+                plogging.info("Glueing node '{}' to network '{}'"
+                             .format(node.name, token))
                 plogging.info("- skipped - safe mode")
                 continue
 
             if 'private_ipv4' not in kwargs:
                 kwargs['vlan'] = vlan
 
+            plan.append(('network', token, kwargs, vlan.name))
+
+        return plan
+
+    def execute_attachments(self, node, plan):
+        """
+        Glues a node to multiple networks, as planned
+
+        :param node: the target node
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param plan: changes returned by :meth:`plan_attachments`
+        :type plan: ``list`` of ``tuple``
+
+        :return: ``True`` if some network interface has been added
+        :rtype: ``bool``
+
+        Network interfaces of the node are listed once, on the first
+        network of the plan.
+
+        """
+
+        hasChanged = False
+
+        attached = None
+        for item in plan:
+
+            if item[0] == 'internet':
+                self.attach_node_to_internet(node, item[1])
+                continue
+
+            token, kwargs, name = item[1], item[2], item[3]
+
+            plogging.info("Glueing node '{}' to network '{}'"
+                         .format(node.name, token))
+
+            if attached is None:
+                try:
+                    attached = [interface['network'] for interface
+                                in self.nodes._list_secondary_interfaces(node)]
+
+                except Exception as feedback:
+                    plogging.debug(str(feedback))
+                    attached = []
+
+            if name in attached:
+                plogging.info("- already there")
+                continue
+
             while True:
                 try:
-                    self.region.ex_attach_node_to_vlan(node, **kwargs)
-                    plogging.info("- in progress")
+                    with scheduler.lock(
+                            node=node,
+                            until=scheduler.node_is_idle(self.region, node)):
+                        self.region.ex_attach_node_to_vlan(node, **kwargs)
+                        plogging.info("- in progress")
                     hasChanged = True
 
                 except Exception as feedback:
@@ -314,11 +637,13 @@ class ConfigurePolisher(PlumberyPolisher):
 
         internal_ip = node.private_ips[0]
 
+        table = self.container.get_nat_table(domain)
+
         external_ip = None
-        for rule in self.region.ex_list_nat_rules(domain):
-            if rule.internal_ip == internal_ip:
-                external_ip = rule.external_ip
-                plogging.info("- node is reachable at '{}'".format(external_ip))
+        rule = table.get_by_internal(internal_ip)
+        if rule is not None:
+            external_ip = rule.external_ip
+            plogging.info("- node is reachable at '{}'".format(external_ip))
 
         if self.engine.safeMode:
             plogging.info("- skipped - safe mode")
@@ -333,10 +658,12 @@ class ConfigurePolisher(PlumberyPolisher):
 
             while True:
                 try:
-                    self.region.ex_create_nat_rule(
-                        domain,
-                        internal_ip,
-                        external_ip)
+                    with scheduler.lock(domain=domain):
+                        rule = self.region.ex_create_nat_rule(
+                            domain,
+                            internal_ip,
+                            external_ip)
+                    table.add(rule)
                     plogging.info("- node is reachable at '{}'".format(
                         external_ip))
 
@@ -347,11 +674,13 @@ class ConfigurePolisher(PlumberyPolisher):
 
                     elif 'RESOURCE_LOCKED' in str(feedback):
                         plogging.info("- not now - locked")
+                        self.container._put_back_ipv4(external_ip)
                         return
 
                     else:
                         plogging.info("- unable to add address translation")
                         plogging.error(str(feedback))
+                        self.container._put_back_ipv4(external_ip)
 
                 break
 
@@ -415,16 +744,17 @@ class ConfigurePolisher(PlumberyPolisher):
             return
 
         try:
-            cpu_prop = CpuConfiguration()
-            cpu_prop.validate(settings)
-            cpu = cpu_prop.configure(node, settings)
+            if node.name not in self.reconfigured:
+                cpu_prop = CpuConfiguration()
+                cpu_prop.validate(settings)
+                cpu = cpu_prop.configure(node, settings)
 
-            ram_prop = MemoryConfiguration()
-            ram_prop.validate(settings)
-            memory = ram_prop.configure(node, settings)
+                ram_prop = MemoryConfiguration()
+                ram_prop.validate(settings)
+                memory = ram_prop.configure(node, settings)
 
-            if memory is not False and cpu is not False:
-                self.set_node_compute(node, cpu, memory)
+                if memory is not False and cpu is not False:
+                    self.set_node_compute(node, cpu, memory)
 
         except ConfigurationError as ce:
 
@@ -435,6 +765,9 @@ class ConfigurePolisher(PlumberyPolisher):
 
         for prop_cls in self.configuration_props:
 
+            if node.name in self.configured.get(prop_cls, ()):
+                continue
+
             try:
                 configuration_prop = prop_cls(engine=container.facility.plumbery,
                                               facility=self.facility)
@@ -449,5 +782,5 @@ class ConfigurePolisher(PlumberyPolisher):
 
         container._add_to_pool(node)
 
-        if 'glue' in settings:
+        if 'glue' in settings and node.name not in self.glued:
             self.attach_node(node, settings['glue'])
@@ -12,11 +12,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import time
-
 from plumbery.polishers.base import NodeConfiguration
 from plumbery.exception import ConfigurationError
 from plumbery.plogging import plogging
+from plumbery.scheduler import scheduler
 
 
 class DisksConfiguration(NodeConfiguration):
@@ -61,26 +60,150 @@ class DisksConfiguration(NodeConfiguration):
 
     def configure(self, node, settings):
         if self._element_name_ in settings:
-            for item in settings['disks']:
-                plogging.debug("- setting disk {}".format(item))
-                attributes = item.split()
-                if len(attributes) < 2:
-                    plogging.info("- malformed disk attributes;"
-                                 " provide disk id and size in GB, e.g., 1 50;"
-                                 " add disk type if needed, e.g., economy")
-                elif len(attributes) < 3:
-                    id = int(attributes[0])
-                    size = int(attributes[1])
-                    speed = 'standard'
-                else:
-                    id = int(attributes[0])
-                    size = int(attributes[1])
-                    speed = attributes[2]
-
-                self.set_node_disk(node, id, size, speed)
+            operations = self.plan_node_disks(node, settings)
+            self.apply_node_disks(node, operations)
             return True
         return False
 
+    def plan_node_disks(self, node, settings):
+        """
+        Compares actual and expected disks of a node
+
+        :param node: the node to be polished
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param settings: the fittings plan for this node
+        :type settings: ``dict``
+
+        :return: the changes to be made, in sequence
+        :rtype: ``list`` of ``dict``
+
+        Each change is a dictionary with keys ``action``, that is either
+        ``expand``, ``speed`` or ``add``, ``scsiId``, ``size`` and ``speed``.
+        Existing disks are changed before new disks are added, in the
+        order of their SCSI id.
+
+        """
+
+        expected = {}
+        for item in settings.get(self._element_name_, []):
+            plogging.debug("- setting disk {}".format(item))
+            attributes = item.split()
+            if len(attributes) < 2:
+                plogging.info("- malformed disk attributes;"
+                             " provide disk id and size in GB, e.g., 1 50;"
+                             " add disk type if needed, e.g., economy")
+                continue
+
+            id = int(attributes[0])
+            size = int(attributes[1])
+            speed = 'standard'
+            if len(attributes) > 2:
+                speed = attributes[2].lower()
+
+            if size < 1:
+                plogging.info("- minimum disk size is 1 GB")
+                continue
+
+            if size > 1000:
+                plogging.info("- disk size cannot exceed 1000 GB")
+                continue
+
+            if speed not in ('standard', 'highperformance', 'economy'):
+                plogging.info("- disk speed should be either 'standard' "
+                             "or 'highperformance' or 'economy'")
+                continue
+
+            expected[id] = (size, speed)
+
+        if node is None:
+            return []
+
+        actual = {}
+        for disk in node.extra.get('disks', []):
+            actual[disk['scsiId']] = disk
+
+        changes = []
+        additions = []
+        for id in sorted(expected):
+            size, speed = expected[id]
+            disk = actual.get(id)
+
+            if disk is None:
+                additions.append({'action': 'add',
+                                  'scsiId': id,
+                                  'size': size,
+                                  'speed': speed})
+                continue
+
+            changed = False
+
+            if disk['size'] > size:
+                plogging.info("- disk shrinking could break the node")
+                plogging.info("- skipped - disk {} will not be reduced"
+                             .format(id))
+
+            if disk['size'] < size:
+                changes.append({'action': 'expand',
+                                'scsiId': id,
+                                'id': disk['id'],
+                                'size': size,
+                                'speed': speed})
+                changed = True
+
+            if disk['speed'].lower() != speed:
+                changes.append({'action': 'speed',
+                                'scsiId': id,
+                                'id': disk['id'],
+                                'size': size,
+                                'speed': speed})
+                changed = True
+
+            if not changed:
+                plogging.debug("- no change in disk {}".format(id))
+
+        return changes + additions
+
+    def apply_node_disks(self, node, operations):
+        """
+        Changes virtual disks of a node
+
+        :param node: the node to be polished
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param operations: changes computed by :meth:`plan_node_disks`
+        :type operations: ``list`` of ``dict``
+
+        Each change is made under the reservation of the server, and the
+        next one is sent only when the node has no more pending action.
+
+        """
+
+        for operation in operations:
+
+            if operation['action'] == 'expand':
+                plogging.info("- expanding disk {} of '{}' to {} GB"
+                             .format(operation['scsiId'], node.name,
+                                     operation['size']))
+                self.change_node_disk_size(node,
+                                           operation['id'],
+                                           operation['size'])
+
+            elif operation['action'] == 'speed':
+                plogging.info("- changing disk {} of '{}' to '{}'"
+                             .format(operation['scsiId'], node.name,
+                                     operation['speed']))
+                self.change_node_disk_speed(node,
+                                            operation['id'],
+                                            operation['speed'])
+
+            else:
+                plogging.info("- adding {} GB '{}' disk to '{}'".format(
+                    operation['size'], operation['speed'], node.name))
+                self.add_node_disk(node,
+                                   operation['size'],
+                                   operation['speed'])
+
     def deconfigure(self, node, settings):
         return True
 
@@ -103,76 +226,41 @@ class DisksConfiguration(NodeConfiguration):
 
         """
 
-        if size < 1:
-            plogging.info("- minimum disk size is 1 GB")
-            return
-
-        if size > 1000:
-            plogging.info("- disk size cannot exceed 1000 GB")
-            return
+        settings = {self._element_name_: ['{} {} {}'.format(id, size, speed)]}
+        self.apply_node_disks(node, self.plan_node_disks(node, settings))
 
-        if speed not in ('standard', 'highperformance', 'economy'):
-            plogging.info("- disk speed should be either 'standard' "
-                         "or 'highperformance' or 'economy'")
-            return
-
-        if 'disks' in node.extra:
-            for disk in node.extra['disks']:
-                if disk['scsiId'] == id:
-                    changed = False
-
-                    if disk['size'] > size:
-                        plogging.info("- disk shrinking could break the node")
-                        plogging.info("- skipped - disk {} will not be reduced"
-                                     .format(id))
-
-                    if disk['size'] < size:
-                        plogging.info("- expanding disk {} to {} GB"
-                                     .format(id, size))
-                        self.change_node_disk_size(node, disk['id'], size)
-                        changed = True
+    def add_node_disk(self, node, size, speed='standard'):
+        """
+        Adds a virtual disk
 
-                    if disk['speed'].lower() != speed.lower():
-                        plogging.info("- changing disk {} to '{}'"
-                                     .format(id, speed))
-                        self.change_node_disk_speed(node, disk['id'], speed)
-                        changed = True
+        :param node: the node to be polished
+        :type node: :class:`libcloud.compute.base.Node`
 
-                    if not changed:
-                        plogging.debug("- no change in disk {}".format(id))
+        :param size: the disk size, expressed in Giga bytes
+        :type size: ``int``
 
-                    return
+        :param speed: storage type, either 'standard',
+            'highperformance' or 'economy'
+        :type speed: ``str``
 
-        plogging.info("- adding {} GB '{}' disk".format(
-            size, speed))
+        """
 
 #        if self.engine.safeMode:
 #            plogging.info("- skipped - safe mode")
 #            return
 
-        while True:
-            try:
-                self.facility.region.ex_add_storage_to_node(
-                    node=node,
-                    amount=size,
-                    speed=speed.upper())
-
-                plogging.info("- in progress")
+        region = self.facility.region
+        try:
+            scheduler.change_node(region, node,
+                                  region.ex_add_storage_to_node,
+                                  node,
+                                  amount=size,
+                                  speed=speed.upper())
 
-            except Exception as feedback:
-                if 'RESOURCE_BUSY' in str(feedback):
-                    time.sleep(10)
-                    continue
-
-                if 'Please try again later' in str(feedback):
-                    time.sleep(10)
-                    continue
-
-                plogging.info("- unable to add disk {} GB '{}'"
-                             .format(size, speed))
-                plogging.error(str(feedback))
-
-            break
+        except Exception as feedback:
+            plogging.info("- unable to add disk {} GB '{}'"
+                         .format(size, speed))
+            plogging.error(str(feedback))
 
     def change_node_disk_size(self, node, id, size):
         """
@@ -193,29 +281,18 @@ class DisksConfiguration(NodeConfiguration):
             plogging.info("- skipped - safe mode")
             return
 
-        while True:
-            try:
-                self.facility.region.ex_change_storage_size(
-                    node=node,
-                    disk_id=id,
-                    size=size)
-
-                plogging.info("- in progress")
-
-            except Exception as feedback:
-                if 'RESOURCE_BUSY' in str(feedback):
-                    time.sleep(10)
-                    continue
-
-                if 'Please try again later' in str(feedback):
-                    time.sleep(10)
-                    continue
+        region = self.facility.region
+        try:
+            scheduler.change_node(region, node,
+                                  region.ex_change_storage_size,
+                                  node,
+                                  disk_id=id,
+                                  size=size)
 
-                plogging.info("- unable to change disk size to {}GB"
-                             .format(size))
-                plogging.error(str(feedback))
-
-            break
+        except Exception as feedback:
+            plogging.info("- unable to change disk size to {}GB"
+                         .format(size))
+            plogging.error(str(feedback))
 
     def change_node_disk_speed(self, node, id, speed):
         """
@@ -237,26 +314,15 @@ class DisksConfiguration(NodeConfiguration):
             plogging.info("- skipped - safe mode")
             return
 
-        while True:
-            try:
-                self.facility.region.ex_change_storage_speed(
-                    node=node,
-                    disk_id=id,
-                    speed=speed)
-
-                plogging.info("- in progress")
-
-            except Exception as feedback:
-                if 'RESOURCE_BUSY' in str(feedback):
-                    time.sleep(10)
-                    continue
-
-                if 'Please try again later' in str(feedback):
-                    time.sleep(10)
-                    continue
-
-                plogging.info("- unable to change disk to '{}'"
-                             .format(speed))
-                plogging.error(str(feedback))
-
-            break
\ No newline at end of file
+        region = self.facility.region
+        try:
+            scheduler.change_node(region, node,
+                                  region.ex_change_storage_speed,
+                                  node,
+                                  disk_id=id,
+                                  speed=speed)
+
+        except Exception as feedback:
+            plogging.info("- unable to change disk to '{}'"
+                         .format(speed))
+            plogging.error(str(feedback))
\ No newline at end of file
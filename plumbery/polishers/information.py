@@ -27,8 +27,14 @@ class InformationPolisher(PlumberyPolisher):
     """
     Shows information attached to fittings plan, to containers, to nodes
 
+    Nodes are listed in bulk, and the information of each node is kept in
+    a snapshot next to the output file, if any. On next run, only nodes
+    that have changed since then are examined again.
+
     """
 
+    incremental = True
+
     def go(self, engine):
         """
         Lists information registered at the highest level of fittings plan
@@ -41,6 +47,7 @@ class InformationPolisher(PlumberyPolisher):
         self.engine = engine
 
         self.information = []
+        self.load_snapshot()
 
         environment = PlumberyContext(context=self.engine)
 
@@ -252,18 +259,51 @@ class InformationPolisher(PlumberyPolisher):
 
         plogging.info("- examinating node '{}'".format(settings['name']))
 
+        if node is not None:
+            lines = self.recall(node, settings, container)
+            if lines is None:
+                lines = self.describe_node(node, settings, container)
+                self.remember(node, lines)
+
+        else:
+            plogging.debug("- not found")
+            lines = ["node is unknown"]
+
+        if len(lines) < 1:
+            return
+
+        self.information.append("About '{}':".format(settings['name']))
+
+        for line in lines:
+            self.information.append("- {}".format(line))
+
+    def describe_node(self, node, settings, container):
+        """
+        Lists information for an existing node
+
+        :param node: the node to be described
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param settings: the fittings plan for this node
+        :type settings: ``dict``
+
+        :param container: the container of this node
+        :type container: :class:`plumbery.PlumberyInfrastructure`
+
+        :return: lines of text
+        :rtype: ``list`` of ``str``
+
+        """
+
         lines = []
 
-        if (node is not None and 'description' in node.extra):
+        if 'description' in node.extra:
             description = node.extra['description'].replace(
                 '#plumbery', '').strip()
             if len(description) > 0:
                 lines.append(description)
 
-        if node is None:
-            plogging.debug("- not found")
-            lines.append("node is unknown")
-        elif node.state == NodeState.RUNNING:
+        if node.state == NodeState.RUNNING:
             lines.append("node is up and running")
         elif node.state in [NodeState.TERMINATED,
                             NodeState.STOPPED,
@@ -272,17 +312,10 @@ class InformationPolisher(PlumberyPolisher):
         else:
             lines.append("state: {}".format(node.state))
 
-        if node is not None:
-            lines += self.list_information(
-                node=node, settings=settings, container=container)
+        lines += self.list_information(
+            node=node, settings=settings, container=container)
 
-        if len(lines) < 1:
-            return
-
-        self.information.append("About '{}':".format(settings['name']))
-
-        for line in lines:
-            self.information.append("- {}".format(line))
+        return lines
 
     def reap(self):
         """
@@ -294,14 +327,15 @@ class InformationPolisher(PlumberyPolisher):
 
         """
 
+        self.save_snapshot()
+
         if len(self.information) < 1:
             return
 
         if 'output' in self.settings:
             fileName = self.settings['output']
             plogging.info("Writing information in '{}'".format(fileName))
-            stream = open(fileName, 'w')
-            stream.write('\n'.join(self.information)+'\n')
+            self.write_output('\n'.join(self.information)+'\n')
         else:
             plogging.info('\n'.join(self.information)+'\n')
 
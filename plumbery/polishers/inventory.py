@@ -13,9 +13,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import sys
-import yaml
+import json
 
+from plumbery.inventory import PlumberyInventory
 from plumbery.polisher import PlumberyPolisher
 from plumbery.plogging import plogging
 
@@ -35,15 +35,24 @@ class InventoryPolisher(PlumberyPolisher):
         actions:
           - inventory:
               output: inventory.yaml
+              format: yaml    # or jsonl
         ---
         # Frankfurt in Europe
         locationId: EU6
         regionId: dd-eu
         ...
 
+    Nodes are listed in bulk, and the outcome of each run is kept in a
+    snapshot next to the output file. On next run, only nodes that have
+    changed since then are examined again.
+
+    Records are written one at a time, as nodes are examined, either as
+    items of a YAML list, or as JSON Lines.
 
     """
 
+    incremental = True
+
     def go(self, engine):
         """
         Restarts the inventory process
@@ -51,7 +60,27 @@ class InventoryPolisher(PlumberyPolisher):
 
         super(InventoryPolisher, self).go(engine)
 
-        self.inventory = []
+        self.inventory = self.open_inventory()
+        self.load_snapshot()
+
+    def open_inventory(self):
+        """
+        Prepares the stream of inventory records
+
+        :return: a writer of records
+        :rtype: :class:`plumbery.inventory.PlumberyInventory`
+
+        """
+
+        if 'output' in self.settings:
+            fileName = self.settings['output']
+            plogging.info("Writing inventory in '{}'".format(fileName))
+        else:
+            fileName = None
+            plogging.info("Showing the inventory")
+
+        return PlumberyInventory(fileName,
+                                 format=self.settings.get('format', 'yaml'))
 
     def shine_node(self, node, settings, container):
         """
@@ -77,6 +106,33 @@ class InventoryPolisher(PlumberyPolisher):
             plogging.info("- not found")
             return
 
+        data = self.recall(node, settings, container)
+        if data is not None:
+            self.inventory.write(data)
+            plogging.info("- unchanged")
+            return
+
+        data = self.describe_node(node, container)
+        self.inventory.write(data)
+        self.remember(node, data)
+
+        plogging.info("- done")
+
+    def describe_node(self, node, container):
+        """
+        Lists attributes of a node
+
+        :param node: the node to be described
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param container: the container of this node
+        :type container: :class:`plumbery.PlumberyInfrastructure`
+
+        :return: attributes of the node, as plain values
+        :rtype: ``dict``
+
+        """
+
         data = {}
         data['type'] = 'node'
         data['id'] = node.id
@@ -139,9 +195,8 @@ class InventoryPolisher(PlumberyPolisher):
                  if tag.startswith("#")}
         data['tags'] = tags
 
-        self.inventory.append(data)
-
-        plogging.info("- done")
+        # objects provided by the driver are turned to strings
+        return json.loads(json.dumps(data, default=str))
 
     def reap(self):
         """
@@ -153,15 +208,15 @@ class InventoryPolisher(PlumberyPolisher):
 
         """
 
-        if len(self.inventory) < 1:
-            return
+        self.inventory.close()
+        self.save_snapshot()
 
-        if 'output' in self.settings:
-            fileName = self.settings['output']
-            plogging.info("Writing inventory in '{}'".format(fileName))
-            stream = open(fileName, 'w')
-        else:
-            plogging.info("Showing the inventory")
-            stream = sys.stdout
+    def abort(self):
+        """
+        Removes the unfinished inventory
+        """
+
+        if getattr(self, 'inventory', None) is not None:
+            self.inventory.discard()
 
-        stream.write(yaml.dump(self.inventory, default_flow_style=False))
+        super(InventoryPolisher, self).abort()
@@ -64,10 +64,10 @@ class PingPolisher(PlumberyPolisher):
         if len(node.public_ips) < 1:
             domain = container.get_network_domain(
                 container.blueprint['domain']['name'])
-            for rule in container.region.ex_list_nat_rules(domain):
-                if rule.internal_ip == node.private_ips[0]:
-                    node.public_ips.append(rule.external_ip)
-                    break
+            rule = container.get_nat_table(domain).get_by_internal(
+                node.private_ips[0])
+            if rule is not None:
+                node.public_ips.append(rule.external_ip)
 
         if len(node.public_ips) > 0:
             plogging.info("- public: {}".format(
@@ -13,18 +13,183 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
+import subprocess
+import threading
 import time
 import requests
 
 from pywinexe.api import cmd as run_cmd
 from pywinexe.api import ps as run_ps
+from pywinexe.models import Request as WinexeRequest
 
 from libcloud.compute.types import NodeState
 import winrm
 from winrm.protocol import Protocol
 
+from plumbery.exception import PlumberyException
+from plumbery.nodes import PlumberyNodes
 from plumbery.polishers.base import NodeConfiguration
 from plumbery.plogging import plogging
+from plumbery.util import parallel
+
+
+class WindowsSession(object):
+    """
+    One authenticated WinRM shell on a remote node
+
+    :param ip: the address of the remote node
+    :type ip: ``str``
+
+    :param username: the account used on the remote node
+    :type username: ``str``
+
+    :param password: the password of this account
+    :type password: ``str``
+
+    The shell is opened once, and then it is used for all commands sent to
+    the node, until the session is closed.
+
+    Example::
+
+        with WindowsSession(ip, 'administrator', secret) as session:
+            out, err = session.run('ipconfig', ['/all'])
+            out, err = session.run_batch([
+                ('powershell.exe', ['Rename-Computer', '-NewName', 'web']),
+                ('net', ['start', 'w3svc'])])
+
+    """
+
+    def __init__(self, ip, username, password):
+        self.ip = ip
+        self.username = username
+        self.password = password
+        self.protocol = None
+        self.shell_id = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self):
+        """
+        Authenticates and opens a shell on the remote node
+        """
+
+        if self.shell_id is not None:
+            return
+
+        self.protocol = Protocol(
+                endpoint='http://%s:5985/wsman' % self.ip,  # RFC 2732
+                transport='ntlm',
+                username=self.username,
+                password=self.password,
+                server_cert_validation='ignore')
+        self.shell_id = self.protocol.open_shell()
+
+    def close(self):
+        """
+        Closes the shell, if any
+        """
+
+        if self.shell_id is None:
+            return
+
+        try:
+            self.protocol.close_shell(self.shell_id)
+        except Exception as feedback:
+            plogging.debug("- unable to close shell on %s: %s",
+                           self.ip, str(feedback))
+
+        self.shell_id = None
+        self.protocol = None
+
+    def run(self, command, params=[]):
+        """
+        Runs one command in the shell
+
+        :param command: the command to run, e.g., ``ipconfig``
+        :type command: ``str``
+
+        :param params: arguments of the command, e.g., ``['/all']``
+        :type params: ``list`` of ``str``
+
+        :return: standard output and standard error
+        :rtype: ``tuple`` of ``str``
+
+        """
+
+        self.open()
+        command_id = self.protocol.run_command(self.shell_id, command, params)
+        try:
+            std_out, std_err, status_code = self.protocol.get_command_output(
+                self.shell_id, command_id)
+        finally:
+            self.protocol.cleanup_command(self.shell_id, command_id)
+
+        if status_code:
+            plogging.debug("- '%s' returned %s on %s",
+                           command, status_code, self.ip)
+
+        return std_out, std_err
+
+    def run_batch(self, commands):
+        """
+        Runs multiple commands with one invocation of PowerShell
+
+        :param commands: commands and their arguments
+        :type commands: ``list`` of (``str``, ``list`` of ``str``)
+
+        :return: standard output and standard error
+        :rtype: ``tuple`` of ``str``
+
+        Commands are run in sequence, even if some of them fail.
+
+        """
+
+        if len(commands) < 1:
+            return '', ''
+
+        if len(commands) == 1:
+            return self.run(*commands[0])
+
+        script = self.to_script(commands)
+        encoded = base64.b64encode(script.encode('utf_16_le')).decode('ascii')
+        return self.run('powershell.exe', ['-NoProfile',
+                                           '-NonInteractive',
+                                           '-EncodedCommand',
+                                           encoded])
+
+    @classmethod
+    def to_script(cls, commands):
+        """
+        Turns a list of commands into a PowerShell script
+
+        :param commands: commands and their arguments
+        :type commands: ``list`` of (``str``, ``list`` of ``str``)
+
+        :return: the PowerShell script
+        :rtype: ``str``
+
+        Arguments given to ``powershell.exe`` form a PowerShell statement
+        on their own. Other commands are called with the ``&`` operator.
+
+        """
+
+        lines = ["$ErrorActionPreference = 'Continue'"]
+        for command, params in commands:
+            if command.lower() in ('powershell', 'powershell.exe'):
+                lines.append(' '.join(params))
+
+            else:
+                lines.append(' '.join(
+                    ['&'] + ["'{}'".format(token.replace("'", "''"))
+                             for token in [command] + list(params)]))
+
+        return '\n'.join(lines)
 
 
 class WindowsConfiguration(NodeConfiguration):
@@ -35,102 +200,165 @@ class WindowsConfiguration(NodeConfiguration):
 
     def __init__(self, engine, facility):
         self.secret = engine.get_shared_secret()
+        self.facility = facility
         # todo: provide a fittings-wide override.
         self.username = 'administrator'
         plogging.debug('Loading windows polisher')
 
-    def _try_winrm(self, node):
-        ip = node.private_ips[0]
-        p = Protocol(
-                endpoint='http://%s:5985/wsman' % ip,  # RFC 2732
-                transport='ntlm',
-                username=self.username,
-                password=self.secret,
-                server_cert_validation='ignore')
-        shell_id = p.open_shell()
-        command_id = p.run_command(shell_id, 'ipconfig', ['/all'])
-        std_out, std_err, status_code = p.get_command_output(shell_id, command_id)
-        p.cleanup_command(shell_id, command_id)
-        p.close_shell(shell_id)
-        return std_out
-
-    def _winrm_commands(self, node, commands):
-        ip = node.private_ips[0]
-        p = Protocol(
-                endpoint='http://%s:5985/wsman' % ip,  # RFC 2732
-                transport='ntlm',
-                username=self.username,
-                password=self.secret,
-                server_cert_validation='ignore')
-        shell_id = p.open_shell()
-        std_out_logs = []
-        std_err_logs = []
+    def _get_session(self, node):
+        """
+        Opens a WinRM session on a node
 
-        # run the commands in sequence.
-        for command, params in commands:
-            command_id = p.run_command(shell_id, command, params)
-            std_out, std_err, status_code = p.get_command_output(shell_id, command_id)
-            std_out_logs.append(std_out)
-            std_err_logs.append(std_err)
-            p.cleanup_command(shell_id, command_id)
+        :param node: the node to be polished
+        :type node: :class:`libcloud.compute.base.Node`
 
-        p.close_shell(shell_id)
-        return std_out_logs, std_err_logs
+        :return: an authenticated session
+        :rtype: :class:`WindowsSession`
 
-    def _setup_winrm(self, node):
+        """
+
+        session = WindowsSession(node.private_ips[0],
+                                 self.username,
+                                 self.secret)
+        session.open()
+        return session
+
+    def _try_winrm(self, node, session=None):
+        if session is not None:
+            return session.run('ipconfig', ['/all'])[0]
+
+        with WindowsSession(node.private_ips[0],
+                            self.username,
+                            self.secret) as session:
+            return session.run('ipconfig', ['/all'])[0]
+
+    def _winrm_commands(self, node, commands, session=None):
+        if session is None:
+            with self._get_session(node) as session:
+                return self._winrm_commands(node, commands, session)
+
+        std_out, std_err = session.run_batch(commands)
+        return [std_out], [std_err]
+
+    def _setup_winrm(self, node, timeout=None):
         """
         Setup WinRM on a remote node
 
         :param node: the node to be polished
         :type node: :class:`libcloud.compute.base.Node`
+
+        :param timeout: the maximum number of seconds given to winexe
+        :type timeout: ``int``
+
+        All commands are sent with a single call to winexe.
+
         """
         ip = node.private_ips[0]
-        plogging.debug("Testing out quick function on %s", ip)
-        out = run_cmd(
-            'echo hello',
-            args=[],
-            user=self.username,
-            password=self.secret,
-            host=ip)
-        plogging.info(out)
         plogging.debug("Running winexe to remotely configure %s", ip)
         cmds = [
             "winrm quickconfig -quiet",
             "winrm set winrm/config/service/auth @{Basic=\"true\"}",
             "winrm set winrm/config/service @{AllowUnencrypted=\"true\"}"
         ]
-        for cmd in cmds:
-            plogging.debug('Running command "%s"', cmd)
-            out = run_cmd(
-                cmd,
-                args=[],
-                user=self.username,
-                password=self.secret,
-                host=ip)
-            plogging.info(out)
+        self._run_winexe(ip, cmds, timeout=timeout)
 
-    def _lockdown_winrm(self, node):
+    def _lockdown_winrm(self, node, session=None):
         """
         Setup WinRM on a remote node
 
         :param node: the node to be polished
         :type node: :class:`libcloud.compute.base.Node`
+
+        :param session: an open session, if any
+        :type session: :class:`WindowsSession`
+
+        Commands are sent over the open session if possible, else with
+        a single call to winexe.
+
         """
         ip = node.private_ips[0]
-        plogging.debug("Running winexe to remotely deconfigure %s", ip)
         cmds = [
             "winrm set winrm/config/service/auth @{Basic=\"false\"}",
             "winrm set winrm/config/service @{AllowUnencrypted=\"false\"}"
         ]
-        for cmd in cmds:
-            plogging.debug('Running command "%s"', cmd)
+
+        if session is not None:
+            plogging.debug("Using WinRM to deconfigure %s", ip)
+            try:
+                out, err = session.run('cmd.exe', ['/c', ' & '.join(cmds)])
+                plogging.info(out)
+                return
+
+            except Exception as feedback:
+                plogging.debug("- unable to use WinRM: %s", str(feedback))
+
+        plogging.debug("Running winexe to remotely deconfigure %s", ip)
+        self._run_winexe(ip, cmds)
+
+    def _run_winexe(self, ip, cmds, timeout=None):
+        """
+        Runs commands on a remote node with one call to winexe
+
+        :param ip: the address of the remote node
+        :type ip: ``str``
+
+        :param cmds: the commands to run in sequence
+        :type cmds: ``list`` of ``str``
+
+        :param timeout: the maximum number of seconds, or ``None``
+        :type timeout: ``int``
+
+        :return: the output of winexe
+        :rtype: ``str``
+
+        """
+        command = ' & '.join(cmds)
+        plogging.debug('Running command "%s"', command)
+        if timeout is None:
             out = run_cmd(
-                cmd,
+                command,
                 args=[],
                 user=self.username,
                 password=self.secret,
                 host=ip)
-            plogging.info(out)
+
+        else:
+            request = WinexeRequest('cmd',
+                                    cmd=command,
+                                    args=[],
+                                    user=self.username,
+                                    password=self.secret,
+                                    host=ip)
+
+            process = subprocess.Popen(request.command(),
+                                       stdout=subprocess.PIPE,
+                                       stderr=subprocess.STDOUT)
+            expired = []
+
+            def expire():
+                expired.append(True)
+                process.kill()
+
+            timer = threading.Timer(timeout, expire)
+            timer.start()
+            try:
+                out = process.communicate()[0]
+            finally:
+                timer.cancel()
+
+            if isinstance(out, bytes):
+                out = out.decode('utf-8', 'replace')
+            out = out.rstrip('\r\n')
+
+            if len(expired) > 0:
+                raise PlumberyException(
+                    "winexe has timed out after {} seconds".format(timeout))
+
+            if process.returncode != 0:
+                raise PlumberyException(out)
+
+        plogging.info(out)
+        return out
 
     def validate(self, settings):
         return True
@@ -139,6 +367,144 @@ class WindowsConfiguration(NodeConfiguration):
         plogging.debug('Reap for windows polisher (noop)')
         return
 
+    def bootstrap_node(self, node, timeout=120):
+        """
+        Makes WinRM available on a node
+
+        :param node: the node to be polished
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param timeout: the maximum number of seconds given to winexe
+        :type timeout: ``int``
+
+        :return: outcome, i.e., 'enabled', 'configured', 'skipped' or
+            'failed', and an open session, if any
+        :rtype: ``tuple``
+
+        """
+
+        tick = 6
+        waited = 0
+        while node.extra['status'].action == 'START_SERVER':
+            time.sleep(tick)
+            node = PlumberyNodes(self.facility).get_node(node.name)
+            waited += tick
+            if waited > 300:
+                break
+
+            if node.state != NodeState.RUNNING:
+                plogging.info("- skipped - node '{}' is not running".format(
+                    node.name))
+                return 'skipped', None
+
+        if node.extra['ipv6'] is None:
+            plogging.error("No ipv6 address for node '{}', cannot configure"
+                           .format(node.name))
+            return 'skipped', None
+
+        ip = node.private_ips[0]
+        session = WindowsSession(ip, self.username, self.secret)
+
+        # Check to see if WinRM works..
+        try:
+            self._try_winrm(node, session)
+            return 'enabled', session
+
+        except (winrm.exceptions.InvalidCredentialsError,
+                requests.exceptions.ConnectionError):
+            plogging.warning('initial connection to %s failed, '
+                             'trying to setup winrm remotely', ip)
+            session.close()
+
+        try:
+            self._setup_winrm(node, timeout=timeout)
+            self._try_winrm(node, session)
+            return 'configured', session
+
+        except Exception as feedback:
+            plogging.error("- unable to setup winrm on '{}': {}".format(
+                node.name, str(feedback)))
+            session.close()
+            return 'failed', None
+
+    def bootstrap_nodes(self, nodes, workers=10, timeout=120):
+        """
+        Makes WinRM available on multiple nodes
+
+        :param nodes: the nodes to be polished
+        :type nodes: ``list`` of :class:`libcloud.compute.base.Node`
+
+        :param workers: the maximum number of nodes bootstrapped concurrently
+        :type workers: ``int``
+
+        :param timeout: the maximum number of seconds given to winexe
+            for each node
+        :type timeout: ``int``
+
+        :return: outcome and open session, by node name
+        :rtype: ``dict``
+
+        """
+
+        outcomes = parallel(lambda node: self.bootstrap_node(node, timeout),
+                            nodes, workers)
+
+        summary = {}
+        for node, (outcome, session) in zip(nodes, outcomes):
+            summary.setdefault(outcome, []).append(node.name)
+
+        for outcome in ('enabled', 'configured', 'skipped', 'failed'):
+            if outcome in summary:
+                plogging.info("- WinRM {} on {} node(s): {}".format(
+                    outcome, len(summary[outcome]),
+                    ', '.join(sorted(summary[outcome]))))
+
+        return dict((node.name, outcome)
+                    for node, outcome in zip(nodes, outcomes))
+
+    def configure_nodes(self, items, workers=10, timeout=120):
+        """
+        Prepares multiple Windows nodes
+
+        :param items: nodes to be polished, with their respective settings
+        :type items: ``list`` of (:class:`libcloud.compute.base.Node`,
+            ``dict``)
+
+        :param workers: the maximum number of nodes prepared concurrently
+        :type workers: ``int``
+
+        :param timeout: the maximum number of seconds given to winexe
+            for each node
+        :type timeout: ``int``
+
+        :return: names of nodes that have been processed
+        :rtype: ``list`` of ``str``
+
+        WinRM is bootstrapped on all nodes first, then commands are sent
+        to nodes that can be reached, over the same sessions.
+
+        """
+
+        items = [(node, settings) for node, settings in items
+                 if node is not None and self._element_name_ in settings]
+
+        if len(items) < 1:
+            return []
+
+        plogging.info("Preparing {} Windows node(s)".format(len(items)))
+        outcomes = self.bootstrap_nodes([node for node, settings in items],
+                                        workers=workers,
+                                        timeout=timeout)
+
+        parallel(lambda item: self._prepare(item[0],
+                                            item[1],
+                                            outcomes[item[0].name][1]),
+                 [item for item in items
+                  if outcomes[item[0].name][1] is not None],
+                 workers)
+
+        return [node.name for node, settings in items]
+
     def configure(self, node, settings):
         """
         prepares a node
@@ -159,39 +525,31 @@ class WindowsConfiguration(NodeConfiguration):
                 plogging.info("- not found")
                 return
 
-            timeout = 300
-            tick = 6
-            while node.extra['status'].action == 'START_SERVER':
-                time.sleep(tick)
-                node = self.nodes.get_node(node.name)
-                timeout -= tick
-                if timeout < 0:
-                    break
-
-                if node.state != NodeState.RUNNING:
-                    plogging.info("- skipped - node is not running")
-                    return
-
-            ipv6 = node.extra['ipv6']
-            ip = node.private_ips[0]
-            if ipv6 is None:
-                plogging.error('No ipv6 address for node, cannot configure')
+            outcome, session = self.bootstrap_node(node)
+            if session is None:
                 return
 
-            # Check to see if WinRM works..
-            try:
-                self._try_winrm(node)
-            except winrm.exceptions.InvalidCredentialsError:
-                plogging.warn('initial login to %s failed, trying to setup winrm remotely',
-                             ip)
-                self._setup_winrm(node)
-                self._try_winrm(node)
-            except requests.exceptions.ConnectionError:
-                plogging.warn('initial connection to %s failed, trying to setup winrm remotely',
-                             ip)
-                self._setup_winrm(node)
-                self._try_winrm(node)
+            self._prepare(node, settings, session)
+
+        else:
+            return False
+
+    def _prepare(self, node, settings, session):
+        """
+        Runs commands from the fittings plan, then locks WinRM down
+
+        :param node: the node to be polished
+        :type node: :class:`libcloud.compute.base.Node`
+
+        :param settings: the fittings plan for this node
+        :type settings: ``dict``
+
+        :param session: an open session on this node
+        :type session: :class:`WindowsSession`
 
+        """
+
+        try:
             # OK, we're all ready. Let's look at the node config and start commands
             cmds = []
             hostname = settings[self._element_name_].get('hostname', None)
@@ -204,11 +562,12 @@ class WindowsConfiguration(NodeConfiguration):
                 command_parts = command.split(' ')
                 cmds.append((command_parts[0], command_parts[1:]))
 
-            out, err = self._winrm_commands(node, cmds)
+            out, err = self._winrm_commands(node, cmds, session)
             plogging.info(out)
             plogging.warning(err)
 
             plogging.debug('locking down winrm')
-            self._lockdown_winrm(node)
-        else:
-            return False
+            self._lockdown_winrm(node, session)
+
+        finally:
+            session.close()
@@ -0,0 +1,416 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+import json
+import re
+import threading
+import time
+
+__all__ = ['PlumberyProfiler', 'profiler']
+
+
+class PlumberyProfiler(object):
+    """
+    Measures calls made to cloud drivers
+
+    Every driver provided by the engine is wrapped, so that each call to the
+    API is timed and accounted for. Figures are grouped by action, by
+    facility and by blueprint, and by the name of the driver function.
+
+    For each operation the profiler counts:
+
+    * the number of calls, and the time spent in them
+    * the number of calls that have failed
+    * the number of calls that have been rejected with ``RESOURCE_BUSY``
+    * the number of calls that repeat a failed call, e.g., in a retry loop
+
+    The context is kept for each thread, so that threads that process
+    distinct blueprints concurrently are accounted separately. Functions
+    run by :func:`plumbery.util.parallel` start with the context of the
+    calling thread.
+
+    Example::
+
+        from plumbery.profiler import profiler
+
+        region = profiler.wrap(region, 'compute')
+        profiler.focus(action='build', facility='EU6', blueprint='web')
+        ...
+        for line in profiler.report():
+            print(line)
+        profiler.dump('profile.json')
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets all measurements
+        """
+
+        with self._lock:
+            self._local.context = None
+            self.records = {}
+            self.t0 = time.time()
+
+    @property
+    def context(self):
+        """
+        The context of measurements made by the current thread
+        """
+
+        context = getattr(self._local, 'context', None)
+        if context is None:
+            context = {'action': None,
+                       'facility': None,
+                       'blueprint': None}
+            self._local.context = context
+
+        return context
+
+    def get_context(self):
+        """
+        Provides a copy of the context of the current thread
+
+        :return: action, facility and blueprint
+        :rtype: ``dict``
+
+        """
+
+        return dict(self.context)
+
+    def set_context(self, context):
+        """
+        Changes the context of the current thread
+
+        :param context: a context returned by :meth:`get_context`
+        :type context: ``dict``
+
+        """
+
+        self._local.context = dict(context)
+
+    def focus(self, **kwargs):
+        """
+        Changes the context of subsequent measurements
+
+        :param action: the action that is running, e.g., 'build'
+        :type action: ``str``
+
+        :param facility: the facility that is visited, e.g., 'EU6'
+        :type facility: ``str``
+
+        :param blueprint: the blueprint that is processed, e.g., 'web'
+        :type blueprint: ``str``
+
+        """
+
+        for key in ('action', 'facility', 'blueprint'):
+            if key in kwargs:
+                self.context[key] = kwargs[key]
+
+        if kwargs.get('action') is not None:
+            self.context['facility'] = kwargs.get('facility')
+            self.context['blueprint'] = kwargs.get('blueprint')
+
+        elif kwargs.get('facility') is not None:
+            self.context['blueprint'] = kwargs.get('blueprint')
+
+    def wrap(self, driver, kind):
+        """
+        Instruments a driver from Apache Libcloud
+
+        :param driver: the driver to be instrumented
+        :type driver: a compute, balancer or backup driver
+
+        :param kind: the kind of driver, e.g., 'compute'
+        :type kind: ``str``
+
+        :return: a driver that records each call
+        :rtype: :class:`plumbery.profiler.ProfiledDriver`
+
+        """
+
+        if driver is None or isinstance(driver, ProfiledDriver):
+            return driver
+
+        return ProfiledDriver(driver, kind, self)
+
+    def record(self, kind, operation, elapsed, feedback=None):
+        """
+        Accounts for one call to the API
+
+        :param kind: the kind of driver, e.g., 'compute'
+        :type kind: ``str``
+
+        :param operation: the name of the function that has been called
+        :type operation: ``str``
+
+        :param elapsed: duration of the call, in seconds
+        :type elapsed: ``float``
+
+        :param feedback: the exception raised by the call, if any
+        :type feedback: ``Exception`` or ``None``
+
+        """
+
+        previous = getattr(self._local, 'previous', None)
+        retry = (previous is not None
+                 and previous[0] == (kind, operation)
+                 and previous[1])
+        self._local.previous = ((kind, operation), feedback is not None)
+
+        key = (self.context['action'],
+               self.context['facility'],
+               self.context['blueprint'],
+               kind,
+               operation)
+
+        with self._lock:
+            if key not in self.records:
+                self.records[key] = {
+                    'count': 0,
+                    'errors': 0,
+                    'busy': 0,
+                    'retries': 0,
+                    'total': 0.0,
+                    'min': None,
+                    'max': 0.0}
+
+            record = self.records[key]
+            record['count'] += 1
+            record['total'] += elapsed
+            if record['min'] is None or elapsed < record['min']:
+                record['min'] = elapsed
+            if elapsed > record['max']:
+                record['max'] = elapsed
+
+            if feedback is not None:
+                record['errors'] += 1
+                if 'RESOURCE_BUSY' in str(feedback):
+                    record['busy'] += 1
+
+            if retry:
+                record['retries'] += 1
+
+    def get_operations(self):
+        """
+        Lists measurements made so far
+
+        :return: one dictionary per operation and context
+        :rtype: ``list`` of ``dict``
+
+        """
+
+        operations = []
+
+        with self._lock:
+            for key in sorted(self.records, key=lambda x: tuple(
+                    '' if item is None else str(item) for item in x)):
+
+                record = self.records[key]
+                operations.append({
+                    'action': key[0],
+                    'facility': key[1],
+                    'blueprint': key[2],
+                    'driver': key[3],
+                    'operation': key[4],
+                    'count': record['count'],
+                    'errors': record['errors'],
+                    'busy': record['busy'],
+                    'retries': record['retries'],
+                    'total': round(record['total'], 6),
+                    'mean': round(record['total'] / record['count'], 6),
+                    'min': round(record['min'], 6),
+                    'max': round(record['max'], 6)})
+
+        return operations
+
+    def report(self):
+        """
+        Summarises measurements in a table
+
+        :return: lines of text, ready to be logged
+        :rtype: ``list`` of ``str``
+
+        """
+
+        operations = self.get_operations()
+        if len(operations) < 1:
+            return ["No call has been made to the cloud API"]
+
+        header = ('action', 'facility', 'blueprint', 'operation',
+                  'calls', 'errors', 'busy', 'retries', 'total', 'mean')
+
+        rows = []
+        for item in operations:
+            rows.append((
+                str(item['action'] or '-'),
+                str(item['facility'] or '-'),
+                str(item['blueprint'] or '-'),
+                "{}.{}".format(item['driver'], item['operation']),
+                str(item['count']),
+                str(item['errors']),
+                str(item['busy']),
+                str(item['retries']),
+                "{:.3f}s".format(item['total']),
+                "{:.3f}s".format(item['mean'])))
+
+        widths = [max(len(row[index]) for row in [header]+rows)
+                  for index in range(len(header))]
+
+        def format(row):
+            return '  '.join(cell.ljust(widths[index]) if index < 4
+                             else cell.rjust(widths[index])
+                             for index, cell in enumerate(row)).rstrip()
+
+        lines = ["Calls to the cloud API:", format(header)]
+        lines.append('  '.join('-' * width for width in widths))
+        for row in rows:
+            lines.append(format(row))
+
+        lines.append("- {} calls in {:.3f} seconds".format(
+            sum(item['count'] for item in operations),
+            sum(item['total'] for item in operations)))
+
+        return lines
+
+    def dump(self, path):
+        """
+        Saves measurements in a JSON file
+
+        :param path: the name of the file to write
+        :type path: ``str``
+
+        """
+
+        data = {
+            'elapsed': round(time.time() - self.t0, 3),
+            'operations': self.get_operations()}
+
+        with open(path, 'w') as stream:
+            json.dump(data, stream, indent=2, sort_keys=True)
+            stream.write('\n')
+
+
+class ProfiledDriver(object):
+    """
+    Wraps a Libcloud driver to measure each call to the API
+
+    :param driver: the actual driver
+    :param kind: the kind of driver, e.g., 'compute'
+    :param profiler: where measurements are recorded
+
+    Attributes that are not functions are passed through. The connection
+    attribute is wrapped as well, so that raw requests made by plumbery to
+    the API are accounted for.
+
+    """
+
+    def __init__(self, driver, kind, profiler):
+        self.__dict__['_driver'] = driver
+        self.__dict__['_kind'] = kind
+        self.__dict__['_profiler'] = profiler
+
+    def __repr__(self):
+        return repr(self._driver)
+
+    def __setattr__(self, name, value):
+        setattr(self._driver, name, value)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._driver, name)
+
+        if name == 'connection':
+            return ProfiledConnection(attribute, self._kind, self._profiler)
+
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+
+        return _measure(attribute, self._kind, name, self._profiler)
+
+
+class ProfiledConnection(ProfiledDriver):
+    """
+    Wraps the connection of a driver to measure raw requests
+
+    Only functions that issue requests are measured. The path of each request
+    is added to the name of the operation, after removal of unique
+    identifiers, e.g., ``request_with_orgId_api_2 server/server``.
+
+    """
+
+    def __getattr__(self, name):
+        attribute = getattr(self._driver, name)
+
+        if not name.startswith('request') or not callable(attribute):
+            return attribute
+
+        return _measure(attribute, self._kind, name, self._profiler,
+                        with_path=True)
+
+
+_IDENTIFIER = re.compile(
+    r'^[0-9a-fA-F]{8}(-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}$')
+
+
+def _name_request(name, args, kwargs):
+    """
+    Builds the name of an operation from the path of a raw request
+    """
+
+    path = kwargs.get('action', args[0] if len(args) > 0 else None)
+    if not path:
+        return name
+
+    tokens = [token for token in str(path).split('?')[0].split('/')
+              if token and _IDENTIFIER.match(token) is None]
+
+    return "{} {}".format(name, '/'.join(tokens))
+
+
+def _measure(function, kind, name, profiler, with_path=False):
+    """
+    Times a function and records its outcome
+    """
+
+    def measured(*args, **kwargs):
+        operation = name
+        if with_path:
+            operation = _name_request(name, args, kwargs)
+
+        t0 = time.time()
+        try:
+            result = function(*args, **kwargs)
+
+        except Exception as feedback:
+            profiler.record(kind, operation, time.time() - t0, feedback)
+            raise
+
+        profiler.record(kind, operation, time.time() - t0)
+        return result
+
+    measured.__name__ = name
+    measured.__doc__ = function.__doc__
+    return measured
+
+
+profiler = PlumberyProfiler()
@@ -0,0 +1,273 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import absolute_import
+
+import threading
+import time
+from contextlib import contextmanager
+
+from plumbery.plogging import plogging
+
+__all__ = ['PlumberyScheduler', 'scheduler']
+
+
+class PlumberyScheduler(object):
+    """
+    Serialises changes made to the same network domain or to the same server
+
+    The cloud API locks a network domain, or a server, while some operation
+    is in progress, and rejects other changes with ``RESOURCE_BUSY``. When
+    multiple threads are at work, they take turns on each network domain
+    and on each server, while changes to distinct resources are still made
+    in parallel.
+
+    Requests are already sent one at a time on each connection, so a
+    reservation is useful only if it covers the operation that the API runs
+    in the background. When a request starts such an operation, the
+    reservation is kept until the operation has completed, as reported by a
+    poll of the resource. Threads that receive ``RESOURCE_BUSY`` should
+    release the reservation before they sleep and try again, so that other
+    threads can make progress.
+
+    Example::
+
+        from plumbery.scheduler import scheduler
+
+        with scheduler.lock(domain=container.domain):
+            region.ex_create_nat_rule(container.domain, internal, external)
+
+        with scheduler.lock(node=node,
+                            until=scheduler.node_is_idle(region, node)):
+            region.ex_attach_node_to_vlan(node, vlan=vlan)
+
+    In the second case, a thread that attaches the same node to another
+    network waits for the first attachment to complete, instead of
+    receiving ``RESOURCE_BUSY`` from the API.
+
+    """
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks = {}
+
+    @staticmethod
+    def get_key(kind, resource):
+        """
+        Identifies some resource
+
+        :param kind: ``domain`` or ``node``
+        :type kind: ``str``
+
+        :param resource: the resource, or its unique identifier
+        :type resource: ``object`` or ``str``
+
+        :return: a key that designates the resource
+        :rtype: ``tuple``
+
+        """
+
+        if resource is None:
+            return None
+
+        return (kind, str(getattr(resource, 'id', resource)))
+
+    def get_lock(self, key):
+        """
+        Provides the lock attached to some resource
+
+        :param key: a key returned by :meth:`get_key`
+        :type key: ``tuple``
+
+        :return: the lock of this resource
+        :rtype: :class:`threading.RLock`
+
+        """
+
+        with self._guard:
+            if key not in self._locks:
+                self._locks[key] = threading.RLock()
+            return self._locks[key]
+
+    @contextmanager
+    def lock(self, domain=None, node=None, until=None,
+             timeout=600, interval=5):
+        """
+        Reserves a network domain and/or a server
+
+        :param domain: the target network domain, or its unique identifier
+        :type domain: :class:`DimensionDataNetworkDomain` or ``str``
+
+        :param node: the target server, or its unique identifier
+        :type node: :class:`Node` or ``str``
+
+        :param until: a function that returns ``True`` when the operation
+            started in the block has completed
+        :type until: ``callable``
+
+        :param timeout: the maximum number of seconds to keep the
+            reservation after the block
+        :type timeout: ``int``
+
+        :param interval: the number of seconds between two polls
+        :type interval: ``int``
+
+        Locks are always taken in the same order, so that threads that
+        reserve several resources do not block each other forever.
+
+        If the block raises an exception, then the request has been
+        rejected and the reservation is released at once. Else resources
+        are kept until ``until`` is satisfied, or until the timeout.
+
+        """
+
+        keys = [key for key in (self.get_key('domain', domain),
+                                self.get_key('node', node))
+                if key is not None]
+
+        locks = [self.get_lock(key) for key in sorted(keys)]
+        for item in locks:
+            item.acquire()
+
+        try:
+            yield
+
+            if until is not None:
+                self.wait(until, timeout, interval)
+
+        finally:
+            for item in reversed(locks):
+                item.release()
+
+    def change_node(self, region, node, request, *args, **kwargs):
+        """
+        Changes a server, and keeps it reserved until the change is done
+
+        :param region: the driver to use
+        :type region: :class:`DimensionDataNodeDriver`
+
+        :param node: the target server
+        :type node: :class:`Node`
+
+        :param request: the function of the driver that makes the change
+        :type request: ``callable``
+
+        Other arguments are passed to ``request``. The reservation of the
+        server is released before sleeping on ``RESOURCE_BUSY``, then the
+        request is sent again. Other errors are raised to the caller.
+
+        Example::
+
+            scheduler.change_node(region, node,
+                                  region.ex_change_storage_size,
+                                  node, disk_id=id, size=size)
+
+        """
+
+        while True:
+            try:
+                with self.lock(node=node,
+                               until=self.node_is_idle(region, node)):
+                    request(*args, **kwargs)
+                    plogging.info("- in progress")
+
+            except Exception as feedback:
+                if 'RESOURCE_BUSY' in str(feedback):
+                    time.sleep(10)
+                    continue
+
+                if 'Please try again later' in str(feedback):
+                    time.sleep(10)
+                    continue
+
+                raise
+
+            break
+
+    @staticmethod
+    def wait(until, timeout=600, interval=5):
+        """
+        Polls until some operation has completed
+
+        :param until: a function that returns ``True`` on completion
+        :type until: ``callable``
+
+        :param timeout: the maximum number of seconds to wait
+        :type timeout: ``int``
+
+        :param interval: the number of seconds between two polls
+        :type interval: ``int``
+
+        :return: ``True`` on completion, ``False`` on timeout
+        :rtype: ``bool``
+
+        """
+
+        t0 = time.time()
+        while not until():
+
+            if time.time() - t0 > timeout:
+                plogging.warning("- still in progress after {} seconds"
+                                 .format(timeout))
+                return False
+
+            time.sleep(interval)
+
+        return True
+
+    @staticmethod
+    def node_is_idle(region, node):
+        """
+        Builds a poll for the pending action of a server
+
+        :param region: the driver to use
+        :type region: :class:`DimensionDataNodeDriver`
+
+        :param node: the target server, or its unique identifier
+        :type node: :class:`Node` or ``str``
+
+        :return: a function that returns ``True`` when the server has no
+            pending action, or has disappeared
+        :rtype: ``callable``
+
+        """
+
+        node_id = getattr(node, 'id', node)
+
+        def check():
+            try:
+                current = region.ex_get_node_by_id(node_id)
+
+            except Exception as feedback:
+                if 'RESOURCE_NOT_FOUND' not in str(feedback):
+                    plogging.debug("- unable to poll node: {}"
+                                   .format(feedback))
+                return True
+
+            return current.extra['status'].action is None
+
+        return check
+
+    def reset(self):
+        """
+        Forgets all locks
+        """
+
+        with self._guard:
+            self._locks = {}
+
+
+# the scheduler shared by all threads
+scheduler = PlumberyScheduler()
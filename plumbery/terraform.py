@@ -13,13 +13,37 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import json
 import os
 import subprocess
+import threading
+import time
 
 from plumbery.plogging import plogging
 
 
 class Terraform(object):
+    """
+    Runs terraform for multicloud fittings
+
+    By default, a plan is computed and applied on each build, and temporary
+    files are removed afterwards. When ``workspace: true`` is set in the
+    multicloud settings, vars and plan files are kept in the sub-directory
+    ``.plumbery`` of the terraform directory, under a hash of parameters and
+    of ``.tf`` files. If these inputs have not changed since last successful
+    build, then terraform is not run at all.
+
+    Example of multicloud settings::
+
+        multicloud:
+          tf_path: ./aws
+          workspace: true
+          parameters:
+            region: us-west-2
+
+    """
+
     def __init__(self, working_directory):
         self.working_directory = working_directory
         self.tf_path = os.getenv('TERRAFORM_PATH')
@@ -34,31 +58,125 @@ class Terraform(object):
             # default back to the directory of the fittings file.
             tf_path = self.working_directory
 
+        if settings.get('workspace', False):
+            self._build_workspace(tf_path, settings.get('parameters', {}))
+            return 0
+
         parameters = settings.get('parameters', {})
-        with open(os.path.join(tf_path, '.tfvars'), 'w') as tf_vars:
-            for (key, value) in parameters.items():
-                tf_vars.write('%s = "%s"\n' % (key, value))
+        self._write_vars(os.path.join(tf_path, '.tfvars'), parameters)
 
-        ret, o, err = self._run_tf(
+        ret, _, _ = self._run_tf(
             'plan', tf_path,
             var_file=os.path.join(tf_path, '.tfvars'),
             input=False,
             detailed_exitcode=True,
             out=os.path.join(tf_path, '.tfstate'))
-        plogging.debug("STDOUT from terraform plan %s", o)
-        if err != '' or None:
-            plogging.error(err)
 
         if ret == 2:
-            _, o, err = self._run_tf('apply', os.path.join(tf_path, '.tfstate'))
-            plogging.debug("STDOUT from terraform apply %s", o)
-            if err != '' or None:
-                plogging.error(err)
+            ret, _, _ = self._run_tf('apply',
+                                     os.path.join(tf_path, '.tfstate'))
         if os.path.isfile(os.path.join(tf_path, '.tfstate')):
             os.remove(os.path.join(tf_path, '.tfstate'))
         if os.path.isfile(os.path.join(tf_path, '.tfvars')):
             os.remove(os.path.join(tf_path, '.tfvars'))
 
+        return ret
+
+    def _build_workspace(self, tf_path, parameters):
+        """
+        Plans and applies changes only if inputs have changed
+
+        :param tf_path: the directory with terraform configuration
+        :type tf_path: ``str``
+
+        :param parameters: values of terraform variables
+        :type parameters: ``dict``
+
+        """
+
+        workspace = os.path.join(tf_path, '.plumbery')
+        if not os.path.isdir(workspace):
+            os.makedirs(workspace)
+
+        digest = self.get_digest(tf_path, parameters)
+        applied = os.path.join(workspace, 'applied')
+        if os.path.isfile(applied):
+            with open(applied, 'r') as stream:
+                if stream.read().strip() == digest:
+                    plogging.info("- skipped - terraform inputs are "
+                                  "unchanged in '{}'".format(tf_path))
+                    return
+
+        vars_file = os.path.join(workspace, digest+'.tfvars')
+        plan_file = os.path.join(workspace, digest+'.tfplan')
+
+        if not os.path.isfile(vars_file):
+            self._write_vars(vars_file, parameters)
+
+        if not os.path.isdir(os.path.join(tf_path, '.terraform')):
+            ret, _, _ = self._run_tf('init', tf_path, input=False)
+            if ret != 0:
+                raise RuntimeError("terraform init has failed "
+                                   "in '{}'".format(tf_path))
+
+        ret, _, _ = self._run_tf(
+            'plan', tf_path,
+            var_file=vars_file,
+            input=False,
+            detailed_exitcode=True,
+            out=plan_file)
+        if ret not in (0, 2):
+            raise RuntimeError("terraform plan has failed "
+                               "in '{}'".format(tf_path))
+
+        if ret == 2:
+            ret, _, _ = self._run_tf('apply', plan_file)
+            if ret != 0:
+                raise RuntimeError("terraform apply has failed "
+                                   "in '{}'".format(tf_path))
+
+        with open(applied, 'w') as stream:
+            stream.write(digest)
+
+        # keep only artifacts of the last successful build
+        for name in os.listdir(workspace):
+            if name != 'applied' and not name.startswith(digest):
+                os.remove(os.path.join(workspace, name))
+
+    def get_digest(self, tf_path, parameters):
+        """
+        Computes a hash of terraform inputs
+
+        :param tf_path: the directory with terraform configuration
+        :type tf_path: ``str``
+
+        :param parameters: values of terraform variables
+        :type parameters: ``dict``
+
+        :return: a hexadecimal digest of parameters and of ``.tf`` files
+        :rtype: ``str``
+
+        """
+
+        hasher = hashlib.sha256()
+        hasher.update(json.dumps(parameters,
+                                 sort_keys=True,
+                                 default=str).encode('utf-8'))
+
+        for name in sorted(os.listdir(tf_path)):
+            if not name.endswith(('.tf', '.tf.json')):
+                continue
+            hasher.update(name.encode('utf-8'))
+            with open(os.path.join(tf_path, name), 'rb') as stream:
+                hasher.update(stream.read())
+
+        return hasher.hexdigest()[:16]
+
+    def _write_vars(self, path, parameters):
+        with open(path, 'w') as tf_vars:
+            for (key, value) in parameters.items():
+                tf_vars.write('%s = "%s"\n' % (key, value))
+
     def destroy(self, settings, safe=True):
         tf_path = settings.get('tf_path', None)
         if tf_path is None:
@@ -66,24 +184,25 @@ class Terraform(object):
             tf_path = self.working_directory
 
         parameters = settings.get('parameters', {})
-        with open(os.path.join(tf_path, '.tfvars'), 'w') as tf_vars:
-            for (key, value) in parameters.items():
-                tf_vars.write('%s = "%s"\n' % (key, value))
+        self._write_vars(os.path.join(tf_path, '.tfvars'), parameters)
         if safe:
-            _, o, _ = self._run_tf(
+            self._run_tf(
                 'plan', tf_path,
                 var_file=os.path.join(tf_path, '.tfvars'),
                 input=False,
                 detailed_exitcode=True,
                 destroy=True)
-            plogging.debug("STDOUT from terraform %s", o)
         else:
-            _, o, _ = self._run_tf(
+            self._run_tf(
                 'destroy', tf_path,
                 var_file=os.path.join(tf_path, '.tfvars'),
                 input=False,
                 force=True)
-            plogging.debug("STDOUT from terraform %s", o)
+
+            # next build will have to apply the configuration again
+            applied = os.path.join(tf_path, '.plumbery', 'applied')
+            if os.path.isfile(applied):
+                os.remove(applied)
 
     def graph(self, state_directory):
         _, graph_data, _ = self._run_tf('graph', state_directory)
@@ -102,7 +221,116 @@ class Terraform(object):
         params.append(state_directory)
         plogging.debug(params)
         process = subprocess.Popen(params, stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE)
-        stdout, stderr = process.communicate()
-        retcode = process.returncode
-        return (retcode, stdout, stderr)
+                                   stderr=subprocess.PIPE,
+                                   universal_newlines=True)
+
+        # log lines as they come, and read both pipes to avoid a deadlock
+        stderr = []
+        reader = threading.Thread(target=self._stream,
+                                  args=(process.stderr, stderr,
+                                        plogging.error, command))
+        reader.daemon = True
+        reader.start()
+
+        stdout = []
+        self._stream(process.stdout, stdout, plogging.debug, command)
+
+        reader.join()
+        retcode = process.wait()
+        return (retcode, ''.join(stdout), ''.join(stderr))
+
+    def _stream(self, pipe, lines, log, command):
+        for line in iter(pipe.readline, ''):
+            lines.append(line)
+            if line.strip() != '':
+                log("terraform %s: %s", command, line.rstrip())
+        pipe.close()
+
+
+class TerraformJob(object):
+    """
+    Runs a terraform build in the background
+
+    :param terraform: the terraform runner
+    :type terraform: :class:`plumbery.terraform.Terraform`
+
+    :param settings: the multicloud settings of a blueprint
+    :type settings: ``dict``
+
+    :param label: the name used in logs, e.g., the blueprint name
+    :type label: ``str``
+
+    :param after: a job that has to complete before this one starts
+    :type after: :class:`plumbery.terraform.TerraformJob`
+
+    Terraform processes run in a separate thread, so that plumbery can
+    build other blueprints meanwhile. Jobs are started and joined by the
+    engine, see :meth:`plumbery.engine.PlumberyEngine.add_job`.
+
+    """
+
+    def __init__(self, terraform, settings, label=None, after=None):
+        self.terraform = terraform
+        self.settings = settings
+        self.label = label
+        self.after = after
+
+        self.status = None
+        self.error = None
+        self.elapsed = None
+        self._done = threading.Event()
+
+    def get_key(self):
+        """
+        Identifies the terraform directory used by this job
+
+        Jobs that share a directory also share a terraform state, and
+        therefore they should not run at the same time.
+
+        """
+
+        return os.path.abspath(self.settings.get(
+            'tf_path', None) or self.terraform.working_directory)
+
+    def start(self):
+        """
+        Launches terraform in the background
+        """
+
+        thread = threading.Thread(target=self._run,
+                                  name='terraform-{}'.format(self.label))
+        thread.start()
+
+    def _run(self):
+        if self.after is not None:
+            self.after.join()
+
+        t0 = time.time()
+        try:
+            self.status = self.terraform.build(self.settings)
+
+        except Exception as feedback:
+            self.error = feedback
+
+        self.elapsed = time.time() - t0
+        self._done.set()
+
+    def is_running(self):
+        return not self._done.is_set()
+
+    def join(self, timeout=None):
+        """
+        Waits for the end of the job
+
+        :param timeout: maximum number of seconds to wait
+        :type timeout: ``float``
+
+        :return: ``True`` if terraform has succeeded, else ``False``
+        :rtype: ``bool``
+
+        """
+
+        if not self._done.wait(timeout):
+            return False
+
+        return self.error is None and self.status in (0, None)
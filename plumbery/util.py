@@ -15,10 +15,13 @@
 
 from __future__ import absolute_import
 
+import threading
 import time
 from functools import wraps
+from multiprocessing.pool import ThreadPool
 
 from plumbery.plogging import plogging
+from plumbery.profiler import profiler
 
 
 def retry(ExceptionToCheck, tries=4, delay=3, backoff=2, logger=plogging):
@@ -75,6 +78,111 @@ def retry(ExceptionToCheck, tries=4, delay=3, backoff=2, logger=plogging):
     return deco_retry
 
 
+def parallel(function, items, workers=10):
+    """
+    Calls some function on multiple items concurrently
+
+    :param function: the function to call, with one item as argument
+    :type function: ``callable``
+
+    :param items: the items to process
+    :type items: ``list``
+
+    :param workers: the maximum number of concurrent calls
+    :type workers: ``int``
+
+    :return: the result of each call, in the order of items
+    :rtype: ``list``
+
+    Calls are made in threads, since most of the time is spent waiting for
+    the cloud API. If some call raises an exception, the first one is raised
+    again after all other calls have completed.
+
+    Each call starts with the profiling context of the caller, and the
+    context of the caller is restored at the end.
+
+    """
+
+    items = list(items)
+    context = profiler.get_context()
+
+    if workers < 2 or len(items) < 2:
+        try:
+            results = []
+            for item in items:
+                profiler.set_context(context)
+                results.append(function(item))
+            return results
+
+        finally:
+            profiler.set_context(context)
+
+    def guarded(item):
+        profiler.set_context(context)
+        try:
+            return (function(item), None)
+        except Exception as feedback:
+            return (None, feedback)
+
+    pool = ThreadPool(min(workers, len(items)))
+    try:
+        outcomes = pool.map(guarded, items)
+    finally:
+        pool.close()
+        pool.join()
+
+    for result, feedback in outcomes:
+        if feedback is not None:
+            raise feedback
+
+    return [result for result, feedback in outcomes]
+
+
+def synchronize(connection):
+    """
+    Serializes requests made over a connection to the cloud API
+
+    :param connection: the connection of a Libcloud driver
+    :type connection: :class:`libcloud.common.base.Connection`
+
+    :return: the same connection
+    :rtype: :class:`libcloud.common.base.Connection`
+
+    Libcloud connections keep the state of the current request, therefore
+    they cannot be used by several threads at once. With this function,
+    concurrent threads take turns to send requests and parse responses, while
+    they can still wait for asynchronous changes in parallel.
+
+    """
+
+    if getattr(connection, '_plumbery_lock', None) is not None:
+        return connection
+
+    lock = threading.RLock()
+    connection._plumbery_lock = lock
+
+    def locked(function):
+
+        @wraps(function)
+        def call(*args, **kwargs):
+            with lock:
+                return function(*args, **kwargs)
+
+        return call
+
+    # drivers call parent methods directly, so all entry points are locked
+    for name in dir(connection):
+        if not name.startswith('request') and name not in ('_get_orgId',
+                                                         'get_account_details'):
+            continue
+
+        function = getattr(connection, name, None)
+        if callable(function):
+            setattr(connection, name, locked(function))
+
+    return connection
+
+
 class PlumberyParameters(object):
     """
     Manages parameters
@@ -1,3 +1,4 @@
+import mock
 import unittest
 import plumbery.polishers.backup as backup
 from plumbery.exception import ConfigurationError
@@ -73,6 +74,32 @@ class BackupConfigurationTests(unittest.TestCase):
         backupConfiguration = config.configure(TestNode(), settings)
         self.assertTrue(backupConfiguration)
 
+    def test_backup_configure_nodes(self):
+        config = backup.BackupConfiguration(self.plumbery, self.facility)
+        items = [(TestNode(), {'backup': 'essentials'}),
+                 (TestNode(), {'backup': {'plan': 'advanced'}}),
+                 (TestNode(), {})]
+        names = config.configure_nodes(items, workers=2, timeout=10)
+        self.assertEqual(names, ['test', 'test'])
+        self.assertTrue(config.get_default_email() is not None)
+
+    def test_backup_states(self):
+        config = backup.BackupConfiguration(self.plumbery, self.facility)
+        states = config._get_backup_states()
+        self.assertEqual(states[TestNode.id], 'NORMAL')
+
+        driver = getattr(self.facility.backup, '_driver', self.facility.backup)
+        connection = driver.connection
+        with mock.patch.object(connection, 'request_with_orgId_api_2',
+                               wraps=connection.request_with_orgId_api_2) \
+                as request:
+            node = TestNode()
+            node.extra = {'networkDomainId': '1234'}
+            self.assertEqual(config._wait_for_backup([node]), set([node.id]))
+            params = request.call_args[1]['params']
+            self.assertEqual(params['networkDomainId'], '1234')
+            self.assertTrue('datacenterId' not in params)
+
 if __name__ == '__main__':
     import sys
     sys.exit(unittest.main())
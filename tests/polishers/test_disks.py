@@ -1,10 +1,45 @@
 import unittest
+import threading
+import mock
 import plumbery.polishers.disks as disks
 from plumbery.exception import ConfigurationError
 from plumbery.engine import PlumberyEngine
 from plumbery.facility import PlumberyFacility
 
 
+class FakeNode(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.extra = {'disks': [
+            {'scsiId': 0, 'id': name+'-0', 'size': 10, 'speed': 'STANDARD'},
+            {'scsiId': 1, 'id': name+'-1', 'size': 50, 'speed': 'STANDARD'}]}
+
+
+class FakeRegion(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def record(self, *args):
+        with self.lock:
+            self.calls.append(args)
+
+    def ex_add_storage_to_node(self, node, amount, speed):
+        self.record('add', node.name, amount, speed)
+
+    def ex_change_storage_size(self, node, disk_id, size):
+        self.record('size', node.name, disk_id, size)
+
+    def ex_change_storage_speed(self, node, disk_id, speed):
+        self.record('speed', node.name, disk_id, speed)
+
+    def ex_get_node_by_id(self, id):
+        self.record('poll', id.name)
+        return mock.Mock(extra={'status': mock.Mock(action=None)})
+
+
 class DiskConfigurationTests(unittest.TestCase):
     def setUp(self):
         self.engine = PlumberyEngine()
@@ -65,6 +100,37 @@ class DiskConfigurationTests(unittest.TestCase):
         diskSetup = config.configure(None, settings)
         self.assertTrue(diskSetup)
 
+    def test_disk_plan(self):
+        settings = {
+            'disks': ["3 20", "1 100 highperformance", "0 5", "2 30 economy"]
+        }
+        config = disks.DisksConfiguration(engine=self.engine, facility=self.facility)
+        operations = config.plan_node_disks(FakeNode('node'), settings)
+        self.assertEqual([(item['action'], item['scsiId']) for item in operations],
+                         [('expand', 1), ('speed', 1), ('add', 2), ('add', 3)])
+
+    def test_disk_apply_node_disks(self):
+        self.facility.region = FakeRegion()
+        config = disks.DisksConfiguration(engine=self.engine, facility=self.facility)
+        node = FakeNode('node')
+        operations = config.plan_node_disks(node, {'disks': ["1 60", "2 20"]})
+        config.apply_node_disks(node, operations)
+        self.assertEqual(self.facility.region.calls,
+                         [('size', 'node', 'node-1', 60), ('poll', 'node'),
+                          ('add', 'node', 20, 'STANDARD'), ('poll', 'node')])
+
+    @mock.patch('time.sleep')
+    def test_disk_busy(self, sleep):
+        region = FakeRegion()
+        region.ex_change_storage_speed = mock.Mock(
+            side_effect=[Exception('RESOURCE_BUSY'), None])
+        self.facility.region = region
+        config = disks.DisksConfiguration(engine=self.engine, facility=self.facility)
+        config.change_node_disk_speed(FakeNode('node'), 'node-1', 'ECONOMY')
+        self.assertEqual(region.ex_change_storage_speed.call_count, 2)
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual(region.calls, [('poll', 'node')])
+
 if __name__ == '__main__':
     import sys
     sys.exit(unittest.main())
\ No newline at end of file
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+
+"""
+Tests for `benchmarks` scripts.
+"""
+
+import time
+import unittest
+
+import yaml
+
+from libcloud.compute.drivers.dimensiondata import DimensionDataNodeDriver
+
+from benchmarks.fittings import compare
+from benchmarks.plans import generate_documents, generate_plan
+from benchmarks.region import MockRegion
+
+
+class TestMockRegion(unittest.TestCase):
+
+    def setUp(self):
+        self.region = MockRegion(scale=0.0001, seed=1)
+        self.region.install()
+        self.driver = DimensionDataNodeDriver('user', 'password',
+                                              region='dd-na')
+
+    def tearDown(self):
+        self.region.uninstall()
+        self.region = None
+        self.driver = None
+
+    def get_location(self):
+        for location in self.driver.list_locations():
+            if location.id == 'NA9':
+                return location
+
+    def test_lifecycle(self):
+        domain = self.driver.ex_create_network_domain(
+            self.get_location(), 'domain', 'ESSENTIALS')
+        domain = self.driver.ex_wait_for_state(
+            'NORMAL', self.driver.ex_get_network_domain,
+            poll_interval=5, timeout=600, network_domain_id=domain.id)
+
+        vlan = self.driver.ex_create_vlan(domain, 'vlan', '10.0.0.0')
+        self.driver.ex_wait_for_state(
+            'NORMAL', self.driver.ex_get_vlan,
+            poll_interval=5, timeout=600, vlan_id=vlan.id)
+
+        image = self.driver.list_images()[0]
+        for index in range(3):
+            self.driver.create_node(
+                'node{}'.format(index), image, 'password', 'description',
+                ex_network_domain=domain, ex_vlan=vlan, ex_is_started=False)
+
+        nodes = self.driver.list_nodes()
+        self.assertEqual(len(nodes), 3)
+        self.assertEqual(nodes[0].extra['status'].action, 'DEPLOY_SERVER')
+
+        with self.assertRaises(Exception) as context:
+            self.driver.ex_start_node(nodes[0])
+        self.assertTrue('RESOURCE_BUSY' in str(context.exception))
+
+        time.sleep(300)
+        nodes = self.driver.list_nodes()
+        self.assertEqual(nodes[0].extra['status'].action, None)
+        self.assertEqual(nodes[0].private_ips, ['10.0.0.11'])
+
+        with self.assertRaises(Exception) as context:
+            self.driver.ex_delete_vlan(vlan)
+        self.assertTrue('HAS_DEPENDENCY' in str(context.exception))
+
+        counts = self.region.get_counts()
+        self.assertEqual(counts['POST server/deployServer'], 3)
+
+    def test_busy(self):
+        self.region.busy_rate = 1.0
+        with self.assertRaises(Exception) as context:
+            self.driver.ex_create_network_domain(
+                self.get_location(), 'domain', 'ESSENTIALS')
+        self.assertTrue('RESOURCE_BUSY' in str(context.exception))
+        self.assertEqual(self.region.busy, 1)
+
+    def test_unknown(self):
+        with self.assertRaises(Exception) as context:
+            self.driver.ex_get_network_domain(
+                '8cdfd607-f429-4df6-9352-162cfc0891be')
+        self.assertTrue('RESOURCE_NOT_FOUND' in str(context.exception))
+
+
+class TestPlans(unittest.TestCase):
+
+    def test_documents(self):
+        documents = generate_documents(nodes=450, facilities=2)
+        self.assertEqual(len(documents), 3)
+        self.assertEqual(documents[1]['locationId'], 'NA9')
+        self.assertEqual(len(documents[1]['blueprints']), 2)
+
+        blueprint = documents[2]['blueprints'][1]['blueprint2']
+        self.assertEqual(list(blueprint['nodes'][0]),
+                         ['blueprint2-a[1..112]'])
+
+        with self.assertRaises(ValueError):
+            generate_documents(facilities=99)
+
+    def test_options(self):
+        documents = generate_documents(nodes=100, facilities=2, ranges=2,
+                                       templating=7, aliases=True,
+                                       parameters=True)
+        self.assertTrue('domainName' in documents[0]['parameters'])
+        self.assertEqual(documents[1]['basement'], 'blueprint1')
+        self.assertEqual(documents[1]['blueprints'][-1],
+                         {'all': 'blueprint1'})
+
+        blueprint = documents[1]['blueprints'][0]['blueprint1']
+        self.assertEqual(blueprint['domain']['name'],
+                         '{{ parameter.domainName }}1')
+        self.assertEqual([list(item)[0] for item in blueprint['nodes']],
+                         ['blueprint1-a[1..25]', 'blueprint1-b[1..25]'])
+
+        settings = blueprint['nodes'][0]['blueprint1-a[1..25]']
+        self.assertEqual(len(settings['cloud-config']['runcmd']), 7)
+
+    def test_plan(self):
+        documents = list(yaml.safe_load_all(generate_plan(nodes=10)))
+        self.assertEqual(documents, generate_documents(nodes=10))
+
+
+class TestFittings(unittest.TestCase):
+
+    def test_compare(self):
+
+        def build(seconds):
+            return {'results': [{
+                'plan': {'nodes': 100},
+                'steps': dict((step, {'seconds': seconds, 'peak_kib': 1})
+                              for step in ('set_fittings',
+                                           'finalize_blueprints',
+                                           'expand_blueprint',
+                                           'expand_string'))}]}
+
+        self.assertEqual(compare(build(1.1), build(1.0), 0.2), [])
+        self.assertEqual(len(compare(build(1.5), build(1.0), 0.2)), 4)
+        self.assertEqual(compare(build(0.005), build(0.001), 0.2), [])
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(unittest.main())
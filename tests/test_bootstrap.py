@@ -4,9 +4,11 @@
 Tests for `bootstrap` module.
 """
 
+import hashlib
 import unittest
 import os
-from tempfile import gettempdir
+import shutil
+from tempfile import gettempdir, mkdtemp
 from mock import MagicMock, patch
 import requests_mock
 
@@ -14,6 +16,143 @@ import plumbery.bootstrap as b
 
 tempdir = gettempdir()
 
+# other tests replace functions of the module
+download_file = b.download_file
+download_manifest = b.download_manifest
+
+
+class DownloadTests(unittest.TestCase):
+
+    def setUp(self):
+        self.download_file = download_file
+        self.output = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def test_parse_manifest(self):
+        entries = b.parse_manifest(['fittings.yaml sha256:abc\n',
+                                    '\n',
+                                    '# comment\n',
+                                    'roles/web.yaml\n'])
+        self.assertEqual(entries, [('fittings.yaml', 'sha256:abc'),
+                                   ('roles/web.yaml', None)])
+
+    def write_partial(self, content, version=None):
+        with open(os.path.join(self.output, 'big.bin.part'), 'wb') as f:
+            f.write(content)
+        if version is not None:
+            with open(os.path.join(self.output,
+                                   'big.bin.part.version'), 'w') as f:
+                f.write(version)
+
+    def read_file(self):
+        with open(os.path.join(self.output, 'big.bin'), 'rb') as f:
+            return f.read()
+
+    def test_resume(self):
+        self.write_partial(b'0123', version='"v1"')
+
+        with requests_mock.mock() as m:
+            m.get('http://test.com/big.bin', status_code=206,
+                  content=b'456789')
+            self.download_file('http://test.com/big.bin', self.output)
+            self.assertEqual(m.last_request.headers['Range'], 'bytes=4-')
+            self.assertEqual(m.last_request.headers['If-Range'], '"v1"')
+
+        self.assertEqual(self.read_file(), b'0123456789')
+        self.assertEqual(os.listdir(self.output), ['big.bin'])
+
+    def test_resume_with_checksum(self):
+        self.write_partial(b'0123')
+        checksum = 'sha256:' + hashlib.sha256(b'0123456789').hexdigest()
+
+        with requests_mock.mock() as m:
+            m.get('http://test.com/big.bin', status_code=206,
+                  content=b'456789')
+            self.download_file('http://test.com/big.bin', self.output,
+                               checksum=checksum)
+            self.assertEqual(m.last_request.headers['Range'], 'bytes=4-')
+            self.assertFalse('If-Range' in m.last_request.headers)
+
+        self.assertEqual(self.read_file(), b'0123456789')
+
+    def test_no_resume(self):
+        self.write_partial(b'0123')
+
+        with requests_mock.mock() as m:
+            m.get('http://test.com/big.bin', content=b'abcdef',
+                  headers={'ETag': '"v2"'})
+            self.download_file('http://test.com/big.bin', self.output)
+            self.assertFalse('Range' in m.last_request.headers)
+
+        self.assertEqual(self.read_file(), b'abcdef')
+        self.assertEqual(os.listdir(self.output), ['big.bin'])
+
+    def test_resume_changed(self):
+        self.write_partial(b'0123', version='"v1"')
+
+        with requests_mock.mock() as m:
+            m.get('http://test.com/big.bin', content=b'abcdef',
+                  headers={'ETag': '"v2"'})
+            self.download_file('http://test.com/big.bin', self.output)
+
+        self.assertEqual(self.read_file(), b'abcdef')
+
+    def test_resume_stale(self):
+        self.write_partial(b'0123456789', version='"v1"')
+
+        with requests_mock.mock() as m:
+            m.get('http://test.com/big.bin',
+                  [{'status_code': 416}, {'content': b'abcdef'}])
+            self.download_file('http://test.com/big.bin', self.output)
+            self.assertEqual(m.call_count, 2)
+            self.assertFalse('Range' in m.last_request.headers)
+
+        self.assertEqual(self.read_file(), b'abcdef')
+
+    def test_get_validator(self):
+        response = MagicMock(headers={'ETag': '"v1"',
+                                      'Last-Modified': 'yesterday'})
+        self.assertEqual(b.get_validator(response), '"v1"')
+        response.headers['ETag'] = 'W/"v1"'
+        self.assertEqual(b.get_validator(response), 'yesterday')
+
+    def test_checksum(self):
+        checksum = 'sha256:' + hashlib.sha256(b'testing').hexdigest()
+        with requests_mock.mock() as m:
+            m.get('http://test.com/good.yaml', content=b'testing')
+            m.get('http://test.com/bad.yaml', content=b'corrupted')
+            self.download_file('http://test.com/good.yaml', self.output,
+                               checksum=checksum)
+            with self.assertRaises(ValueError):
+                self.download_file('http://test.com/bad.yaml', self.output,
+                                   checksum=checksum)
+
+        self.assertTrue(os.path.exists(
+            os.path.join(self.output, 'good.yaml')))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.output, 'bad.yaml')))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.output, 'bad.yaml.part')))
+
+    def test_concurrent_manifest(self):
+        manifest = '\n'.join('file{}.yaml'.format(index)
+                             for index in range(10))
+        with requests_mock.mock() as m:
+            m.get('http://test.com/manifest.mf', text=manifest)
+            for index in range(10):
+                m.get('http://test.com/file{}.yaml'.format(index),
+                      text='content {}'.format(index))
+            with patch.object(b, 'download_file', self.download_file):
+                names = download_manifest('http://test.com/manifest.mf',
+                                          self.output)
+
+        self.assertEqual(names, ['file{}.yaml'.format(index)
+                                 for index in range(10)])
+        with open(os.path.join(self.output, 'file7.yaml')) as f:
+            self.assertEqual(f.read(), 'content 7')
+
 
 class BootstrapTests(unittest.TestCase):
     def test_url_cwd(self):
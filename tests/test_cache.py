@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+"""
+Tests for `cache` module.
+"""
+
+import mock
+import shutil
+import tempfile
+import unittest
+
+import requests
+import requests_mock
+
+from plumbery.cache import PlumberyCache
+from plumbery.exception import PlumberyException
+
+URL = 'http://smee.com/fittings.yaml'
+
+
+class TestPlumberyCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = PlumberyCache(directory=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_disabled(self):
+        cache = PlumberyCache()
+        with requests_mock.mock() as m:
+            m.get(URL, text='hello', headers={'ETag': '"1"'})
+            self.assertEqual(cache.get(URL), 'hello')
+            self.assertEqual(cache.get(URL), 'hello')
+            self.assertEqual(m.call_count, 2)
+
+        cache.configure(offline=True)
+        with self.assertRaises(PlumberyException):
+            cache.get(URL)
+
+    def test_conditional(self):
+        with requests_mock.mock() as m:
+            m.get(URL, text='hello', headers={'ETag': '"1"'})
+            self.assertEqual(self.cache.get(URL), 'hello')
+
+            m.get(URL, status_code=304)
+            self.assertEqual(self.cache.get(URL), 'hello')
+            self.assertEqual(m.request_history[-1].headers['If-None-Match'],
+                             '"1"')
+
+            m.get(URL, text='world',
+                  headers={'Last-Modified': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+            self.assertEqual(self.cache.get(URL), 'world')
+            self.assertEqual(m.request_history[-1].headers['If-None-Match'],
+                             '"1"')
+
+            m.get(URL, status_code=304)
+            self.assertEqual(self.cache.get(URL), 'world')
+            self.assertEqual(
+                m.request_history[-1].headers['If-Modified-Since'],
+                'Wed, 21 Oct 2015 07:28:00 GMT')
+
+    def test_no_validators(self):
+        with requests_mock.mock() as m:
+            m.get(URL, text='token1')
+            self.assertEqual(self.cache.get(URL), 'token1')
+
+            m.get(URL, text='token2')
+            self.assertEqual(self.cache.get(URL), 'token2')
+            self.assertFalse('If-None-Match' in m.request_history[-1].headers)
+
+            m.get(URL, text='secret',
+                  headers={'ETag': '"2"', 'Cache-Control': 'no-store'})
+            self.cache.get(URL)
+            self.assertEqual(self.cache._load_entry(URL), None)
+
+    def test_offline(self):
+        with requests_mock.mock() as m:
+            m.get(URL, text='hello', headers={'ETag': '"1"'})
+            self.cache.get(URL)
+
+        self.cache.configure(directory=self.directory, offline=True)
+        with requests_mock.mock() as m:
+            self.assertEqual(self.cache.get(URL), 'hello')
+            self.assertEqual(m.call_count, 0)
+
+            with self.assertRaises(PlumberyException):
+                self.cache.get('http://smee.com/unknown.yaml')
+
+    def test_fallback(self):
+        with requests_mock.mock() as m:
+            m.get(URL, text='hello', headers={'ETag': '"1"'})
+            self.cache.get(URL)
+
+            m.get(URL, exc=requests.exceptions.ConnectionError)
+            self.assertEqual(self.cache.get(URL), 'hello')
+
+            m.get(URL, exc=requests.exceptions.ReadTimeout)
+            self.assertEqual(self.cache.get(URL), 'hello')
+
+            m.get(URL, status_code=503, text='unavailable')
+            self.assertEqual(self.cache.get(URL), 'hello')
+
+            m.get('http://smee.com/unknown.yaml',
+                  exc=requests.exceptions.ConnectionError)
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.cache.get('http://smee.com/unknown.yaml')
+
+    def test_timeout(self):
+        with mock.patch('requests.get') as get:
+            get.return_value.text = 'hello'
+            self.cache.configure(timeout=5)
+            self.assertEqual(self.cache.get(URL), 'hello')
+            self.assertEqual(get.call_args[1]['timeout'], 5)
+
+            self.cache.get(URL, timeout=1)
+            self.assertEqual(get.call_args[1]['timeout'], 1)
+
+        self.assertEqual(PlumberyCache().timeout, 30)
+
+    def test_content_addressing(self):
+        with requests_mock.mock() as m:
+            m.get(URL, text='hello', headers={'ETag': '"1"'})
+            m.get('http://smee.com/copy.yaml', text='hello',
+                  headers={'ETag': '"a"'})
+            self.cache.get(URL)
+            self.cache.get('http://smee.com/copy.yaml')
+
+        self.assertEqual(self.cache._load_entry(URL)['digest'],
+                         self.cache._load_entry(
+                             'http://smee.com/copy.yaml')['digest'])
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(unittest.main())
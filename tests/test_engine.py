@@ -14,6 +14,8 @@ import base64
 import logging
 import mock
 import os
+import threading
+import time
 import unittest
 import yaml
 
@@ -54,6 +56,7 @@ from plumbery.action import PlumberyAction
 from plumbery.engine import PlumberyEngine
 from plumbery.plogging import plogging
 from plumbery.polisher import PlumberyPolisher
+from plumbery.terraform import Terraform, TerraformJob
 from plumbery import __version__
 
 import requests_mock
@@ -923,6 +926,19 @@ class TestPlumberyEngine(unittest.TestCase):
 
         args = parse_args(['fittings.yaml', 'build', 'web', '-s'])
         self.assertEqual(args.safe, True)
+        self.assertEqual(args.profile, None)
+
+        args = parse_args(
+            ['fittings.yaml', 'build', 'web', '--profile', 'profile.json'])
+        self.assertEqual(args.profile, 'profile.json')
+        self.assertEqual(args.cache, None)
+        self.assertEqual(args.offline, False)
+
+        args = parse_args(
+            ['fittings.yaml', 'build', 'web', '--cache', '.cache',
+             '--offline'])
+        self.assertEqual(args.cache, '.cache')
+        self.assertEqual(args.offline, True)
 
         args = parse_args(['fittings.yaml', 'build', 'web', '-d'])
         self.assertEqual(args.debug, True)
@@ -996,6 +1012,70 @@ class TestPlumberyEngine(unittest.TestCase):
         with self.assertRaises(TypeError):
             engine.set_parameters(('http://smee.com/params.yml'))
 
+    def test_jobs(self):
+        engine = PlumberyEngine()
+        terraform = Terraform(os.getcwd())
+        terraform.build = mock.MagicMock(return_value=0)
+        engine.add_job(TerraformJob(terraform, {'tf_path': 'aws'}, 'web'))
+        engine.add_job(TerraformJob(terraform, {'tf_path': 'aws'}, 'sql'))
+        self.assertEqual(engine.jobs[1].after, engine.jobs[0])
+        engine.add_job(TerraformJob(terraform, {'tf_path': 'azure'}, 'db'))
+        self.assertEqual(engine.jobs[2].after, None)
+
+        self.assertEqual(engine.join_jobs(), [])
+        self.assertEqual(engine.jobs, [])
+        self.assertEqual(terraform.build.call_count, 3)
+
+        terraform.build = mock.MagicMock(return_value=1)
+        engine.add_job(TerraformJob(terraform, {}, 'web'))
+        self.assertEqual(engine.join_jobs(), ['web'])
+
+    def test_polish_abort(self):
+        engine = PlumberyEngine()
+        polisher = mock.Mock()
+        polisher.go.side_effect = KeyboardInterrupt
+        with mock.patch('plumbery.engine.PlumberyPolisher.filter',
+                        return_value=[polisher]):
+            with self.assertRaises(KeyboardInterrupt):
+                engine.polish_blueprint('web')
+            with self.assertRaises(KeyboardInterrupt):
+                engine.polish_all_blueprints()
+
+        self.assertEqual(polisher.abort.call_count, 2)
+        self.assertEqual(polisher.reap.call_count, 0)
+
+    def test_jobs_from_threads(self):
+        engine = PlumberyEngine()
+        terraform = Terraform(os.getcwd())
+        active = []
+        overlaps = []
+
+        def build(settings):
+            active.append(settings)
+            if len(active) > 1:
+                overlaps.append(settings)
+            time.sleep(0.01)
+            active.remove(settings)
+            return 0
+
+        terraform.build = build
+
+        def add(index):
+            engine.add_job(TerraformJob(terraform, {}, str(index)))
+
+        threads = [threading.Thread(target=add, args=(index,))
+                   for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        afters = [job.after for job in engine.jobs]
+        self.assertEqual(afters.count(None), 1)
+        self.assertEqual(len(set(id(job) for job in afters)), 8)
+        self.assertEqual(engine.join_jobs(), [])
+        self.assertEqual(overlaps, [])
+
     def test_remote_params(self):
         engine = PlumberyEngine()
         with requests_mock.mock() as m:
@@ -8,6 +8,8 @@ if __name__ == "__main__" and __package__ is None:
     __package__ = "tests"
 from tests import dummy
 
+import mock
+import threading
 import unittest
 
 from libcloud.compute.drivers.dimensiondata import DimensionDataNodeDriver
@@ -112,7 +114,7 @@ class FakeRegion:
     def list_images(self, location):
         return [FakeImage()]
 
-    def list_nodes(self):
+    def list_nodes(self, ex_location=None):
         return [FakeNode()]
 
 
@@ -281,6 +283,26 @@ class TestPlumberyFacility(unittest.TestCase):
         self.assertEqual(
             self.facility.expand_blueprint('basement'), ['fake1'])
 
+    def test_expand_many_blueprints(self):
+        blueprints = [{'web{}'.format(index): {}} for index in range(300)]
+        blueprints.append({'all': ' '.join(
+            'web{}'.format(index) for index in reversed(range(300)))})
+        blueprints.append({'some': 'web3 web1 web3 unknown'})
+        self.facility.blueprints = blueprints
+
+        self.assertEqual(len(self.facility.list_blueprints()), 300)
+        self.assertEqual(self.facility.expand_blueprint('all')[0], 'web299')
+        self.assertEqual(
+            self.facility.expand_blueprint('some web2 web1'),
+            ['web3', 'web1', 'web2'])
+
+        blueprints.append({'extra': {}})
+        self.assertEqual(self.facility.expand_blueprint('extra'), ['extra'])
+
+        blueprints.append({'extra': {}})
+        with self.assertRaises(ValueError):
+            self.facility.list_blueprints()
+
     def test_get_blueprint(self):
         self.assertEqual(
             self.facility.get_blueprint('fake2')['target'], 'fake2')
@@ -345,6 +367,39 @@ class TestPlumberyFacility(unittest.TestCase):
     def test_wipe_blueprint(self):
         self.facility.wipe_blueprint('fake')
 
+    def test_refresh_all_blueprints(self):
+        self.facility.refresh_all_blueprints()
+
+    def test_refresh_blueprint(self):
+        self.facility.refresh_blueprint('fake')
+
+    def test_refresh_blueprints_concurrently(self):
+        events = []
+        lock = threading.Condition()
+
+        def refresh(name):
+            with lock:
+                events.append(('start', name))
+                lock.notify_all()
+                while (name != 'fake1'
+                        and len([event for event in events
+                                 if event[1] != 'fake1']) < 2):
+                    lock.wait(5)
+                events.append(('stop', name))
+            return name != 'web2'
+
+        self.facility._refresh_blueprint = refresh
+        self.facility.list_basement = mock.Mock(return_value=['fake1'])
+        with mock.patch.object(self.facility, 'expand_blueprint',
+                               return_value=['web1', 'fake1', 'web2']):
+            self.assertFalse(self.facility.refresh_blueprint('*'))
+
+        self.assertEqual(events[:2], [('start', 'fake1'), ('stop', 'fake1')])
+        self.assertEqual(sorted(events[2:4]),
+                         [('start', 'web1'), ('start', 'web2')])
+        self.assertEqual(sorted(events[4:]),
+                         [('stop', 'web1'), ('stop', 'web2')])
+
     def test_destroy_all_blueprints(self):
         self.facility.destroy_all_blueprints()
 
@@ -10,7 +10,9 @@ if __name__ == "__main__" and __package__ is None:
     __package__ = "tests"
 from tests import dummy
 
+import mock
 import os
+import threading
 import unittest
 
 from libcloud.compute.drivers.dimensiondata import DimensionDataNodeDriver
@@ -18,6 +20,8 @@ from libcloud.backup.drivers.dimensiondata import DimensionDataBackupDriver
 
 from plumbery.engine import PlumberyEngine
 from plumbery.infrastructure import PlumberyInfrastructure
+from plumbery.infrastructure import PlumberyIpv4Pool
+from plumbery.infrastructure import PlumberyNatTable
 
 from .mock_api import DimensionDataMockHttp
 DIMENSIONDATA_PARAMS = ('user', 'password')
@@ -46,6 +50,92 @@ class FakeLocation:
     id = 'EU6'
 
 
+class FakeVlan:
+
+    def __init__(self, name):
+        self.id = name
+        self.name = name
+
+
+class FakeNatRule:
+
+    def __init__(self, internal_ip, external_ip):
+        self.internal_ip = internal_ip
+        self.external_ip = external_ip
+
+
+class FakeNatRegion:
+
+    def __init__(self):
+        self.listings = 0
+
+    def ex_get_network_domain(self, network_domain_id):
+        domain = FakeDomain()
+        domain.id = network_domain_id
+        return domain
+
+    def ex_list_nat_rules(self, network_domain):
+        self.listings += 1
+        return [FakeNatRule('10.0.0.1', '168.128.1.1'),
+                FakeNatRule('10.0.0.2', '168.128.1.2')]
+
+
+class FakeBlock:
+
+    def __init__(self, base_ip, size=2):
+        self.base_ip = base_ip
+        self.size = size
+
+
+class FakeIpv4Region:
+
+    def __init__(self):
+        self.blocks = [FakeBlock('168.128.1.1')]
+        self.listings = 0
+
+    def ex_list_public_ip_blocks(self, network_domain):
+        self.listings += 1
+        return list(self.blocks)
+
+    def ex_add_public_ip_block_to_network_domain(self, network_domain):
+        block = FakeBlock('168.128.2.{}'.format(1+2*len(self.blocks)))
+        self.blocks.append(block)
+        return block
+
+
+class FakeTeardownRegion:
+    """
+    Removes Ethernet networks a couple of listings after their deletion
+    """
+
+    def __init__(self, names):
+        self.vlans = [FakeVlan(name) for name in names]
+        self.requests = []
+        self.listings = 0
+        self.nodes = {}
+        self.lock = threading.Lock()
+
+    def ex_delete_vlan(self, vlan):
+        with self.lock:
+            if len(self.nodes.get(vlan.name, [])) > 0:
+                raise Exception('HAS_DEPENDENCY')
+            self.requests.append(('delete', vlan.name))
+
+    def ex_list_vlans(self, network_domain):
+        self.listings += 1
+        if self.listings > 1:
+            deleted = [name for action, name in self.requests]
+            self.vlans = [vlan for vlan in self.vlans
+                          if vlan.name not in deleted]
+        return list(self.vlans)
+
+    def list_nodes(self, ex_vlan):
+        return self.nodes.pop(ex_vlan.name, [])
+
+    def ex_delete_network_domain(self, network_domain):
+        self.requests.append(('delete domain', network_domain.name))
+
+
 fakeParameters = {
     'regionId': 'dd-na',
     'locationId': 'NA9'
@@ -87,9 +177,6 @@ class FakeFacility:
     backup = DimensionDataBackupDriver(*DIMENSIONDATA_PARAMS)
     location = FakeLocation()
 
-    _cache_network_domains = []
-    _cache_vlans = []
-
     def get_location_id(self):
         return 'EU6'
 
@@ -154,6 +241,11 @@ class TestPlumberyInfrastructure(unittest.TestCase):
 
     def setUp(self):
         facility = FakeFacility()
+        facility._cache_network_domains = []
+        facility._cache_vlans = []
+        facility._cache_lock = threading.RLock()
+        facility._cache_nat_tables = {}
+        facility._cache_ipv4_pools = {}
         self.infrastructure = PlumberyInfrastructure(facility=facility)
 
     def tearDown(self):
@@ -216,6 +308,120 @@ class TestPlumberyInfrastructure(unittest.TestCase):
         self.infrastructure.blueprint = fakeBluePrint
         self.infrastructure._get_ipv4()
 
+    @mock.patch('time.sleep')
+    def test_destroy_network_domain(self, sleep):
+        region = FakeTeardownRegion(['vlan1', 'vlan2', 'other'])
+        region.nodes['vlan2'] = ['node']
+        self.infrastructure.region = region
+
+        domain = FakeDomain()
+        domain.name = 'VDC1'
+        group = {'domain': domain,
+                 'blueprints': [{'target': 'one'}, {'target': 'two'}],
+                 'networks': [FakeVlan('vlan1'), FakeVlan('vlan2')]}
+        self.infrastructure._destroy_network_domain(group)
+
+        self.assertEqual(sorted(region.requests[:2]),
+                         [('delete', 'vlan1'), ('delete', 'vlan2')])
+        self.assertEqual(region.requests[2], ('delete domain', 'VDC1'))
+        self.assertEqual(region.listings, 2)
+        self.assertEqual([vlan.name for vlan in region.vlans], ['other'])
+
+    @mock.patch('time.sleep')
+    def test_destroy_ethernet(self, sleep):
+        region = FakeTeardownRegion(['vlan1'])
+        region.nodes['vlan1'] = ['node']
+        self.infrastructure.region = region
+        self.infrastructure._wait_for_no_nodes = lambda network, timeout: False
+        self.assertFalse(
+            self.infrastructure._destroy_ethernet(FakeVlan('vlan1')))
+        self.assertEqual(region.requests, [])
+
+    def test_nat_table(self):
+        table = PlumberyNatTable([FakeNatRule('10.0.0.1', '168.128.1.1')])
+        self.assertEqual(len(table), 1)
+        self.assertEqual(table.get_by_internal('10.0.0.1').external_ip,
+                         '168.128.1.1')
+        self.assertEqual(table.get_by_external('168.128.1.1').internal_ip,
+                         '10.0.0.1')
+
+        rule = FakeNatRule('10.0.0.2', '168.128.1.2')
+        table.add(rule)
+        self.assertEqual(sorted(table.list_external()),
+                         ['168.128.1.1', '168.128.1.2'])
+        table.remove(rule)
+        self.assertEqual(table.get_by_internal('10.0.0.2'), None)
+        self.assertEqual(table.get_by_external('168.128.1.2'), None)
+
+    def test_get_nat_table(self):
+        region = FakeNatRegion()
+        self.infrastructure.region = region
+
+        table = self.infrastructure.get_nat_table('abc')
+        self.assertEqual(table.get_by_internal('10.0.0.2').external_ip,
+                         '168.128.1.2')
+        self.assertTrue(self.infrastructure.get_nat_table(FakeDomain()) is
+                        not table)
+        self.assertTrue(self.infrastructure.get_nat_table('abc') is table)
+        self.assertEqual(region.listings, 2)
+
+    def test_ipv4_pool(self):
+        pool = PlumberyIpv4Pool([FakeBlock('168.128.1.254', 4)],
+                                ['168.128.1.255'])
+        self.assertEqual(len(pool), 4)
+        self.assertEqual(pool.count_free(), 3)
+        self.assertEqual(pool.allocate('web'), '168.128.1.254')
+        self.assertEqual(pool.allocate('web'), '168.128.2.0')
+        self.assertEqual(pool.count_allocated('web'), 2)
+
+        pool.release('168.128.2.0', 'web')
+        self.assertEqual(pool.count_allocated('web'), 1)
+        self.assertEqual(pool.allocate('db'), '168.128.2.0')
+        self.assertEqual(pool.allocate('db'), '168.128.2.1')
+        self.assertEqual(pool.allocate('db'), None)
+
+    def test_get_ipv4_from_pool(self):
+        region = FakeIpv4Region()
+        self.infrastructure.region = region
+        self.infrastructure.get_network_domain = lambda name: FakeDomain()
+        self.infrastructure.ex_list_reserved_public_ip_addresses = \
+            lambda domain: ['168.128.1.1']
+        self.infrastructure.blueprint = {
+            'target': 'web',
+            'domain': {'name': 'VDC1', 'ipv4': 'auto'},
+            'nodes': [{'web[1..5]': {'glue': ['internet 80']}},
+                      {'db': {}}]}
+
+        addresses = [self.infrastructure._get_ipv4() for index in range(5)]
+        self.assertEqual(addresses,
+                         ['168.128.1.2', '168.128.2.3', '168.128.2.4',
+                          '168.128.2.5', '168.128.2.6'])
+        self.assertEqual(region.listings, 1)
+        self.assertEqual(len(region.blocks), 3)
+
+        self.infrastructure.blueprint['domain']['ipv4'] = 6
+        self.assertEqual(self.infrastructure._get_ipv4(), None)
+
+    def test_reserve_private_ipv4(self):
+        requests = []
+        self.infrastructure.network = FakeNetwork()
+        self.infrastructure.blueprint = fakeBluePrint
+        self.infrastructure.ex_list_reserved_private_ip_addresses = \
+            lambda vlan: ['10.0.10.11']
+        self.infrastructure.ex_reserve_private_ip_addresses = \
+            lambda vlan, address: requests.append(address)
+
+        self.assertTrue(self.infrastructure._reserve_private_ipv4(
+            ['10.0.10.11', '10.0.10.12', '10.0.10.13', '10.0.10.12']))
+        self.assertEqual(sorted(requests), ['10.0.10.12', '10.0.10.13'])
+
+        def fail(vlan, address):
+            raise Exception('INVALID_INPUT_DATA')
+
+        self.infrastructure.ex_reserve_private_ip_addresses = fail
+        self.assertFalse(self.infrastructure._reserve_private_ipv4(
+            ['10.0.10.14']))
+
     def test_get_default(self):
         engine = PlumberyEngine(defaultsPlan)
         facility = engine.list_facility('EU6')[0]
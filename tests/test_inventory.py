@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+"""
+Tests for `inventory` module.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import yaml
+
+from plumbery.inventory import PlumberyInventory
+
+records = [
+    {'name': 'web1', 'private_ips': ['10.0.0.11'], 'tags': ['web']},
+    {'name': 'web2', 'private_ips': ['10.0.0.12'], 'tags': []},
+    ]
+
+
+class TestPlumberyInventory(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'inventory.yaml')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_yaml(self):
+        inventory = PlumberyInventory(self.path)
+        for record in records:
+            inventory.write(record)
+        self.assertFalse(os.path.isfile(self.path))
+        self.assertTrue(inventory.close())
+
+        with open(self.path, 'r') as stream:
+            text = stream.read()
+        self.assertEqual(text, yaml.safe_dump(records,
+                                              default_flow_style=False))
+        self.assertEqual(os.listdir(self.directory), ['inventory.yaml'])
+
+    def test_jsonl(self):
+        inventory = PlumberyInventory(self.path, format='jsonl')
+        for record in records:
+            inventory.write(record)
+        inventory.close()
+
+        with open(self.path, 'r') as stream:
+            self.assertEqual([json.loads(line) for line in stream], records)
+
+        with self.assertRaises(ValueError):
+            PlumberyInventory(self.path, format='xml')
+
+    def test_discard(self):
+        inventory = PlumberyInventory(self.path)
+        inventory.write(records[0])
+        self.assertTrue(inventory.close())
+
+        inventory = PlumberyInventory(self.path)
+        inventory.write(records[1])
+        inventory.discard()
+        inventory.discard()
+        self.assertEqual(os.listdir(self.directory), ['inventory.yaml'])
+        with open(self.path, 'r') as stream:
+            self.assertEqual(yaml.safe_load(stream), records[:1])
+
+    def test_unchanged(self):
+        inventory = PlumberyInventory(self.path)
+        inventory.write(records[0])
+        self.assertTrue(inventory.close())
+        mtime = os.path.getmtime(self.path)
+
+        inventory = PlumberyInventory(self.path)
+        inventory.write(records[0])
+        self.assertFalse(inventory.close())
+        self.assertEqual(os.path.getmtime(self.path), mtime)
+
+        inventory = PlumberyInventory(self.path)
+        self.assertFalse(inventory.close())
+        self.assertEqual(os.listdir(self.directory), ['inventory.yaml'])
+
+    def test_read(self):
+        for format in PlumberyInventory.FORMATS:
+            inventory = PlumberyInventory(
+                stream=tempfile.TemporaryFile('w+'), format=format)
+            for record in records:
+                inventory.write(record)
+            self.assertEqual(list(inventory.read()), records)
+            inventory.stream.close()
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(unittest.main())
@@ -10,10 +10,14 @@ if __name__ == "__main__" and __package__ is None:
     __package__ = "tests"
 from tests import dummy
 
+import mock
+import threading
 import unittest
 
+from libcloud.compute.base import NodeState
 from libcloud.compute.drivers.dimensiondata import DimensionDataNodeDriver
 
+from plumbery.nodes import PlumberyLabels
 from plumbery.nodes import PlumberyNodes
 
 from .mock_api import DimensionDataMockHttp
@@ -77,7 +81,7 @@ class FakeRegion:
                           *args, **kwargs):
         return []
 
-    def list_nodes(self):
+    def list_nodes(self, ex_location=None):
         return []
 
 
@@ -88,6 +92,7 @@ class FakeFacility:
     backup = None
     _cache_network_domains = []
     _cache_vlans = []
+    _cache_lock = threading.RLock()
 
     plumbery = FakePlumbery()
     DimensionDataNodeDriver.connectionCls.conn_classes = (
@@ -106,6 +111,61 @@ class FakeFacility:
     def get_location_id(self):
         return 'EU6'
 
+class FakeNode:
+
+    def __init__(self, name, state):
+        self.id = name
+        self.name = name
+        self.state = state
+        self.extra = {'datacenterId': 'EU6'}
+
+
+class FakeStateRegion:
+    """
+    Changes the state of nodes after a couple of listings
+    """
+
+    def __init__(self, names, state):
+        self.nodes = [FakeNode(name, state) for name in names]
+        self.requests = []
+        self.locations = []
+        self.changes = {}
+        self.lock = threading.Lock()
+
+    def list_nodes(self, ex_location=None):
+        with self.lock:
+            self.locations.append(ex_location)
+            for node in self.nodes:
+                if node.name in self.changes:
+                    countdown, state = self.changes[node.name]
+                    if countdown < 1:
+                        node.state = state
+                    self.changes[node.name] = (countdown-1, state)
+            self.nodes = [node for node in self.nodes
+                          if node.state is not None]
+        return list(self.nodes)
+
+    def ex_start_node(self, node):
+        with self.lock:
+            self.requests.append(('start', node.name))
+            self.changes[node.name] = (len(self.requests), NodeState.RUNNING)
+
+    def ex_shutdown_graceful(self, node):
+        with self.lock:
+            self.requests.append(('stop', node.name))
+            self.changes[node.name] = (1, NodeState.STOPPED)
+
+    def destroy_node(self, node):
+        with self.lock:
+            self.requests.append(('destroy', node.name))
+            self.changes[node.name] = (1, None)
+
+
+class FakeStateFacility(FakeFacility):
+
+    def __init__(self, region):
+        self.region = region
+
 fakeBlueprint = {
     'domain': {
         'name': 'VDC1',
@@ -148,6 +208,138 @@ class TestPlumberyNodes(unittest.TestCase):
     def test_stop_nodes(self):
         self.nodes.stop_blueprint('fake')
 
+    @mock.patch('time.sleep')
+    def test_start_nodes_concurrently(self, sleep):
+        region = FakeStateRegion(['web1', 'web2', 'web3'], NodeState.STOPPED)
+        nodes = PlumberyNodes(FakeStateFacility(region))
+
+        latencies = nodes.start_nodes(['web1', 'web2', 'web3', 'web4'],
+                                      workers=3)
+        self.assertEqual(latencies, {})
+        self.assertEqual(sorted(region.requests),
+                         [('start', 'web1'), ('start', 'web2'),
+                          ('start', 'web3')])
+        self.assertEqual(region.locations[0], 'EU6')
+
+        latencies = nodes.wait_for_nodes(['web1', 'web2', 'web3', 'web4'],
+                                         NodeState.RUNNING)
+        self.assertEqual(sorted(latencies.keys()), ['web1', 'web2', 'web3'])
+        self.assertTrue(all(node.state == NodeState.RUNNING
+                            for node in region.nodes))
+
+        region.changes = {}
+        latencies = nodes.wait_for_nodes(['web1'], NodeState.STOPPED,
+                                         timeout=0)
+        self.assertEqual(latencies, {'web1': None})
+
+    @mock.patch('time.sleep')
+    def test_stop_nodes_concurrently(self, sleep):
+        region = FakeStateRegion(['web1', 'web2'], NodeState.RUNNING)
+        nodes = PlumberyNodes(FakeStateFacility(region))
+
+        latencies = nodes.stop_nodes([('web1', {}),
+                                      ('web2', {'running': 'always'})],
+                                     wait=True)
+        self.assertEqual(region.requests, [('stop', 'web1')])
+        self.assertEqual(list(latencies.keys()), ['web1'])
+
+    @mock.patch('plumbery.nodes.MonitoringConfiguration')
+    @mock.patch('plumbery.nodes.PlumberyInfrastructure')
+    def test_destroy_nodes_concurrently(self, infrastructure, monitoring):
+        region = FakeStateRegion(['web1', 'web2', 'db'], NodeState.STOPPED)
+        for node in region.nodes:
+            node.extra['status'] = mock.Mock(action=None)
+        nodes = PlumberyNodes(FakeStateFacility(region))
+        nodes._detach_node = mock.Mock()
+        nodes.get_node = mock.Mock()
+
+        blueprint = {'nodes': [{'db': {'glue': ['internet 22']}},
+                               'web[1..2]',
+                               'web3']}
+        accepted = []
+        self.assertTrue(nodes.destroy_blueprint(blueprint, workers=3,
+                                                accepted=accepted))
+        self.assertEqual(sorted(accepted), ['db', 'web1', 'web2'])
+        self.assertEqual(region.requests[0], ('destroy', 'db'))
+        self.assertEqual(sorted(region.requests[1:]),
+                         [('destroy', 'web1'), ('destroy', 'web2')])
+        self.assertEqual(len(region.locations), 1)
+        self.assertEqual(nodes.get_node.call_count, 0)
+
+        self.assertTrue(nodes.destroy_blueprint({'target': 'empty'}))
+
+        region = FakeStateRegion(['web1', 'db'], NodeState.STOPPED)
+        nodes = PlumberyNodes(FakeStateFacility(region))
+        blueprint = {'nodes': [{'db': {'destroy': 'never'}}, 'web1']}
+        self.assertFalse(nodes.destroy_blueprint(blueprint))
+        self.assertEqual(region.requests, [])
+
+    @mock.patch('time.sleep')
+    def test_wait_for_deletion(self, sleep):
+        region = FakeStateRegion(['web1', 'web2', 'db'], NodeState.STOPPED)
+        for node in region.nodes:
+            node.extra['status'] = mock.Mock(action=None)
+        region.nodes[2].state = NodeState.RUNNING
+        nodes = PlumberyNodes(FakeStateFacility(region))
+
+        region.destroy_node(region.nodes[0])
+        region.destroy_node(region.nodes[1])
+        self.assertTrue(nodes.wait_for_deletion(['web1', 'web2', 'db']))
+        self.assertEqual(sleep.call_count, 1)
+        self.assertEqual([node.name for node in region.nodes], ['db'])
+
+        region.nodes[0].state = NodeState.STOPPED
+        self.assertFalse(nodes.wait_for_deletion(['db'], timeout=0))
+
+    @mock.patch('plumbery.nodes.PlumberyInfrastructure')
+    def test_add_public_ips(self, infrastructure):
+        table = infrastructure.return_value.get_nat_table.return_value
+        table.get_by_internal.return_value = mock.Mock(
+            external_ip='168.128.1.2')
+
+        items = [mock.Mock(public_ips=[], private_ips=['10.0.0.2'],
+                           extra={'networkDomainId': 'abc'})
+                 for index in range(3)]
+        for node in items:
+            self.nodes._add_public_ips(node)
+            self.assertEqual(node.public_ips, ['168.128.1.2'])
+
+        self.assertEqual(infrastructure.call_count, 1)
+        self.assertEqual(
+            infrastructure.return_value.get_nat_table.call_count, 3)
+
+    def test_list_node_settings(self):
+        blueprint = {'nodes': [{'web[1..2]': {'running': 'always'}}, 'db']}
+        self.assertEqual(PlumberyNodes.list_node_settings(blueprint),
+                         [('web1', {'running': 'always'}),
+                          ('web2', {'running': 'always'}),
+                          ('db', {})])
+
+    def test_expand_labels(self):
+        self.assertEqual(self.nodes.expand_labels('mongodb'), ['mongodb'])
+        self.assertEqual(self.nodes.expand_labels('mongodb[1..3]_eu'),
+                         ['mongodb1_eu', 'mongodb2_eu', 'mongodb3_eu'])
+        self.assertTrue(self.nodes.expand_labels('web[1..3]')
+                        is PlumberyNodes.expand_labels('web[1..3]'))
+
+    def test_labels(self):
+        labels = PlumberyLabels('web[1..500]-eu')
+        self.assertEqual(len(labels), 500)
+        self.assertEqual(labels[0], 'web1-eu')
+        self.assertEqual(labels[-1], 'web500-eu')
+        self.assertTrue('web42-eu' in labels)
+        self.assertFalse('web042-eu' in labels)
+        self.assertFalse('web501-eu' in labels)
+        self.assertFalse('web42-us' in labels)
+
+        labels = PlumberyLabels('web')
+        self.assertEqual(len(labels), 1)
+        self.assertEqual(list(labels), ['web'])
+        self.assertTrue('web' in labels)
+        self.assertFalse('web1' in labels)
+
+        self.assertEqual(len(PlumberyLabels('web[3..1]')), 0)
+
 
 if __name__ == '__main__':
     import sys
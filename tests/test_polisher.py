@@ -11,15 +11,24 @@ if __name__ == "__main__" and __package__ is None:
 from tests import dummy
 
 from collections import namedtuple
+import json
+import mock
+import os
+import shutil
+import tempfile
 import unittest
+import xml.etree.ElementTree as ET
 
+from libcloud.common.dimensiondata import TYPES_URN
 from libcloud.compute.drivers.dimensiondata import DimensionDataNodeDriver
 from libcloud.compute.types import NodeState
 
 from plumbery.engine import PlumberyEngine
 from plumbery.infrastructure import PlumberyInfrastructure
+from plumbery.infrastructure import PlumberyNatTable
 from plumbery.nodes import PlumberyNodes
 from plumbery.polisher import PlumberyPolisher
+from plumbery.polishers.disks import DisksConfiguration
 
 from .mock_api import DimensionDataMockHttp
 DIMENSIONDATA_PARAMS = ('user', 'password')
@@ -79,7 +88,7 @@ class FakeRegion:
     def destroy_node(self, node):
         return True
 
-    def list_nodes(self):
+    def list_nodes(self, ex_location=None):
         return [FakeNode()]
 
 
@@ -144,6 +153,9 @@ class FakeContainer:
     def get_ethernet(self, blueprint):
         return None
 
+    def get_nat_table(self, domain):
+        return PlumberyNatTable(self.region.ex_list_nat_rules(domain))
+
     def _add_to_pool(self, node):
         pass
 
@@ -288,6 +300,155 @@ class TestPlumberyPolisher(unittest.TestCase):
         polisher = PlumberyPolisher.from_shelf('configure', {})
         do_polish(polisher)
 
+    def test_attach_nodes(self):
+        polisher = PlumberyPolisher.from_shelf('configure', {})
+        polisher.engine = mock.Mock(safeMode=False)
+        polisher.move_to(FakeFacility())
+        polisher.region = mock.Mock()
+        polisher.region.ex_get_node_by_id.return_value = mock.Mock(
+            extra={'status': FakeStatus(None)})
+
+        vlan = mock.Mock(private_ipv4_range_address='10.0.20.0')
+        vlan.name = 'vlan2'
+        polisher.container = mock.Mock(blueprint=FakeContainer.blueprint)
+        polisher.container.get_ethernet.return_value = vlan
+
+        items = []
+        for index in range(3):
+            node = FakeNode()
+            node.name = 'fake{}'.format(index)
+            node.id = str(index)
+            node.extra['interfaces'] = []
+            items.append((node, {'glue': ['vlan1', 'vlan2 .5']}))
+        items[2][0].extra['interfaces'] = [{'id': 'x', 'network': 'vlan2'}]
+        items.append((FakeNode(), {}))
+
+        plan = polisher.plan_attachments(items[0][0], ['vlan1', 'vlan2 .5'])
+        self.assertEqual(plan, [('network', 'vlan2',
+                                 {'private_ipv4': '10.0.20.5'}, 'vlan2')])
+
+        names = polisher.attach_nodes(items)
+        self.assertEqual(sorted(names), ['fake0', 'fake1', 'fake2'])
+        self.assertEqual(polisher.region.ex_attach_node_to_vlan.call_count, 2)
+
+    def test_attach_nodes_listed_by_driver(self):
+        polisher = PlumberyPolisher.from_shelf('configure', {})
+        polisher.engine = mock.Mock(safeMode=False)
+        polisher.move_to(FakeFacility())
+        polisher.region = mock.Mock()
+        polisher.region.ex_get_node_by_id.return_value = mock.Mock(
+            extra={'status': FakeStatus(None)})
+        polisher.nodes.region = polisher.region
+        polisher.nodes._infrastructure = mock.Mock()
+
+        details = {
+            '0': '<networkInfo/>',
+            '1': '<networkInfo/>',
+            '2': '<networkInfo><additionalNic id="x" vlanName="vlan2"/>'
+                 '</networkInfo>'}
+
+        def request(action):
+            node_id = action.split('/')[-1]
+            return mock.Mock(object=ET.fromstring(
+                '<server xmlns="{}">{}</server>'.format(TYPES_URN,
+                                                        details[node_id])))
+
+        connection = polisher.region.connection
+        connection.request_with_orgId_api_2.side_effect = request
+
+        vlan = mock.Mock(private_ipv4_range_address='10.0.20.0')
+        vlan.name = 'vlan2'
+        polisher.container = mock.Mock(blueprint=FakeContainer.blueprint)
+        polisher.container.get_ethernet.return_value = vlan
+
+        # disks as reported by libcloud 1.2 and later
+        items = []
+        for index in range(3):
+            node = FakeNode()
+            node.name = 'fake{}'.format(index)
+            node.id = str(index)
+            node.extra['networkDomainId'] = 'abc'
+            node.extra['disks'] = [mock.Mock(scsi_id=0, speed='STANDARD',
+                                             id='d0', size_gb=10)]
+            polisher.nodes._enrich_node(node)
+            self.assertEqual(node.extra['disks'][0]['size'], 10)
+            items.append((node, {'glue': ['vlan2 .5']}))
+
+        for node, settings in items:
+            polisher.plan_attachments(node, settings['glue'])
+        self.assertEqual(connection.request_with_orgId_api_2.call_count, 0)
+
+        polisher.attach_nodes(items)
+        self.assertEqual(
+            sorted(call[0][0] for call
+                   in connection.request_with_orgId_api_2.call_args_list),
+            ['server/server/0', 'server/server/1', 'server/server/2'])
+        self.assertEqual(polisher.region.ex_attach_node_to_vlan.call_count, 2)
+
+    def test_reconfigure_nodes(self):
+        polisher = PlumberyPolisher.from_shelf('configure', {})
+        polisher.engine = mock.Mock(safeMode=False)
+        polisher.move_to(FakeFacility())
+        polisher.region = mock.Mock()
+        polisher.region.ex_get_node_by_id.return_value = mock.Mock(
+            extra={'status': FakeStatus(None)})
+        polisher.facility.region = polisher.region
+
+        items = []
+        for index in range(3):
+            node = FakeNode()
+            node.name = 'fake{}'.format(index)
+            node.extra['cpu'] = mock.Mock(cpu_count=2,
+                                          cores_per_socket=1,
+                                          performance='STANDARD')
+            node.extra['memoryMb'] = 4096
+            node.extra['disks'] = [{'scsiId': 0, 'id': 'd0',
+                                    'size': 10, 'speed': 'STANDARD'}]
+            items.append((node, {'cpu': 4,
+                                 'memory': 8,
+                                 'disks': ['0 20 standard', '1 50']}))
+        items[2][1]['cpu'] = 2
+
+        operations = polisher.plan_node_changes(
+            items[0][0], items[0][1],
+            DisksConfiguration(engine=polisher.engine,
+                               facility=polisher.facility))
+        self.assertEqual([item['action'] for item in operations],
+                         ['compute', 'expand', 'add'])
+        self.assertEqual(operations[0]['memory'], 8)
+        self.assertEqual(operations[0]['cpu_count'], '4')
+
+        names = polisher.reconfigure_nodes(items)
+        self.assertEqual(sorted(names), ['fake0', 'fake1', 'fake2'])
+        self.assertEqual(polisher.region.ex_reconfigure_node.call_count, 3)
+        kwargs = polisher.region.ex_reconfigure_node.call_args_list
+        self.assertTrue(any(item[1]['cpu_count'] is None for item in kwargs))
+        self.assertEqual(polisher.region.ex_change_storage_size.call_count, 3)
+        self.assertEqual(polisher.region.ex_add_storage_to_node.call_count, 3)
+
+        # each change waits for the node to be idle, disks included
+        self.assertEqual(polisher.region.ex_get_node_by_id.call_count, 9)
+
+    @mock.patch('time.sleep')
+    def test_reconfigure_node_busy(self, sleep):
+        polisher = PlumberyPolisher.from_shelf('configure', {})
+        polisher.engine = mock.Mock(safeMode=False)
+        polisher.move_to(FakeFacility())
+        polisher.region = mock.Mock()
+        polisher.region.ex_get_node_by_id.return_value = mock.Mock(
+            extra={'status': FakeStatus(None)})
+        polisher.region.ex_reconfigure_node.side_effect = [
+            Exception('RESOURCE_BUSY'), None]
+
+        polisher.apply_node_changes(FakeNode(), [{'action': 'compute',
+                                                  'memory': 8,
+                                                  'cpu_count': '4',
+                                                  'cores_per_socket': None,
+                                                  'cpu_performance': None}])
+        self.assertEqual(polisher.region.ex_reconfigure_node.call_count, 2)
+        self.assertEqual(polisher.region.ex_get_node_by_id.call_count, 1)
+        self.assertEqual(sleep.call_count, 1)
+
     def test_information(self):
         polisher = PlumberyPolisher.from_shelf('information', {})
         do_polish(polisher)
@@ -296,6 +457,100 @@ class TestPlumberyPolisher(unittest.TestCase):
         polisher = PlumberyPolisher.from_shelf('inventory', {})
         do_polish(polisher)
 
+    def test_incremental(self):
+        directory = tempfile.mkdtemp()
+        try:
+            output = os.path.join(directory, 'inventory.yaml')
+
+            polisher = PlumberyPolisher.from_shelf('inventory',
+                                                   {'output': output})
+            self.assertTrue(polisher.incremental)
+            do_polish(polisher)
+            with open(output+'.snapshot', 'r') as stream:
+                snapshot = [json.loads(line) for line in stream]
+            self.assertEqual([item['key'] for item in snapshot],
+                             ['EU6::fake'])
+            with open(output, 'r') as stream:
+                text = stream.read()
+
+            polisher = PlumberyPolisher.from_shelf('inventory',
+                                                   {'output': output})
+            with mock.patch.object(polisher, 'describe_node') as describe:
+                do_polish(polisher)
+                self.assertEqual(describe.call_count, 0)
+            with open(output, 'r') as stream:
+                self.assertEqual(stream.read(), text)
+
+            polisher.load_snapshot()
+            node = FakeNode()
+            self.assertTrue(polisher.is_unchanged(
+                node, fakeNodeSettings, FakeContainer()))
+            node.state = NodeState.STOPPED
+            self.assertFalse(polisher.is_unchanged(
+                node, fakeNodeSettings, FakeContainer()))
+            polisher.save_snapshot()
+
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ['inventory.yaml', 'inventory.yaml.snapshot'])
+
+        finally:
+            shutil.rmtree(directory)
+
+    def test_abort(self):
+        directory = tempfile.mkdtemp()
+        try:
+            output = os.path.join(directory, 'inventory.yaml')
+
+            polisher = PlumberyPolisher.from_shelf('inventory',
+                                                   {'output': output})
+            do_polish(polisher)
+
+            polisher = PlumberyPolisher.from_shelf('inventory',
+                                                   {'output': output})
+            polisher.go(FakeEngine())
+            self.assertEqual(len(os.listdir(directory)), 4)
+            polisher.abort()
+            self.assertEqual(sorted(os.listdir(directory)),
+                             ['inventory.yaml', 'inventory.yaml.snapshot'])
+
+        finally:
+            shutil.rmtree(directory)
+
+    def test_fingerprint(self):
+        polisher = PlumberyPolisher.from_shelf('inventory', {})
+        polisher.engine = mock.Mock(secrets={'secret.sql': 'a'})
+        polisher.engine.get_parameters.return_value = {'parameter.x': 1}
+
+        node = FakeNode()
+        other = FakeNode()
+        other.name = 'sql'
+        settings = {'cloud-config': '{{ secret.sql }} {{ sql.private }}'}
+        index = {'fake': node, 'sql': other}
+
+        def fingerprint():
+            return polisher.get_fingerprint(node, settings, FakeContainer(),
+                                            index)
+
+        fingerprints = [fingerprint()]
+
+        node.public_ips = ['168.128.1.1']
+        fingerprints.append(fingerprint())
+
+        polisher.engine.get_parameters.return_value = {'parameter.x': 2}
+        fingerprints.append(fingerprint())
+
+        polisher.engine.secrets['secret.sql'] = 'b'
+        fingerprints.append(fingerprint())
+
+        other.private_ips = ['10.0.0.2']
+        fingerprints.append(fingerprint())
+
+        polisher.engine.secrets['secret.other'] = 'c'
+        fingerprints.append(fingerprint())
+
+        self.assertEqual(len(set(fingerprints[:-1])), 5)
+        self.assertEqual(fingerprints[-1], fingerprints[-2])
+
     def test_ping(self):
         polisher = PlumberyPolisher.from_shelf('ping', {})
         do_polish(polisher)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+
+"""
+Tests for `profiler` module.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from plumbery.profiler import PlumberyProfiler
+
+
+class FakeConnection(object):
+
+    host = 'api.example.com'
+
+    def request_with_orgId_api_2(self, action, method='GET', data=None):
+        return action
+
+    def set_http_proxy(self, proxy_url):
+        return proxy_url
+
+
+class FakeDriver(object):
+
+    region = 'dd-eu'
+
+    def __init__(self):
+        self.connection = FakeConnection()
+        self.busy = 0
+
+    def list_nodes(self):
+        return ['node1', 'node2']
+
+    def create_node(self, name):
+        if self.busy > 0:
+            self.busy -= 1
+            raise Exception('RESOURCE_BUSY: please retry later')
+        return name
+
+
+class TestPlumberyProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = PlumberyProfiler()
+        self.driver = self.profiler.wrap(FakeDriver(), 'compute')
+
+    def tearDown(self):
+        self.profiler = None
+        self.driver = None
+
+    def test_wrap(self):
+        self.assertEqual(self.profiler.wrap(None, 'compute'), None)
+        self.assertTrue(
+            self.profiler.wrap(self.driver, 'compute') is self.driver)
+        self.assertEqual(self.driver.region, 'dd-eu')
+        self.assertEqual(self.driver.connection.host, 'api.example.com')
+
+        self.driver.region = 'dd-na'
+        self.assertEqual(self.driver._driver.region, 'dd-na')
+
+    def test_calls(self):
+        self.profiler.focus(action='build', facility='EU6')
+        self.profiler.focus(blueprint='web')
+        self.assertEqual(self.driver.list_nodes(), ['node1', 'node2'])
+        self.driver.list_nodes()
+
+        operations = self.profiler.get_operations()
+        self.assertEqual(len(operations), 1)
+        self.assertEqual(operations[0]['action'], 'build')
+        self.assertEqual(operations[0]['facility'], 'EU6')
+        self.assertEqual(operations[0]['blueprint'], 'web')
+        self.assertEqual(operations[0]['driver'], 'compute')
+        self.assertEqual(operations[0]['operation'], 'list_nodes')
+        self.assertEqual(operations[0]['count'], 2)
+        self.assertEqual(operations[0]['errors'], 0)
+
+    def test_focus(self):
+        self.profiler.focus(action='build', facility='EU6', blueprint='web')
+        self.profiler.focus(facility='NA9')
+        self.assertEqual(self.profiler.context['action'], 'build')
+        self.assertEqual(self.profiler.context['blueprint'], None)
+        self.profiler.focus(action='start')
+        self.assertEqual(self.profiler.context['facility'], None)
+
+    def test_threads(self):
+        self.profiler.focus(action='build', facility='EU6', blueprint='web')
+
+        def work():
+            self.profiler.focus(blueprint='sql')
+            self.driver.list_nodes()
+
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+
+        self.driver.list_nodes()
+        self.assertEqual(self.profiler.context['blueprint'], 'web')
+
+        blueprints = [item['blueprint']
+                      for item in self.profiler.get_operations()]
+        self.assertEqual(blueprints, ['sql', 'web'])
+
+    def test_retries(self):
+        self.driver._driver.busy = 2
+        while True:
+            try:
+                self.driver.create_node('node1')
+                break
+            except Exception as feedback:
+                if 'RESOURCE_BUSY' in str(feedback):
+                    continue
+                raise
+
+        operations = self.profiler.get_operations()
+        self.assertEqual(operations[0]['count'], 3)
+        self.assertEqual(operations[0]['errors'], 2)
+        self.assertEqual(operations[0]['busy'], 2)
+        self.assertEqual(operations[0]['retries'], 2)
+
+    def test_requests(self):
+        self.driver.connection.set_http_proxy('http://proxy:3128')
+        self.driver.connection.request_with_orgId_api_2(
+            'server/server/e75ead52-692f-4314-8725-c8a4f4d13a87')
+        self.driver.connection.request_with_orgId_api_2(
+            action='network/natRule?networkDomainId=1234')
+
+        names = [item['operation'] for item in self.profiler.get_operations()]
+        self.assertEqual(names, [
+            'request_with_orgId_api_2 network/natRule',
+            'request_with_orgId_api_2 server/server'])
+
+    def test_report(self):
+        self.assertEqual(len(self.profiler.report()), 1)
+
+        self.profiler.focus(action='build')
+        self.driver.list_nodes()
+        lines = self.profiler.report()
+        self.assertEqual(len(lines), 5)
+        self.assertTrue('compute.list_nodes' in lines[3])
+        self.assertTrue(lines[-1].startswith('- 1 calls'))
+
+    def test_dump(self):
+        self.driver.list_nodes()
+
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'profile.json')
+            self.profiler.dump(path)
+            with open(path) as stream:
+                data = json.load(stream)
+        finally:
+            shutil.rmtree(directory)
+
+        self.assertEqual(data['operations'][0]['operation'], 'list_nodes')
+        self.assertEqual(data['operations'][0]['count'], 1)
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(unittest.main())
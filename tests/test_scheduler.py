@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+
+"""
+Tests for `scheduler` module.
+"""
+
+import threading
+import time
+import unittest
+
+import mock
+
+from plumbery.scheduler import PlumberyScheduler
+
+
+class FakeDomain:
+
+    def __init__(self, id):
+        self.id = id
+
+
+class FakeStatus:
+
+    def __init__(self, action):
+        self.action = action
+
+
+class FakeNode:
+
+    def __init__(self, id, action):
+        self.id = id
+        self.extra = {'status': FakeStatus(action)}
+
+
+class FakeRegion:
+    """
+    Reports a pending action on a server for a couple of polls
+    """
+
+    def __init__(self, polls):
+        self.polls = polls
+        self.requests = []
+
+    def ex_get_node_by_id(self, id):
+        self.requests.append(id)
+        if id == 'gone':
+            raise Exception('RESOURCE_NOT_FOUND')
+
+        self.polls -= 1
+        if self.polls > 0:
+            return FakeNode(id, 'ADD_NIC')
+
+        return FakeNode(id, None)
+
+
+class TestPlumberyScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.scheduler = PlumberyScheduler()
+
+    def tearDown(self):
+        self.scheduler = None
+
+    def test_get_key(self):
+        self.assertEqual(self.scheduler.get_key('domain', FakeDomain('123')),
+                         ('domain', '123'))
+        self.assertEqual(self.scheduler.get_key('node', 'abc'),
+                         ('node', 'abc'))
+        self.assertEqual(self.scheduler.get_key('node', None), None)
+
+    def test_same_domain(self):
+        active = []
+        overlaps = []
+
+        def change(index):
+            with self.scheduler.lock(domain=FakeDomain('123'), node=index):
+                active.append(index)
+                if len(active) > 1:
+                    overlaps.append(index)
+                time.sleep(0.01)
+                active.remove(index)
+
+        threads = [threading.Thread(target=change, args=(index,))
+                   for index in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(overlaps, [])
+
+    def test_distinct_domains(self):
+        barrier = threading.Event()
+        entered = []
+        waited = []
+
+        def change(name):
+            with self.scheduler.lock(domain=name):
+                entered.append(name)
+                if name == 'one':
+                    waited.append(barrier.wait(5))
+                else:
+                    barrier.set()
+
+        first = threading.Thread(target=change, args=('one',))
+        first.start()
+        second = threading.Thread(target=change, args=('two',))
+        second.start()
+        first.join()
+        second.join()
+
+        self.assertEqual(waited, [True])
+        self.assertEqual(sorted(entered), ['one', 'two'])
+
+    def test_until(self):
+        region = FakeRegion(polls=3)
+        events = []
+        started = threading.Event()
+
+        def attach(name):
+            with self.scheduler.lock(
+                    node='abc',
+                    until=self.scheduler.node_is_idle(region, 'abc'),
+                    interval=0.01):
+                events.append(('request', name))
+                started.set()
+            events.append(('release', name))
+
+        first = threading.Thread(target=attach, args=('first',))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=attach, args=('second',))
+        second.start()
+        first.join()
+        second.join()
+
+        self.assertEqual(events[:2], [('request', 'first'),
+                                      ('release', 'first')])
+        self.assertEqual(region.requests[:3], ['abc', 'abc', 'abc'])
+        self.assertEqual(len(region.requests), 4)
+
+    def test_until_rejected(self):
+        until = mock.Mock(return_value=True)
+        try:
+            with self.scheduler.lock(node='abc', until=until):
+                raise Exception('RESOURCE_BUSY')
+        except Exception:
+            pass
+
+        self.assertEqual(until.call_count, 0)
+
+    @mock.patch('time.sleep')
+    def test_wait(self, sleep):
+        self.assertTrue(self.scheduler.wait(
+            self.scheduler.node_is_idle(FakeRegion(polls=0), 'gone')))
+        self.assertFalse(self.scheduler.wait(
+            self.scheduler.node_is_idle(FakeRegion(polls=100), 'abc'),
+            timeout=0))
+        self.assertEqual(sleep.call_count, 0)
+
+    def test_reentrant(self):
+        with self.scheduler.lock(domain='123'):
+            with self.scheduler.lock(domain='123', node='abc'):
+                pass
+
+        self.scheduler.reset()
+        self.assertEqual(self.scheduler._locks, {})
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(unittest.main())
@@ -6,9 +6,12 @@ Tests for `terraform` module.
 
 import unittest
 import os
+import shutil
+import stat
+import tempfile
 import mock
 
-from plumbery.terraform import Terraform
+from plumbery.terraform import Terraform, TerraformJob
 
 from tempfile import gettempdir
 tempdir = gettempdir()
@@ -27,6 +30,75 @@ class TerraformTests(unittest.TestCase):
         t.build({})
         t._run_tf.assert_called_with("apply", os.path.join(tempdir, '.tfstate'))
 
+    def test_build_workspace(self):
+        tf_path = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(tf_path, 'main.tf'), 'w') as stream:
+                stream.write('variable "region" {}\n')
+            os.makedirs(os.path.join(tf_path, '.terraform'))
+
+            def run_tf(command, *args, **kwargs):
+                return (2 if command == 'plan' else 0, "", "")
+
+            t = Terraform(tempdir)
+            t._run_tf = mock.MagicMock(side_effect=run_tf)
+            settings = {'tf_path': tf_path,
+                        'workspace': True,
+                        'parameters': {'region': 'us-west-2'}}
+
+            t.build(settings)
+            self.assertEqual(t._run_tf.call_count, 2)
+            digest = t.get_digest(tf_path, settings['parameters'])
+            t._run_tf.assert_called_with(
+                "apply", os.path.join(tf_path, '.plumbery', digest+'.tfplan'))
+            self.assertTrue(os.path.isfile(
+                os.path.join(tf_path, '.plumbery', digest+'.tfvars')))
+
+            t.build(settings)
+            self.assertEqual(t._run_tf.call_count, 2)
+
+            settings['parameters']['region'] = 'eu-west-1'
+            t.build(settings)
+            self.assertEqual(t._run_tf.call_count, 4)
+            self.assertFalse(os.path.isfile(
+                os.path.join(tf_path, '.plumbery', digest+'.tfvars')))
+
+            with open(os.path.join(tf_path, 'main.tf'), 'a') as stream:
+                stream.write('variable "zone" {}\n')
+            t.build(settings)
+            self.assertEqual(t._run_tf.call_count, 6)
+
+            t._run_tf = mock.MagicMock(return_value=(1, "", "error"))
+            with open(os.path.join(tf_path, 'main.tf'), 'a') as stream:
+                stream.write('variable "size" {}\n')
+            with self.assertRaises(RuntimeError):
+                t.build(settings)
+
+        finally:
+            shutil.rmtree(tf_path)
+
+    def test_run_tf(self):
+        directory = tempfile.mkdtemp()
+        try:
+            script = os.path.join(directory, 'terraform')
+            with open(script, 'w') as stream:
+                stream.write('#!/bin/sh\n'
+                             'echo "$1"\n'
+                             'echo "$2"\n'
+                             'echo oops 1>&2\n'
+                             'exit 3\n')
+            os.chmod(script, stat.S_IRWXU)
+
+            t = Terraform(tempdir)
+            t.tf_path = script
+            ret, stdout, stderr = t._run_tf('plan', directory, input=False)
+            self.assertEqual(ret, 3)
+            self.assertEqual(stdout, 'plan\n-input=False\n')
+            self.assertEqual(stderr, 'oops\n')
+
+        finally:
+            shutil.rmtree(directory)
+
     def test_destroy(self):
         t = Terraform(tempdir)
         t._run_tf = mock.MagicMock(return_value=(2, "", ""))
@@ -40,6 +112,48 @@ class TerraformTests(unittest.TestCase):
         t.graph(tempdir)
         t._run_tf.assert_called_with("graph", tempdir)
 
+class TerraformJobTests(unittest.TestCase):
+
+    def test_job(self):
+        t = Terraform(tempdir)
+        t.build = mock.MagicMock(return_value=0)
+        job = TerraformJob(t, {'tf_path': tempdir}, label='web')
+        self.assertEqual(job.get_key(), os.path.abspath(tempdir))
+        job.start()
+        self.assertTrue(job.join())
+        self.assertFalse(job.is_running())
+        t.build.assert_called_with({'tf_path': tempdir})
+
+    def test_failures(self):
+        t = Terraform(tempdir)
+        t.build = mock.MagicMock(return_value=1)
+        job = TerraformJob(t, {}, label='web')
+        job.start()
+        self.assertFalse(job.join())
+        self.assertEqual(job.status, 1)
+
+        t.build = mock.MagicMock(side_effect=RuntimeError('boom'))
+        job = TerraformJob(t, {}, label='web')
+        job.start()
+        self.assertFalse(job.join())
+        self.assertEqual(str(job.error), 'boom')
+
+    def test_after(self):
+        order = []
+
+        def build(settings):
+            order.append(settings['name'])
+            return 0
+
+        t = Terraform(tempdir)
+        t.build = build
+        first = TerraformJob(t, {'name': 'first'})
+        second = TerraformJob(t, {'name': 'second'}, after=first)
+        second.start()
+        first.start()
+        self.assertTrue(second.join())
+        self.assertEqual(order, ['first', 'second'])
+
 if __name__ == '__main__':
     import sys
     sys.exit(unittest.main())
\ No newline at end of file
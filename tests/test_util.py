@@ -8,9 +8,11 @@ http://www.saltycrane.com/blog/2009/11/trying-out-retry-decorator-python/
 """
 
 import logging
+import time
 import unittest
 
-from plumbery.util import retry, PlumberyParameters
+from plumbery.profiler import profiler
+from plumbery.util import retry, parallel, synchronize, PlumberyParameters
 
 
 class RetryableError(Exception):
@@ -110,6 +112,65 @@ class TestPlumberyUtil(unittest.TestCase):
 
         fails_once()
 
+    def test_parallel(self):
+        self.assertEqual(parallel(lambda x: x*2, range(20), workers=4),
+                         [x*2 for x in range(20)])
+        self.assertEqual(parallel(lambda x: x, [], workers=4), [])
+        self.assertEqual(parallel(lambda x: x+1, [1], workers=4), [2])
+
+        calls = []
+
+        def fails_sometimes(x):
+            calls.append(x)
+            if x % 5 == 0:
+                raise UnexpectedError(x)
+            return x
+
+        with self.assertRaises(UnexpectedError):
+            parallel(fails_sometimes, range(10), workers=3)
+        self.assertEqual(sorted(calls), list(range(10)))
+
+    def test_parallel_context(self):
+        profiler.focus(action='build', facility='EU6', blueprint=None)
+
+        def focus(name):
+            self.assertEqual(profiler.context['blueprint'], None)
+            profiler.focus(blueprint=name)
+            return profiler.get_context()
+
+        for workers in (1, 4):
+            contexts = parallel(focus, ['web', 'sql'], workers)
+            self.assertEqual([item['blueprint'] for item in contexts],
+                             ['web', 'sql'])
+            self.assertEqual([item['facility'] for item in contexts],
+                             ['EU6', 'EU6'])
+            self.assertEqual(profiler.context['blueprint'], None)
+
+        profiler.reset()
+
+    def test_synchronize(self):
+
+        class FakeConnection(object):
+            busy = False
+            overlaps = 0
+
+            def request(self, action):
+                if self.busy:
+                    self.overlaps += 1
+                self.busy = True
+                time.sleep(0.01)
+                self.busy = False
+                return action
+
+            def request_api_2(self, action):
+                return FakeConnection.request(self, action)
+
+        connection = synchronize(FakeConnection())
+        self.assertTrue(synchronize(connection) is connection)
+        self.assertEqual(parallel(connection.request_api_2, range(8), 4),
+                         list(range(8)))
+        self.assertEqual(connection.overlaps, 0)
+
     def test_parameters(self):
         params = PlumberyParameters()
         self.assertEqual(params.get('dummy'), None)